@@ -0,0 +1,57 @@
+"""
+Matches per second of the BatchSimulator compared to the Simulator.
+
+Run from the repository root:
+
+    python -m benchmarks.batch_simulator
+"""
+import time
+import argparse
+from typing import List
+
+from src.simulator import Simulator
+from src.batch_simulator import BatchSimulator, RandomPolicy
+
+
+def parse_args() -> dict:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-c", "--counts", type=int, nargs="+", default=[1, 100, 1000, 5000],
+        help="number of matches to run in lockstep",
+    )
+    parser.add_argument(
+        "-f", "--frames", type=int, nargs="?", default=100,
+        help="Number of frames per match",
+    )
+    parser.add_argument(
+        "-m", "--matches", type=int, nargs="?", default=20,
+        help="Number of randy vs. randy matches for the Simulator reference",
+    )
+
+    return vars(parser.parse_args())
+
+
+def main(
+        counts: List[int],
+        frames: int,
+        matches: int,
+):
+    start_time = time.perf_counter()
+    for i in range(matches):
+        sim = Simulator("src/bots/randy.py", "src/bots/randy.py")
+        for _ in range(frames):
+            sim.step()
+    duration = time.perf_counter() - start_time
+    print(f"Simulator (randy vs. randy)  : {matches / duration:10.1f} matches/sec")
+
+    for count in counts:
+        sim = BatchSimulator(RandomPolicy(23), RandomPolicy(42), count=count)
+        start_time = time.perf_counter()
+        for _ in range(frames):
+            sim.step()
+        duration = time.perf_counter() - start_time
+        print(f"BatchSimulator ({count:6} matches): {count / duration:10.1f} matches/sec")
+
+
+if __name__ == "__main__":
+    main(**parse_args())
@@ -0,0 +1,98 @@
+"""
+Frames per second of the Simulator on different board sizes.
+
+Run from the repository root:
+
+    python -m benchmarks.simulator
+"""
+import time
+import random
+import argparse
+from pathlib import Path
+from typing import List
+
+from src.simulator import Simulator
+
+
+def parse_args() -> dict:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "bots", type=str, nargs="*", default=["randy", "randy"],
+        help="path to two bot files or names of bots in src/bots/",
+    )
+    parser.add_argument(
+        "-s", "--sizes", type=int, nargs="+", default=[16, 32, 64],
+        help="board sizes (width and height) to benchmark",
+    )
+    parser.add_argument(
+        "-sf", "--spawn-frames", type=int, nargs="?", default=2,
+        help="Number of frames between spawn of new robots, lower is more crowded",
+    )
+    parser.add_argument(
+        "--fill", type=float, nargs="?", default=0.,
+        help="Fraction [0,1] of free cells to populate with random bots before the first frame",
+    )
+    parser.add_argument(
+        "-f", "--frames", type=int, nargs="?", default=100,
+        help="Number of frames per match",
+    )
+    parser.add_argument(
+        "-m", "--matches", type=int, nargs="?", default=10,
+        help="Number of matches per board size",
+    )
+
+    return vars(parser.parse_args())
+
+
+def bench_frames(
+        bots: List[str],
+        size: int,
+        spawn_frames: int,
+        fill: float,
+        frames: int,
+        matches: int,
+) -> float:
+    random.seed(23)
+    num_frames = 0
+    duration = 0.
+    for i in range(matches):
+        sim = Simulator(*bots, width=size, height=size, spawn_frame_interval=spawn_frames)
+        if fill:
+            for y in range(size):
+                for x in range(size):
+                    if not sim.get_map(x, y) and random.random() < fill:
+                        sim.add_bot(random.randrange(2), x, y)
+        start_time = time.perf_counter()
+        for _ in range(frames):
+            sim.step()
+        duration += time.perf_counter() - start_time
+        num_frames += frames
+
+    return num_frames / max(duration, 1e-9)
+
+
+def main(
+        bots: List[str],
+        sizes: List[int],
+        spawn_frames: int,
+        fill: float,
+        frames: int,
+        matches: int,
+):
+    bots = [find_bot(b) for b in bots]
+    for size in sizes:
+        fps = bench_frames(bots, size, spawn_frames, fill, frames, matches)
+        print(f"{size:3} x {size:<3}: {fps:10.1f} frames/sec")
+
+
+def find_bot(name: str) -> str:
+    fn = Path(name)
+    if not fn.exists():
+        fn = Path(f"src/bots/{fn}")
+    if not fn.exists():
+        fn = Path(f"{fn}.py")
+    return str(fn)
+
+
+if __name__ == "__main__":
+    main(**parse_args())
@@ -0,0 +1,259 @@
+"""
+Fixed-seed benchmarks of the simulator, the GameBase primitives and the bundled bots.
+
+Run all benchmarks and store the results as a baseline:
+
+    python -m benchmarks.suite run --save benchmarks/baselines/mine.json
+
+Run again after a change and compare with the baseline:
+
+    python -m benchmarks.suite run --baseline benchmarks/baselines/mine.json
+
+or compare two stored results:
+
+    python -m benchmarks.suite compare old.json new.json
+
+All values are operations per second, so higher is better. A benchmark
+is a regression if it is slower than the baseline by more than the
+`--threshold` fraction. `compare` exits with code 1 on any regression.
+"""
+import os
+import json
+import time
+import random
+import contextlib
+import argparse
+import platform
+import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import tabulate
+
+from src.simulator import Simulator
+from src.bots.botbase import GameBase
+from src.bots.treesearch import GameState
+
+from .simulator import find_bot
+
+
+SEED = 23
+
+
+def parse_args() -> dict:
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks")
+    run.add_argument(
+        "-k", "--filter", type=str, nargs="?", default=None,
+        help="only run benchmarks whose name contains this string",
+    )
+    run.add_argument(
+        "-t", "--min-time", type=float, nargs="?", default=1.,
+        help="Minimum number of seconds to repeat each benchmark",
+    )
+    run.add_argument(
+        "--save", type=str, nargs="?", default=None,
+        help="JSON file to store the results",
+    )
+    run.add_argument(
+        "--baseline", type=str, nargs="?", default=None,
+        help="JSON file of previous results to compare with",
+    )
+    run.add_argument(
+        "--threshold", type=float, nargs="?", default=.1,
+        help="Fraction of slowdown against the baseline that is considered noise",
+    )
+
+    compare = commands.add_parser("compare", help="compare two result files")
+    compare.add_argument("baseline", type=str, help="JSON file of previous results")
+    compare.add_argument("results", type=str, help="JSON file of new results")
+    compare.add_argument(
+        "--threshold", type=float, nargs="?", default=.1,
+        help="Fraction of slowdown against the baseline that is considered noise",
+    )
+
+    return vars(parser.parse_args())
+
+
+def measure(func: Callable[[], int], min_time: float) -> float:
+    """
+    Call `func` until `min_time` seconds have passed and return the
+    operations per second. `func` returns the number of operations it did.
+    """
+    num_ops = 0
+    start_time = time.perf_counter()
+    while True:
+        num_ops += func()
+        duration = time.perf_counter() - start_time
+        if duration >= min_time:
+            return num_ops / duration
+
+
+def filled_simulator(fill: float) -> Simulator:
+    random.seed(SEED)
+    sim = Simulator(find_bot("randy"), find_bot("randy"), headless=True, seed=SEED)
+    for y in range(sim.height):
+        for x in range(sim.width):
+            if not sim.get_map(x, y) and random.random() < fill:
+                sim.add_bot(random.randrange(2), x, y)
+    return sim
+
+
+def bench_simulator(fill: float, spawn_frames: int) -> Callable[[], int]:
+    def func():
+        random.seed(SEED)
+        sim = Simulator(
+            find_bot("randy"), find_bot("randy"),
+            spawn_frame_interval=spawn_frames, headless=True, seed=SEED,
+        )
+        if fill:
+            for y in range(sim.height):
+                for x in range(sim.width):
+                    if not sim.get_map(x, y) and random.random() < fill:
+                        sim.add_bot(random.randrange(2), x, y)
+        for _ in range(100):
+            sim.step()
+        return 100
+    return func
+
+
+def bench_gamebase_parse() -> Callable[[], int]:
+    state = filled_simulator(.5).game_state(0)
+
+    def func():
+        for _ in range(100):
+            GameBase(state, seed=SEED)
+        return 100
+    return func
+
+
+def bench_astar_search() -> Callable[[], int]:
+    # a path exists on this board
+    game = GameBase(filled_simulator(.3).game_state(0), seed=SEED)
+    start = game.get_next_free_pos(2, 2)
+    end = game.get_next_free_pos(13, 13)
+
+    def func():
+        game.astar_search(start, end)
+        return 1
+    return func
+
+
+def bench_enemy_distance_map() -> Callable[[], int]:
+    game = GameBase(filled_simulator(.5).game_state(0), seed=SEED)
+
+    def func():
+        game._enemy_distance_map = None
+        game.enemy_distance_map
+        return 1
+    return func
+
+
+def bench_treesearch(num_friends: int) -> Callable[[], int]:
+    friends = [(5, 5), (6, 5), (5, 6), (6, 6), (4, 5), (5, 4), (7, 6), (6, 7)][:num_friends]
+    enemies = [(8, 8), (9, 8), (8, 9), (9, 9)]
+
+    def func():
+        GameState.rand = random.Random(SEED)
+        state = GameState(
+            [GameState.BotState(x, y, 100, friend=True) for x, y in friends]
+            + [GameState.BotState(x, y, 100, friend=False) for x, y in enemies]
+        )
+        state.get_best_actions()
+        return 1
+    return func
+
+
+def bench_match(bot: str) -> Callable[[], int]:
+    def func():
+        sim = Simulator(find_bot(bot), find_bot("still"), headless=True, seed=SEED)
+        for _ in range(100):
+            sim.step()
+        sim.close()
+        return 1
+    return func
+
+
+def benchmarks() -> Dict[str, Tuple[str, Callable[[], Callable[[], int]]]]:
+    """
+    name -> (unit, factory of the function to measure)
+    """
+    benches = {
+        "simulator_sparse": ("frames/sec", lambda: bench_simulator(0., 10)),
+        "simulator_crowded": ("frames/sec", lambda: bench_simulator(.5, 2)),
+        "gamebase_parse": ("rounds/sec", bench_gamebase_parse),
+        "astar_search": ("searches/sec", bench_astar_search),
+        "enemy_distance_map": ("maps/sec", bench_enemy_distance_map),
+    }
+    for num_friends in (1, 4, 8):
+        benches[f"treesearch_{num_friends}_friends"] = (
+            "searches/sec", lambda n=num_friends: bench_treesearch(n)
+        )
+    for fn in sorted(Path("src/bots").glob("*.py")):
+        if fn.stem not in ("__init__", "botbase"):
+            benches[f"match_{fn.stem}"] = ("matches/sec", lambda name=fn.stem: bench_match(name))
+    return benches
+
+
+def run_benchmarks(filter: Optional[str], min_time: float) -> dict:
+    results = {}
+    for name, (unit, factory) in benchmarks().items():
+        if filter and filter not in name:
+            continue
+        print(f"{name} ...", end="", flush=True)
+        # silence the bot logs
+        with open(os.devnull, "w") as fp, contextlib.redirect_stderr(fp):
+            value = measure(factory(), min_time)
+        print(f" {value:.2f} {unit}")
+        results[name] = {"value": value, "unit": unit}
+
+    return {
+        "date": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare_results(baseline: dict, results: dict, threshold: float) -> List[str]:
+    """
+    Print a comparison table and return the names of the regressions
+    """
+    rows = []
+    regressions = []
+    for name, result in results["results"].items():
+        base = baseline["results"].get(name)
+        row = {"benchmark": name, "unit": result["unit"], "value": round(result["value"], 2)}
+        if base:
+            ratio = result["value"] / max(base["value"], 1e-9)
+            row.update({"baseline": round(base["value"], 2), "change": f"{(ratio - 1) * 100:+.1f}%"})
+            if ratio < 1. - threshold:
+                row["status"] = "REGRESSION"
+                regressions.append(name)
+            elif ratio > 1. + threshold:
+                row["status"] = "faster"
+        rows.append(row)
+
+    print(tabulate.tabulate(rows, headers="keys", tablefmt="presto"))
+    return regressions
+
+
+def main(command: str, threshold: float, **kwargs):
+    if command == "run":
+        results = run_benchmarks(kwargs["filter"], kwargs["min_time"])
+        if kwargs["save"]:
+            Path(kwargs["save"]).parent.mkdir(parents=True, exist_ok=True)
+            Path(kwargs["save"]).write_text(json.dumps(results, indent=2))
+        baseline = json.loads(Path(kwargs["baseline"]).read_text()) if kwargs["baseline"] else {"results": {}}
+    else:
+        baseline = json.loads(Path(kwargs["baseline"]).read_text())
+        results = json.loads(Path(kwargs["results"]).read_text())
+
+    if compare_results(baseline, results, threshold):
+        exit(1)
+
+
+if __name__ == "__main__":
+    main(**parse_args())
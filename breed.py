@@ -3,12 +3,20 @@ import os
 import argparse
 from pathlib import Path
 from multiprocessing import Pool
-from typing import List
+from typing import List, Optional
 
 from tqdm import tqdm
 
 from src.simulator import Simulator
 from src.pool import BotPool
+from src.pool_store import PoolStore
+from src.cache import MatchCache
+from src.schedule import (
+    PairingScheduler, AllPairsScheduler, RandomOpponentsScheduler, SwissScheduler, PanelScheduler,
+    SuccessiveHalvingScheduler,
+)
+from src.islands import IslandModel, island_filename
+from src.distributed import Coordinator, DEFAULT_PORT, parse_address
 
 
 def parse_args() -> dict:
@@ -19,7 +27,8 @@ def parse_args() -> dict:
     )
     parser.add_argument(
         "-p", "--pool", type=str, nargs="?", default="default",
-        help="filename of pool",
+        help="filename of pool, a '.sqlite' file keeps a checkpoint of each generation"
+             " and all match records, see src/pool_store.py",
     )
     parser.add_argument(
         "-r", "--reset", type=bool, nargs="?", default=False, const=True,
@@ -29,8 +38,92 @@ def parse_args() -> dict:
         "-s", "--pool-size", type=int, nargs="?", default=10,
         help="size of pool",
     )
+    parser.add_argument(
+        "--seed", type=int, nargs="?", default=None,
+        help="Seed for reproducible evolution and matches of a new pool",
+    )
+    parser.add_argument(
+        "--cache", type=str, nargs="?", default=None,
+        help="sqlite file to cache match results, only used with seeded pools",
+    )
+    parser.add_argument(
+        "--results", type=str, nargs="?", default=None,
+        help="JSONL or CSV file to append a record of each match to, see query.py",
+    )
+    parser.add_argument(
+        "--steady-state", type=bool, nargs="?", default=False, const=True,
+        help="Evolve without generations, a new bot is created each time a bot has played"
+             " --evaluations matches, see BotPool.evolve_steady_state",
+    )
+    parser.add_argument(
+        "-e", "--evaluations", type=int, nargs="?", default=10,
+        help="Number of matches of a bot before it reproduces with --steady-state",
+    )
+    parser.add_argument(
+        "--checkpoint-interval", type=float, nargs="?", default=60.,
+        help="Seconds between saving the pool with --steady-state",
+    )
+    parser.add_argument(
+        "--optimizer", type=str, nargs="?", default="ga", choices=["ga", "cma"],
+        help="'ga' mutates and crosses the best bots of each generation, 'cma' samples"
+             " each generation with CMA-ES, which needs bots with a numeric GENOME",
+    )
+    parser.add_argument(
+        "--schedule", type=str, nargs="?", default="all", choices=["all", "random", "swiss", "panel", "halving"],
+        help="Pairing of the population in each generation: 'all' ordered pairs,"
+             " 'random' opponents (--opponents), 'swiss' rounds by fitness (--rounds),"
+             " a fixed 'panel' of bots (--panel) or successive 'halving' of the"
+             " contenders with a match budget (--budget)",
+    )
+    parser.add_argument(
+        "-k", "--opponents", type=int, nargs="?", default=4,
+        help="Number of random opponents of each bot with --schedule random",
+    )
+    parser.add_argument(
+        "--rounds", type=int, nargs="?", default=5,
+        help="Number of rounds with --schedule swiss",
+    )
+    parser.add_argument(
+        "--budget", type=int, nargs="?", default=None,
+        help="Number of matches per generation with --schedule halving, defaults to 10 times the pool size",
+    )
+    parser.add_argument(
+        "--panel", type=str, nargs="+", default=["randy", "randy2"],
+        help="Bots to play against with --schedule panel",
+    )
+    parser.add_argument(
+        "--islands", type=int, nargs="?", default=None,
+        help="Evolve this number of separate populations in their own processes,"
+             " with migration of the best bots, see src/islands.py",
+    )
+    parser.add_argument(
+        "--migration-interval", type=int, nargs="?", default=5,
+        help="Number of generations between migrations with --islands",
+    )
+    parser.add_argument(
+        "--migrants", type=int, nargs="?", default=2,
+        help="Number of the best bots of an island that migrate to the next one with --islands",
+    )
+    parser.add_argument(
+        "--distribute", type=str, nargs="?", default=None, const=str(DEFAULT_PORT),
+        help="[host:]port to listen on for worker.py processes which run the matches"
+             f" instead of local processes, the default port is {DEFAULT_PORT}",
+    )
+    parser.add_argument(
+        "--authkey", type=str, nargs="?", default=None,
+        help="shared secret of --distribute and the workers, defaults to a random key that is printed",
+    )
 
-    return vars(parser.parse_args())
+    args = parser.parse_args()
+    if args.steady_state and args.distribute:
+        parser.error("--steady-state does not support --distribute")
+    if args.steady_state and args.optimizer != "ga":
+        parser.error("--steady-state does not support --optimizer")
+    if args.islands:
+        for name in ("steady_state", "distribute", "results"):
+            if getattr(args, name):
+                parser.error(f"--islands does not support --{name.replace('_', '-')}")
+    return vars(args)
 
 
 def main(
@@ -38,9 +131,26 @@ def main(
         pool: str,
         reset: bool,
         pool_size: int,
+        seed: Optional[int],
+        cache: Optional[str],
+        results: Optional[str],
+        steady_state: bool,
+        evaluations: int,
+        checkpoint_interval: float,
+        optimizer: str,
+        schedule: str,
+        opponents: int,
+        rounds: int,
+        budget: Optional[int],
+        panel: List[str],
+        islands: Optional[int],
+        migration_interval: int,
+        migrants: int,
+        distribute: Optional[str],
+        authkey: Optional[str],
 ):
     filenames = []
-    for org_fn in bots:
+    for org_fn in bots + (panel if schedule == "panel" else []):
         fn = Path(org_fn)
         if not fn.exists():
             fn = Path(f"src/bots/{fn}")
@@ -50,36 +160,117 @@ def main(
             print(f"Could not find bot '{org_fn}'")
             exit(1)
         filenames.append(fn)
+    filenames, panel_filenames = filenames[:len(bots)], filenames[len(bots):]
 
-    if not pool.lower().endswith(".pkl"):
+    scheduler: PairingScheduler = AllPairsScheduler()
+    if schedule == "random":
+        scheduler = RandomOpponentsScheduler(k=opponents)
+    elif schedule == "swiss":
+        scheduler = SwissScheduler(rounds=rounds)
+    elif schedule == "panel":
+        scheduler = PanelScheduler(panel_filenames)
+    elif schedule == "halving":
+        # keeps as many contenders as select_population keeps the best
+        scheduler = SuccessiveHalvingScheduler(budget=budget or 10 * pool_size, keep=5)
+    if not steady_state:
+        print(f"{scheduler}: {scheduler.num_matches(pool_size)} matches per generation")
+
+    if not pool.lower().endswith((".pkl", ".sqlite")):
         pool += ".pkl"
     pool_filename = Path(pool)
     if not pool_filename.is_absolute():
         pool_filename = Path(__file__).resolve().parent / "pools" / pool_filename
+    if reset and pool_filename.suffix == ".sqlite":
+        # the store only appends, start with a new file
+        PoolStore(pool_filename).delete()
+
+    if islands:
+        os.makedirs(pool_filename.parent, exist_ok=True)
+        if reset:
+            for index in range(islands):
+                fn = island_filename(pool_filename, index)
+                if fn.suffix == ".sqlite":
+                    PoolStore(fn).delete()
+                elif fn.exists():
+                    fn.unlink()
+
+        with IslandModel(
+                filenames * 10,
+                num_islands=islands,
+                population_size=pool_size,
+                migration_interval=migration_interval,
+                num_migrants=migrants,
+                scheduler=scheduler,
+                optimizer=optimizer,
+                seed=seed,
+                cache=MatchCache(cache) if cache else None,
+                checkpoint_file=pool_filename,
+        ) as model:
+            model.run(generations=100)
+            model.dump_hall_of_fame()
+        return
 
-    if pool_filename.exists() and not reset:
-        print("loading", pool_filename)
-        pool = BotPool.load(pool_filename)
-        pool.dump_population()
-    else:
-        pool = BotPool()
+    coordinator = None
+    if distribute:
+        coordinator = Coordinator(parse_address(distribute, default_host=""), authkey=authkey)
+        print(f"waiting for workers on port {coordinator.address[1]} with authkey {coordinator.authkey}")
 
-        pool.add_bot_file(*(filenames * 10))
-        pool.dump_files()
+    try:
+        if pool_filename.exists() and not reset:
+            print("loading", pool_filename)
+            pool = BotPool.load(pool_filename)
+            pool.cache = MatchCache(cache) if cache else None
+            pool.results_file = results
+            pool.coordinator = coordinator
+            pool.scheduler = scheduler
+            pool.dump_population()
+        else:
+            pool = BotPool(seed=seed)
+            pool.cache = MatchCache(cache) if cache else None
+            pool.results_file = results
+            pool.coordinator = coordinator
+            pool.scheduler = scheduler
+            if pool_filename.suffix == ".sqlite":
+                pool.store = PoolStore(pool_filename)
 
-        pool.create_population(count=pool_size)
-        pool.evaluate()
-        pool.dump_population()
+            pool.add_bot_file(*(filenames * 10))
+            pool.dump_files()
 
-    for i in range(100):
-        pool.select_population(count=pool_size)
-        pool.evaluate()
-        pool.dump_population()
-        print("top genome:", sorted(pool.population.values(), key=lambda p: p["fitness"])[-1]["genome"])
+            pool.create_population(count=pool_size)
+            if not steady_state:
+                pool.evaluate()
+            pool.dump_population()
 
-        print("saving", pool_filename)
         os.makedirs(pool_filename.parent, exist_ok=True)
-        pool.save(pool_filename)
+        if steady_state:
+            pool.evolve_steady_state(
+                num_offspring=100 * pool_size,
+                evaluations=evaluations,
+                checkpoint_file=pool_filename,
+                checkpoint_interval=checkpoint_interval,
+            )
+            pool.dump_population()
+            print("top genome:", sorted(pool.population.values(), key=lambda p: p["fitness"])[-1]["genome"])
+            pool.close()
+            return
+
+        for i in range(100):
+            if optimizer == "cma":
+                pool.select_population_cma(count=pool_size)
+            else:
+                pool.select_population(count=pool_size)
+            pool.evaluate()
+            pool.dump_population()
+            print("top genome:", sorted(pool.population.values(), key=lambda p: p["fitness"])[-1]["genome"])
+
+            print("saving", pool_filename)
+            pool.save(pool_filename)
+
+        pool.close()
+    finally:
+        # stops the listener and lease threads, the workers are disconnected
+        if coordinator is not None:
+            coordinator.close()
 
 
 if __name__ == "__main__":
@@ -1,24 +1,52 @@
-import time
+import os
+import sys
 import argparse
 from pathlib import Path
 from multiprocessing import Pool
-from typing import List
+from typing import List, Optional, Iterable, Generator
 
 from tqdm import tqdm
+import tabulate
 
-from src.simulator import Simulator
+from src.simulator import Simulator, derive_seed, timing_summary
+from src.observer import PrintObserver
+from src.terminal import TerminalRenderer, TerminalObserver, Playback
+from src.replay import Replay, ReplayRecorder
+from src.cache import MatchCache, run_match
+from src.profiler import PhaseProfiler
+from src.sequential import SPRT
+from src.result_sink import ResultSink, match_record
+from src.distributed import Coordinator, DEFAULT_PORT, parse_address
 
 
 def parse_args() -> dict:
     parser = argparse.ArgumentParser()
     parser.add_argument(
-        "bots", type=str, nargs=2,
+        "bots", type=str, nargs="*",
         help="path to two bot files",
     )
     parser.add_argument(
         "--many", type=int, nargs="?", default=0,
         help="Number of games to run and print results",
     )
+    parser.add_argument(
+        "-j", "--jobs", type=int, nargs="?", default=None,
+        help="Number of processes for --many, defaults to the number of CPUs",
+    )
+    parser.add_argument(
+        "--until-significant", type=bool, nargs="?", default=False, const=True,
+        help="Stop --many games as soon as one bot is significantly better,"
+             " --many is the maximum number of games (default 2000)",
+    )
+    parser.add_argument(
+        "--confidence", type=float, nargs="?", default=.95,
+        help="Confidence for --until-significant",
+    )
+    parser.add_argument(
+        "--delta", type=float, nargs="?", default=.05,
+        help="Difference of the score (win = 1, draw = .5) from .5"
+             " that --until-significant should detect",
+    )
     parser.add_argument(
         "-sf", "--spawn-frames", type=int, nargs="?", default=10,
         help="Number of frames between spawn of new robots",
@@ -27,55 +55,268 @@ def parse_args() -> dict:
         "-d", "--delay", type=int, nargs="?", default=100,
         help="Number of milliseconds to display each frame",
     )
+    parser.add_argument(
+        "--plain", type=bool, nargs="?", default=False, const=True,
+        help="Print the complete map in each frame instead of the interactive terminal display,"
+             " which is only used when the output is a terminal",
+    )
     parser.add_argument(
         "-r", "--random", type=float, nargs="?", default=0.,
         help="Probability [0,1] of a bot making a random move instead of it's desired action",
     )
+    parser.add_argument(
+        "-w", "--warm", type=bool, nargs="?", default=False, const=True,
+        help="Run file bots in a long-lived worker process instead of starting python for each round",
+    )
+    parser.add_argument(
+        "-s", "--seed", type=int, nargs="?", default=None,
+        help="Seed for reproducible matches, each match uses a sub-seed derived from it",
+    )
+    parser.add_argument(
+        "--record", type=str, nargs="?", default=None,
+        help="Directory to store a replay file of each match, maps can be at most 255 cells wide and high",
+    )
+    parser.add_argument(
+        "--replay", type=str, nargs="?", default=None,
+        help="Replay file to display instead of running bots",
+    )
+    parser.add_argument(
+        "--frame", type=int, nargs="?", default=0,
+        help="Frame to start the replay at",
+    )
+    parser.add_argument(
+        "-b", "--budget", type=float, nargs="?", default=None,
+        help="Time budget in milliseconds (wall time) for each bot in each round",
+    )
+    parser.add_argument(
+        "-bp", "--budget-policy", type=str, nargs="?", default="flag", choices=Simulator.BUDGET_POLICIES,
+        help="What happens when a bot overruns the budget: count it (flag),"
+             " ignore the bot's output (empty) or remove the player's bots (forfeit)",
+    )
+    parser.add_argument(
+        "-p", "--profile", type=bool, nargs="?", default=False, const=True,
+        help="Measure the time of each phase of the simulation and print a breakdown",
+    )
+    parser.add_argument(
+        "--profile-file", type=str, nargs="?", default=None,
+        help="JSON file to store the profile",
+    )
+    parser.add_argument(
+        "--results", type=str, nargs="?", default=None,
+        help="JSONL or CSV file to append a record of each --many game to, see query.py",
+    )
+    parser.add_argument(
+        "--distribute", type=str, nargs="?", default=None, const=str(DEFAULT_PORT),
+        help="[host:]port to listen on for worker.py processes which run the matches of --many"
+             f" instead of local processes, the default port is {DEFAULT_PORT}",
+    )
+    parser.add_argument(
+        "--authkey", type=str, nargs="?", default=None,
+        help="shared secret of --distribute and the workers, defaults to a random key that is printed",
+    )
+    parser.add_argument(
+        "--cache", type=str, nargs="?", default=None,
+        help="sqlite file to cache match results, only seeded matches between module bots are cached",
+    )
 
-    return vars(parser.parse_args())
+    args = parser.parse_args()
+    if not args.replay and len(args.bots) != 2:
+        parser.error("need two bots")
+    if args.distribute and (args.record or args.cache or not (args.many or args.until_significant)):
+        parser.error("--distribute needs --many or --until-significant and does not support --record or --cache")
+    return vars(args)
 
 
-def run_games(
+def run_game(
         filenames: List[Path],
-        process_index: int,
-        count: int,
+        index: int,
         sim_params: dict,
+        record: Optional[str] = None,
+        seed: Optional[int] = None,
+        cache: Optional[str] = None,
+) -> dict:
+    """
+    Play match number `index`, the bots swap colours on odd indices.
+
+    Returns the `filenames` (as str), `index`, `stats`, `timings` and `profile`
+    of the match, the stats and timings are ordered like `filenames`, and
+    the flat `record` of the match for a `ResultSink`.
+    """
+    sim = Simulator(
+        *game_files(filenames, index),
+        **sim_params,
+        headless=True,
+        seed=game_seed(seed, index),
+    )
+    if record:
+        recorder = ReplayRecorder()
+        sim.add_observer(recorder)
+        result = run_match(sim)
+        recorder.save(replay_filename(record, index))
+    else:
+        result = run_match(sim, get_cache(cache) if cache else None)
+
+    profile = sim.profiler.to_dict() if sim.profiler and "timings" in result else None
+    return game_result(filenames, index, sim.seed, result, profile)
+
+
+def game_files(filenames: List[Path], index: int) -> List[Path]:
+    """
+    The bot files of match number `index` in player order
+    """
+    return list(filenames) if index % 2 == 0 else list(reversed(filenames))
+
+
+def game_seed(seed: Optional[int], index: int) -> Optional[int]:
+    return None if seed is None else derive_seed(seed, index)
+
+
+def game_result(
+        filenames: List[Path],
+        index: int,
+        seed: Optional[int],
+        result: dict,
+        profile: Optional[dict] = None,
 ) -> dict:
+    """
+    Convert the `run_match` result of match number `index` to the result of `run_game`
+    """
+    A, B = (0, 1) if index % 2 == 0 else (1, 0)
 
     stats = {
         "wins": [0, 0],
         "draws": [0, 0],
         "bots_alive": [0, 0],
+        "budget_overruns": [0, 0],
     }
-    A, B = 0, 1
-    for i in tqdm(range(count), position=process_index):
-        if i % 2 == 1:
-            filenames = list(reversed(filenames))
-            A, B = B, A
-
-        sim = Simulator(*filenames, **sim_params)
-        for _ in range(100):
-            sim.step()
-
-        n1, n2 = sim.num_bots()
-        if n1 == n2:
-            stats["draws"][A] += 1
-            stats["draws"][B] += 1
-        elif n1 > n2:
-            stats["wins"][A] += 1
-        else:
-            stats["wins"][B] += 1
+    # nanosecond samples per bot file, cached matches have none
+    timings = {
+        "wall": [[], []],
+        "cpu": [[], []],
+    }
+
+    n1, n2 = result["num_bots"]
+    if n1 == n2:
+        stats["draws"][A] += 1
+        stats["draws"][B] += 1
+    elif n1 > n2:
+        stats["wins"][A] += 1
+    else:
+        stats["wins"][B] += 1
+
+    stats["bots_alive"][A] += n1
+    stats["bots_alive"][B] += n2
+
+    if "timings" in result:
+        for i, p in ((A, 0), (B, 1)):
+            stats["budget_overruns"][i] += result["overruns"][p]
+            for kind, samples in result["timings"].items():
+                timings[kind][i] += samples[p]
+
+    for key, values in result["stats"].items():
+        stats[key] = [values[A], values[B]]
+
+    return {
+        "filenames": [str(fn) for fn in filenames],
+        "index": index,
+        "stats": stats,
+        "timings": timings,
+        "profile": profile,
+        "record": match_record(game_files(filenames, index), seed, result, index=index),
+    }
+
+
+def _run_game_task(args: tuple) -> dict:
+    return run_game(*args)
+
+
+class ResultSum:
+    """
+    Sum of the `run_game` results
+    """
+    def __init__(self, profile: bool = False):
+        self.stats = {}
+        self.timings = {"wall": [[], []], "cpu": [[], []]}
+        self.profiler = PhaseProfiler() if profile else None
+        self.count = 0
+
+    def add(self, result: dict):
+        self.count += 1
+        for key, values in result["stats"].items():
+            if key not in self.stats:
+                self.stats[key] = list(values)
+            else:
+                for i, v in enumerate(values):
+                    self.stats[key][i] += v
+        for kind, samples in result["timings"].items():
+            for i in range(2):
+                self.timings[kind][i] += samples[i]
+        if self.profiler and result["profile"]:
+            self.profiler.merge(result["profile"])
 
-        stats["bots_alive"][A] += n1
-        stats["bots_alive"][B] += n2
 
-        for key, values in sim.stats.items():
-            if key not in stats:
-                stats[key] = [0, 0]
-            for i, v in enumerate([values[A], values[B]]):
-                stats[key][i] += v
+# one MatchCache per process and file
+_caches = {}
 
-    return stats
+
+def get_cache(filename: str) -> MatchCache:
+    if filename not in _caches:
+        _caches[filename] = MatchCache(filename)
+    return _caches[filename]
+
+
+def replay_filename(record: str, index: int) -> Path:
+    return Path(record) / f"{index:05}.bwr"
+
+
+def imap_games(
+        tasks: Iterable[tuple],
+        jobs: Optional[int] = None,
+        coordinator: Optional[Coordinator] = None,
+) -> Generator[dict, None, None]:
+    """
+    Run `run_game` for each tuple of arguments in a process pool and
+    yield the results in the order they are finished.
+
+    :param jobs: number of processes, defaults to the number of CPUs,
+        1 runs the games in this process
+    :param coordinator: run the games on the workers of this Coordinator
+        instead, recording and caching is not supported
+    """
+    if coordinator is not None:
+        yield from _imap_remote_games(tasks, coordinator)
+        return
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs < 2:
+        yield from map(_run_game_task, tasks)
+        return
+
+    with Pool(jobs) as pool:
+        yield from pool.imap_unordered(_run_game_task, tasks)
+
+
+def _imap_remote_games(tasks: Iterable[tuple], coordinator: Coordinator) -> Generator[dict, None, None]:
+    games = [_remote_game(*task) for task in tasks]
+    descriptors = (
+        coordinator.match_task(game_files(filenames, index), seed=game_seed(seed, index), **sim_params)
+        for filenames, index, sim_params, seed in games
+    )
+    for i, result in coordinator.imap(descriptors):
+        filenames, index, sim_params, seed = games[i]
+        profile = result.pop("profile")
+        yield game_result(filenames, index, game_seed(seed, index), result, profile)
+
+
+def _remote_game(
+        filenames: List[Path],
+        index: int,
+        sim_params: dict,
+        record: Optional[str] = None,
+        seed: Optional[int] = None,
+        cache: Optional[str] = None,
+) -> tuple:
+    return filenames, index, sim_params, seed
 
 
 def print_stats(stats: dict):
@@ -95,13 +336,65 @@ def print_stats(stats: dict):
         )
 
 
+def print_timings(timings: dict, names: List[str]):
+    rows = []
+    for i, name in enumerate(names):
+        row = {"bot": name}
+        for kind, samples in timings.items():
+            for key, value in timing_summary(samples[i]).items():
+                row[f"{kind} {key} ms"] = "-" if value is None else round(value, 3)
+        row["rounds"] = len(timings["wall"][i])
+        rows.append(row)
+    print(tabulate.tabulate(rows, headers="keys", tablefmt="presto"))
+
+
+def print_sprt(sprt: SPRT, confidence: float):
+    low, high = sprt.interval(confidence)
+    decision = sprt.decision()
+    if decision is None:
+        print(f"undecided after {sprt.num_games} games", end="")
+    else:
+        print(f"{'ab'[decision]} is better than {'ba'[decision]} after {sprt.num_games} games", end="")
+    print(
+        f", score of a: {sprt.score:.3f} [{low:.3f}, {high:.3f}] at {confidence * 100:g}% confidence"
+        f" (w/d/l {sprt.wins}/{sprt.draws}/{sprt.losses}, llr {sprt.llr:.2f})"
+    )
+
+
 def main(
         bots: List[str],
         many: int,
+        jobs: Optional[int],
+        until_significant: bool,
+        confidence: float,
+        delta: float,
         spawn_frames: int,
         delay: int,
+        plain: bool,
         random: float,
+        warm: bool,
+        seed: Optional[int],
+        record: Optional[str],
+        replay: Optional[str],
+        frame: int,
+        budget: Optional[float],
+        budget_policy: str,
+        profile: bool,
+        profile_file: Optional[str],
+        results: Optional[str],
+        distribute: Optional[str],
+        authkey: Optional[str],
+        cache: Optional[str],
 ):
+    if replay:
+        return play_replay(replay, frame, delay, plain)
+
+    if record:
+        os.makedirs(record, exist_ok=True)
+
+    if until_significant and not many:
+        many = 2000
+
     filenames = []
     for org_fn in bots:
         fn = Path(org_fn)
@@ -117,6 +410,10 @@ def main(
     sim_params = {
         "spawn_frame_interval": spawn_frames,
         "random_probability": random,
+        "warm_files": warm,
+        "time_budget": budget,
+        "budget_policy": budget_policy,
+        "profile": profile or bool(profile_file),
     }
 
     bot_modules = Simulator(*filenames, **sim_params).bot_modules
@@ -124,31 +421,123 @@ def main(
         print(f"{name}: {fn} ({'module' if m else 'file'})")
 
     if not many:
-        sim = Simulator(*filenames, **sim_params)
-        for _ in range(100):
-            sim.step()
-            sim.print()
-            time.sleep(delay / 1000)
+        sim = Simulator(*filenames, **sim_params, seed=seed)
+        if record:
+            recorder = ReplayRecorder()
+            sim.add_observer(recorder)
+        if plain or not sys.stdout.isatty():
+            sim.add_observer(PrintObserver(delay=delay))
+            for _ in range(100):
+                sim.step()
+        else:
+            renderer = TerminalRenderer()
+            with Playback(delay=delay) as playback:
+                display = TerminalObserver(playback, renderer)
+                sim.add_observer(display)
+                try:
+                    for _ in range(100):
+                        sim.step()
+                        if display.quit:
+                            break
+                finally:
+                    renderer.close()
+        sim.close()
+        if record:
+            recorder.save(replay_filename(record, 0))
+
+        print_stats({**sim.stats, "budget_overruns": sim.overruns})
+        print_timings(sim.timings, [str(fn) for fn in filenames])
+        profiler = sim.profiler
+
+    else:
+        result_sum = ResultSum(profile=sim_params["profile"])
+        sprt = SPRT(delta=delta, alpha=1. - confidence, beta=1. - confidence)
+        tasks = (
+            (filenames, index, sim_params, record, seed, cache)
+            for index in range(many)
+        )
+        coordinator = None
+        if distribute:
+            coordinator = Coordinator(parse_address(distribute, default_host=""), authkey=authkey)
+            print(f"waiting for workers on port {coordinator.address[1]} with authkey {coordinator.authkey}")
+        games = imap_games(tasks, jobs, coordinator)
+        sink = ResultSink(results) if results else None
+        progress = tqdm(games, total=many)
+        for result in progress:
+            if coordinator:
+                progress.set_postfix(workers=coordinator.num_workers)
+            result_sum.add(result)
+            if sink:
+                sink.write(result["record"])
+            if until_significant:
+                sprt.add(
+                    wins=result["stats"]["wins"][0],
+                    draws=result["stats"]["draws"][0],
+                    losses=result["stats"]["wins"][1],
+                )
+                if sprt.decision() is not None:
+                    break
+        # stops the pool
+        games.close()
+        if coordinator:
+            coordinator.close()
+        if sink:
+            sink.close()
+
+        print_stats(result_sum.stats)
+        print_timings(result_sum.timings, [str(fn) for fn in filenames])
+        profiler = result_sum.profiler
 
-        print_stats(sim.stats)
+        if until_significant:
+            print_sprt(sprt, confidence)
 
+    if profiler:
+        print(profiler.table())
+        if profile_file:
+            profiler.save(profile_file)
+
+
+def play_replay(filename: str, frame: int, delay: int, plain: bool = False):
+    replay = Replay.load(filename)
+    for name, fn in zip(("a", "b"), replay.bot_files):
+        print(f"{name}: {fn}")
+
+    if plain or not sys.stdout.isatty():
+        sim = replay.simulator(frame)
+        sim.add_observer(PrintObserver(delay=delay))
+        while sim.frame < replay.num_frames:
+            replay.step(sim)
     else:
-        processes = [
-            (filenames, i, many // 8, sim_params)
-            for i in range(8)
-        ]
-        results = Pool(len(processes)).starmap(run_games, processes)
-
-        result_sum = dict()
-        for r in results:
-            for key, values in r.items():
-                if key not in result_sum:
-                    result_sum[key] = values.copy()
-                else:
-                    for i, v in enumerate(values):
-                        result_sum[key][i] += v
-
-        print_stats(result_sum)
+        sim = play_replay_interactive(replay, frame, delay)
+
+    print_stats(sim.stats)
+
+
+def play_replay_interactive(replay: Replay, frame: int, delay: int) -> Simulator:
+    """
+    Display the replay in the terminal, with keys to pause and step
+    forward and backward. Stops at the last frame when not paused.
+    """
+    renderer = TerminalRenderer()
+    sim = replay.simulator(frame)
+    with Playback(delay=delay, can_step_back=True) as playback:
+        try:
+            while True:
+                renderer.render(sim, f"frame {sim.frame}/{replay.num_frames}  {playback.status()}")
+                if sim.frame >= replay.num_frames and not playback.paused:
+                    break
+                command = playback.wait()
+                if command == "quit":
+                    break
+                elif command == "back":
+                    if sim.frame > 0:
+                        sim = replay.simulator(sim.frame - 1)
+                elif command == "next":
+                    if sim.frame < replay.num_frames:
+                        replay.step(sim)
+        finally:
+            renderer.close()
+    return sim
 
 
 if __name__ == "__main__":
@@ -0,0 +1,87 @@
+import json
+import argparse
+from typing import Optional
+
+from src.simulator import Simulator
+from src.result_sink import read_records
+from match import print_stats
+
+
+def parse_args() -> dict:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "file", type=str,
+        help="JSONL or CSV file of match records written by match.py or breed.py --results",
+    )
+    parser.add_argument(
+        "-s", "--seed", type=int, nargs="?", default=None,
+        help="only use the match with this seed",
+    )
+    parser.add_argument(
+        "-b", "--bot", type=str, nargs="?", default=None,
+        help="only use matches where one of the bot files contains this string",
+    )
+    parser.add_argument(
+        "-g", "--group", type=str, nargs="?", default="bot",
+        help="record field (without the _1/_2 suffix) to sum the stats by,"
+             " e.g. 'id' for the population ids of breed.py",
+    )
+    parser.add_argument(
+        "-r", "--records", type=bool, nargs="?", default=False, const=True,
+        help="print the matching records as JSONL instead of the stats",
+    )
+
+    return vars(parser.parse_args())
+
+
+def main(
+        file: str,
+        seed: Optional[int],
+        bot: Optional[str],
+        group: str,
+        records: bool,
+):
+    stats = {}
+    names = []
+    num_matches = 0
+    for record in read_records(file):
+        if seed is not None and record["seed"] != seed:
+            continue
+        if bot and bot not in record["bot_1"] and bot not in record["bot_2"]:
+            continue
+
+        num_matches += 1
+        if records:
+            print(json.dumps(record))
+            continue
+
+        for p, other in ((1, 2), (2, 1)):
+            name = record[f"{group}_{p}"]
+            if name not in names:
+                names.append(name)
+                for values in stats.values():
+                    values.append(0)
+            i = names.index(name)
+
+            def add(key: str, value):
+                if key not in stats:
+                    stats[key] = [0] * len(names)
+                stats[key][i] += value or 0
+
+            n1, n2 = record[f"bots_{p}"], record[f"bots_{other}"]
+            add("wins", n1 > n2)
+            add("draws", n1 == n2)
+            add("bots_alive", n1)
+            add("budget_overruns", record.get(f"overruns_{p}"))
+            for key in Simulator.STATS:
+                add(key, record.get(f"{key}_{p}"))
+
+    if not records:
+        for i, name in enumerate(names):
+            print(f"{'abcdefghijklmnopqrstuvwxyz'[i % 26]}: {name}")
+        print("matches:", num_matches)
+        print_stats({key: [int(v) for v in values] for key, values in stats.items()})
+
+
+if __name__ == "__main__":
+    main(**parse_args())
@@ -0,0 +1,345 @@
+"""
+Vectorized simulator that advances many matches in lockstep.
+
+All boards are stored as dense numpy arrays of shape (matches, height, width)
+and each frame is applied with array operations, following the same rules
+as the `Simulator`, including the order in which moves, attacks and
+explosions are resolved.
+
+Bots plug in as `BatchPolicy` which return one action per board cell
+for all matches at once. Unlike the string protocol, each bot can only
+have one action per frame.
+"""
+from typing import Optional, Tuple, Sequence
+
+import numpy as np
+
+from .simulator import Simulator
+
+
+class BatchPolicy:
+    """
+    Interface for bots in the `BatchSimulator`.
+    """
+    def actions(self, sim: "BatchSimulator", player: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the actions of all bots of `player` in all matches.
+
+        Only cells where `sim.player == player` are used.
+
+        :return: tuple of two int arrays of shape (matches, height, width)
+            - the action, one of BatchSimulator.NONE, ATTACK, DEFEND, MOVE, EXPLODE
+            - the direction, an index into BatchSimulator.DIRECTIONS
+        """
+        raise NotImplementedError
+
+
+class RandomPolicy(BatchPolicy):
+    """
+    Picks a random action and direction for each bot.
+
+    :param seed: seed for the numpy random generator
+    :param probabilities: probability of NONE, ATTACK, DEFEND, MOVE and EXPLODE
+    """
+    def __init__(
+            self,
+            seed: Optional[int] = None,
+            probabilities: Sequence[float] = (.1, .3, .15, .43, .02),
+    ):
+        self.rand = np.random.default_rng(seed)
+        self.probabilities = probabilities
+        self._thresholds = np.cumsum(probabilities[:-1], dtype=np.float32)
+
+    def actions(self, sim: "BatchSimulator", player: int) -> Tuple[np.ndarray, np.ndarray]:
+        shape = sim.player.shape
+        value = self.rand.random(shape, dtype=np.float32)
+        action = np.zeros(shape, dtype=np.int8)
+        for threshold in self._thresholds:
+            action += value >= threshold
+        direction = self.rand.integers(0, len(sim.DIRECTIONS), size=shape, dtype=np.int8)
+        return action, direction
+
+
+class BatchSimulator:
+    """
+    Simulates `count` matches at once.
+
+    Board state per match:
+        - `player`: int8, the player index of the bot in each cell or -1
+        - `energy`: int32, the energy of the bot in each cell
+        - `order`: int64, spawn sequence of the bot, which emulates
+          the order of the bot list in `Simulator`
+
+    `stats` contains the same keys as `Simulator.stats`,
+    each as an int array of shape (count, 2).
+    """
+    NONE, ATTACK, DEFEND, MOVE, EXPLODE = range(5)
+
+    # (dx, dy) in the order of Simulator.DIRECTIONS
+    DIRECTIONS = np.array(list(Simulator.DIRECTIONS.values()), dtype=np.int64)
+    DIRECTION_NAMES = list(Simulator.DIRECTIONS)
+
+    _NEIGHBOURS = [
+        (x, y)
+        for y in range(-1, 2)
+        for x in range(-1, 2)
+        if x or y
+    ]
+    # keeps the bots of player 0 before the bots of player 1 when sorting by order
+    _PLAYER_ORDER = 1 << 40
+    _NO_ORDER = np.iinfo(np.int64).max
+
+    def __init__(
+            self,
+            policy1: BatchPolicy,
+            policy2: BatchPolicy,
+            count: int,
+            width: int = 16,
+            height: int = 16,
+            spawn_frame_interval: int = 10,
+            random_probability: float = 0.,
+            seed: Optional[int] = None,
+    ):
+        self.policies = [policy1, policy2]
+        self.count = count
+        self.width = width
+        self.height = height
+        self.spawn_frame_interval = spawn_frame_interval
+        self.random_probability = random_probability
+        self.rand = np.random.default_rng(seed)
+
+        shape = (count, height, width)
+        self.player = np.full(shape, -1, dtype=np.int8)
+        self.energy = np.zeros(shape, dtype=np.int32)
+        self.order = np.zeros(shape, dtype=np.int64)
+        self.spawn_points = [list(p) for p in Simulator.SPAWN_POINTS]
+        self.frame = 0
+        self.stats = {
+            key: np.zeros((count, 2), dtype=np.int64)
+            for key in Simulator.STATS
+        }
+        self._spawn_counter = 0
+
+        self.map = np.zeros((height, width), dtype=bool)
+        self.init_map()
+
+    def init_map(self):
+        self.map[0, :] = True
+        self.map[-1, :] = True
+        self.map[:, 0] = True
+        self.map[:, -1] = True
+        self.map[1, 1] = True
+        self.map[-2, 1] = True
+        self.map[-2, -2] = True
+        self.map[1, -2] = True
+
+    def num_bots(self) -> np.ndarray:
+        """
+        Number of bots per match and player as array of shape (count, 2)
+        """
+        return np.stack([
+            (self.player == p).sum(axis=(1, 2))
+            for p in range(len(self.policies))
+        ], axis=1)
+
+    def spawn(self):
+        for player_index, spawn_points in enumerate(self.spawn_points):
+            for x, y in spawn_points:
+                if not (0 <= x < self.width and 0 <= y < self.height) or self.map[y, x]:
+                    continue
+                occupied = np.nonzero(self.player[:, y, x] >= 0)[0]
+                self._add_stats("overspawned", occupied, self.player[occupied, y, x])
+                self.player[:, y, x] = player_index
+                self.energy[:, y, x] = 100
+                self.order[:, y, x] = self._spawn_counter
+                self._spawn_counter += 1
+
+    def step(self):
+        if self.frame % self.spawn_frame_interval == 0:
+            self.spawn()
+
+        if self.frame == 0:
+            self.frame += 1
+            return
+
+        action, direction = self._get_actions()
+
+        defend = action == self.DEFEND
+        m, y, x = np.nonzero(defend)
+        self._add_stats("defends", m, self.player[m, y, x])
+
+        self._apply_moves(action, direction, defend)
+        attacked = self._apply_attacks(action, direction, defend)
+
+        m, y, x = np.nonzero(defend & ~attacked)
+        self._add_stats("useless_defends", m, self.player[m, y, x])
+
+        died = (self.player >= 0) & (self.energy <= 0)
+        self.player[died] = -1
+        self.energy[died] = 0
+        self.order[died] = 0
+
+        self.frame += 1
+
+    def _add_stats(self, key: str, match: np.ndarray, player: np.ndarray, mask: Optional[np.ndarray] = None):
+        if mask is not None:
+            match, player = match[mask], player[mask]
+        np.add.at(self.stats[key], (match, player), 1)
+
+    def _get_actions(self) -> Tuple[np.ndarray, np.ndarray]:
+        action = np.full(self.player.shape, self.NONE, dtype=np.int8)
+        direction = np.zeros(self.player.shape, dtype=np.int8)
+        for player_index, policy in enumerate(self.policies):
+            a, d = policy.actions(self, player_index)
+            mask = self.player == player_index
+            action[mask] = a[mask]
+            direction[mask] = d[mask]
+
+        if self.random_probability:
+            randomize = (action != self.NONE) & (self.rand.random(action.shape) < self.random_probability)
+            action[randomize] = self.MOVE
+            direction[randomize] = self.rand.integers(
+                0, len(self.DIRECTIONS), size=np.count_nonzero(randomize), dtype=np.int8
+            )
+
+        return action, direction
+
+    def _action_order(self, m: np.ndarray, y: np.ndarray, x: np.ndarray) -> np.ndarray:
+        return self.player[m, y, x].astype(np.int64) * self._PLAYER_ORDER + self.order[m, y, x]
+
+    def _apply_moves(self, action: np.ndarray, direction: np.ndarray, defend: np.ndarray):
+        """
+        Resolves the moves like `Simulator.step` which processes the move targets
+        in order and each move only succeeds if the target is free at that time.
+        """
+        m, y, x = np.nonzero(action == self.MOVE)
+        if not len(m):
+            return
+        movers_player = self.player[m, y, x]
+        order = self._action_order(m, y, x)
+        dx, dy = self.DIRECTIONS[direction[m, y, x]].T
+        tx, ty = x + dx, y + dy
+
+        size = self.player.size
+        target = (m * self.height + ty) * self.width + tx
+        single = np.bincount(target, minlength=size)[target] == 1
+        possible = single & ~self.map[ty, tx]
+
+        # a target occupied by another mover is free
+        #   if that mover succeeded and was processed before
+        mover_index = np.full(size, -1, dtype=np.int64)
+        mover_index[(m * self.height + y) * self.width + x] = np.arange(len(m))
+        occupant = mover_index[target]
+        occupied = self.player[m, ty, tx] >= 0
+        success = possible & ~occupied
+        waiting = possible & occupied & (occupant >= 0)
+        occupant = np.maximum(occupant, 0)
+        waiting &= order[occupant] < order
+
+        while True:
+            new_success = success | (waiting & success[occupant])
+            if np.array_equal(new_success, success):
+                break
+            success = new_success
+
+        self._add_stats("moves", m, movers_player, success)
+        self._add_stats("failed_moves", m, movers_player, ~success)
+
+        m, y, x, ty, tx = m[success], y[success], x[success], ty[success], tx[success]
+        for array, empty in (
+                (self.player, -1),
+                (self.energy, 0),
+                (self.order, 0),
+                (action, self.NONE),
+                (direction, 0),
+                (defend, False),
+        ):
+            values = array[m, y, x]
+            array[m, y, x] = empty
+            array[m, ty, tx] = values
+
+    def _apply_attacks(self, action: np.ndarray, direction: np.ndarray, defend: np.ndarray) -> np.ndarray:
+        """
+        Applies attacks and explosions.
+
+        In `Simulator.step` both are processed in the order of the actions,
+        so the hits are sorted by the order of the acting bot and accumulated
+        for each victim. An explosion sets the energy of the exploding bot
+        to zero, after which every further hit counts as a kill.
+
+        :return: bool array of attacked bots
+        """
+        attacked = np.zeros(self.player.shape, dtype=bool)
+
+        # -- attacks --
+
+        m, y, x = np.nonzero(action == self.ATTACK)
+        attacker = self.player[m, y, x]
+        dx, dy = self.DIRECTIONS[direction[m, y, x]].T
+        ty, tx = y + dy, x + dx
+        victim = self.player[m, ty, tx]
+        hit = victim >= 0
+        self._add_stats("missed_attacks", m, attacker, ~hit)
+
+        m, y, x, ty, tx, attacker = m[hit], y[hit], x[hit], ty[hit], tx[hit], attacker[hit]
+        friendly = victim[hit] == attacker
+        damage = np.where(friendly, Simulator.FRIENDLY_ATTACK, Simulator.ATTACK)
+        damage //= np.where(defend[m, ty, tx], 2, 1)
+        attacked[m, ty, tx] = True
+        self._add_stats("self_attacks", m, attacker, friendly)
+        self._add_stats("enemy_attacks", m, attacker, ~friendly)
+
+        hits = [(m, ty, tx, self._action_order(m, y, x), damage, attacker, friendly)]
+
+        # -- explosions --
+
+        reset_order = np.full(self.player.shape, self._NO_ORDER, dtype=np.int64)
+        m, y, x = np.nonzero(action == self.EXPLODE)
+        attacker = self.player[m, y, x]
+        order = self._action_order(m, y, x)
+        reset_order[m, y, x] = order
+        self._add_stats("explosions", m, attacker)
+
+        for dx, dy in self._NEIGHBOURS:
+            ty, tx = y + dy, x + dx
+            victim = self.player[m, ty, tx]
+            hit = victim >= 0
+            hits.append((
+                m[hit], ty[hit], tx[hit], order[hit],
+                np.full(np.count_nonzero(hit), Simulator.EXPLODE_ATTACK),
+                attacker[hit], victim[hit] == attacker[hit],
+            ))
+
+        # -- accumulate hits per victim in order of the actions --
+
+        m, ty, tx, hit_order, damage, attacker, friendly = (
+            np.concatenate(a) for a in zip(*hits)
+        )
+        victim = (m * self.height + ty) * self.width + tx
+        sort = np.lexsort((hit_order, victim))
+        m, victim, hit_order, damage, attacker, friendly = (
+            a[sort] for a in (m, victim, hit_order, damage, attacker, friendly)
+        )
+        after_reset = hit_order > reset_order.ravel()[victim]
+
+        damage_sum = np.cumsum(damage)
+        if len(victim):
+            group_start = np.r_[True, victim[1:] != victim[:-1]]
+            start_index = np.maximum.accumulate(np.where(group_start, np.arange(len(victim)), 0))
+            damage_sum -= (damage_sum - damage)[start_index]
+
+        energy = self.energy.ravel()
+        killed = after_reset | (energy[victim] - damage_sum <= 0)
+        self._add_stats("self_kills", m, attacker, killed & friendly)
+        self._add_stats("enemy_kills", m, attacker, killed & ~friendly)
+
+        size = self.player.size
+        damage_before = np.bincount(victim[~after_reset], damage[~after_reset], minlength=size)
+        damage_after = np.bincount(victim[after_reset], damage[after_reset], minlength=size)
+        exploded = reset_order.ravel() != self._NO_ORDER
+        self.energy = (
+            np.where(exploded, 0, energy - damage_before.astype(np.int64))
+            - damage_after.astype(np.int64)
+        ).astype(np.int32).reshape(self.player.shape)
+
+        return attacked
@@ -48,14 +48,27 @@ class Action:
 class Bot:
     def __init__(self, code: str, player_id: int):
         args = code.split("-")
-        self.friend = args[0] == "F"
-        self.x, self.y = (int(a) - 1 for a in args[1].split(":"))
-        self.energy = int(args[2])
+        x, y = (int(a) - 1 for a in args[1].split(":"))
+        self._init(x, y, int(args[2]), args[0] == "F", player_id)
+
+    def _init(self, x: int, y: int, energy: int, friend: bool, player_id: int):
+        self.friend = friend
+        self.x, self.y = x, y
+        self.energy = energy
         self.player = player_id if self.friend else 1 - player_id
         self.index = 0
         # to test bots against themselves with slight modifications
         self.debug_switch = player_id == 0
 
+    @classmethod
+    def from_state(cls, x: int, y: int, energy: int, friend: bool, player_id: int) -> "Bot":
+        """
+        Create a bot without parsing the botwars.io string
+        """
+        bot = cls.__new__(cls)
+        bot._init(x, y, energy, friend, player_id)
+        return bot
+
     @property
     def pos(self) -> Tuple[int, int]:
         return self.x, self.y
@@ -95,23 +108,77 @@ class GameBase:
 
     The friendly bots must add their actions via .add_action() in the step() method.
 
+    `self.rand` is a `random.SystemRandom` unless a `seed` is passed,
+    which makes the round reproducible.
+
     """
     WIDTH = 16
     HEIGHT = 16
     MAX_DISTANCE = math.sqrt(WIDTH * WIDTH + HEIGHT * HEIGHT)
     MAX_MANHATTEN_DISTANCE = WIDTH + HEIGHT
 
-    def __init__(self, input: str):
+    def __init__(self, input: str, seed: Optional[int] = None):
         input_args = input.strip().split("#")
 
-        self.frame, self.max_frame, self.player_id = list(int(a) for a in input_args[0].split(","))[:3]
-        self.player_id -= 1
+        frame, max_frame, player_id = list(int(a) for a in input_args[0].split(","))[:3]
+        player_id -= 1
+
+        self._init(
+            frame, max_frame, player_id,
+            [
+                Bot(b, player_id)
+                for b in input_args[1].split(",")
+                if b
+            ],
+            input_args[2] if len(input_args) > 2 else "",
+            seed,
+        )
 
-        self.bots: List[Bot] = [
-            Bot(b, self.player_id)
-            for b in input_args[1].split(",")
-            if b
+    @classmethod
+    def from_state(
+            cls,
+            frame: int,
+            player: int,
+            bots: Iterable[Tuple[int, int, int, int]],
+            user_data: str = "",
+            max_frame: int = 100,
+            seed: Optional[int] = None,
+    ) -> "GameBase":
+        """
+        Create the round directly from the simulator state, without the string protocol.
+
+        :param frame: int, the current frame
+        :param player: int, starts at 0
+        :param bots: iterable of (x, y, energy, player) tuples, positions start at 0
+        :param user_data: str, user-data of the previous round
+        :param max_frame: int
+        :param seed: optional int, see `__init__`
+        """
+        bots = [
+            Bot.from_state(x, y, energy, bot_player == player, player)
+            for x, y, energy, bot_player in bots
         ]
+        game = cls.__new__(cls)
+        game._init(
+            frame, max_frame, player,
+            [b for b in bots if b.friend] + [b for b in bots if not b.friend],
+            user_data,
+            seed,
+        )
+        return game
+
+    def _init(
+            self,
+            frame: int,
+            max_frame: int,
+            player_id: int,
+            bots: List[Bot],
+            user_data: str,
+            seed: Optional[int],
+    ):
+        self.frame, self.max_frame, self.player_id = frame, max_frame, player_id
+
+        self.bots: List[Bot] = bots
         self.friends: List[Bot] = [b for b in self.bots if b.friend]
         self.enemies: List[Bot] = [b for b in self.bots if not b.friend]
         for i, b in enumerate(self.friends):
@@ -130,7 +197,7 @@ class GameBase:
             bot.pos: bot
             for bot in self.enemies
         }
-        self.rand = random.SystemRandom()
+        self.rand = random.SystemRandom() if seed is None else random.Random(seed)
         self.actions: List[Action] = []
         self.attacked_fields = []
         self.moved_fields = []
@@ -138,10 +205,7 @@ class GameBase:
         self._enemy_distance_map = None
         self._friend_distance_map = None
 
-        if len(input_args) > 2:
-            self.set_user_data(input_args[2])
-        else:
-            self.set_user_data("")
+        self.set_user_data(user_data)
 
     def log(self, *args, **kwargs):
         kwargs["file"] = sys.stderr
@@ -174,17 +238,28 @@ class GameBase:
 
     # ---- evolution interface ----
 
+    # Optional numeric genome, the (name, minimum, maximum) of each value.
+    # The values are the attributes of the same name, so declare their
+    # defaults as class attributes. The genome is a list of floats and
+    # can be evolved without bot instances, see src/evolution.py
+    GENOME: Sequence[Tuple[str, float, float]] = ()
+
     def get_genome(self) -> Any:
-        pass
+        if self.GENOME:
+            return [float(getattr(self, name)) for name, _, _ in self.GENOME]
 
     def set_genome(self, genome: Any):
-        pass
+        for (name, _, _), value in zip(self.GENOME, genome):
+            setattr(self, name, value)
 
     def mutate(self, amount: float, probability: float):
         """
         Interface for evolution. Both values in range [0, 1]
         """
-        pass
+        for name, minimum, maximum in self.GENOME:
+            if self.rand.random() < probability:
+                value = getattr(self, name) + self.rand.gauss(0, amount * (maximum - minimum))
+                setattr(self, name, min(maximum, max(minimum, value)))
 
     # -------------------------------------------------------
 
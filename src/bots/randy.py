@@ -1,5 +1,8 @@
 """
 A truly random bot
+
+The `attack` and `defend` probabilities of its numeric genome
+default to a bot that always attacks and never defends.
 """
 
 from src.bots.botbase import *
@@ -7,6 +10,12 @@ from src.bots.botbase import *
 
 class Game(GameBase):
 
+    GENOME = [("attack", 0., 1.), ("defend", 0., 1.)]
+    # probability to attack an adjacent enemy
+    attack = 1.
+    # probability to defend instead of a random move
+    defend = 0.
+
     def step(self):
         for bot in self.friends:
 
@@ -14,11 +23,15 @@ class Game(GameBase):
 
             for e in self.enemies:
                 if bot.distance(e) < 1.1:
-                    action = bot.action("A", bot.direction(e))
+                    if self.attack >= 1. or self.rand.random() < self.attack:
+                        action = bot.action("A", bot.direction(e))
                     break
 
             if not action:
-                action = bot.action("M", self.rand.choice(list(DIRECTIONS)))
+                if self.defend > 0. and self.rand.random() < self.defend:
+                    action = bot.action("D")
+                else:
+                    action = bot.action("M", self.rand.choice(list(DIRECTIONS)))
 
             self.add_action(action)
 
@@ -255,6 +255,8 @@ class GameState:
 class Game(GameBase):
 
     def step(self):
+        # use the (possibly seeded) random generator of the round
+        GameState.rand = self.rand
 
         state = GameState(
             GameState.BotState(b.x, b.y, b.energy, b.friend)
@@ -0,0 +1,166 @@
+"""
+On-disk cache of match results.
+
+Results are stored in a sqlite database which can be shared by
+many worker processes. The key is a hash of everything that determines
+the outcome of a match, see `match_key`. Only reproducible matches,
+which means seeded matches between GameBase modules, are cached.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from pathlib import Path
+from typing import Optional, Union
+
+from .simulator import Simulator
+
+
+_file_hashes = {}
+
+
+def file_hash(filename: Union[str, Path]) -> str:
+    """
+    sha256 of the file content, cached as long as the file is unmodified
+    """
+    filename = Path(filename).resolve()
+    mtime = filename.stat().st_mtime_ns
+    cached = _file_hashes.get(filename)
+    if cached is None or cached[0] != mtime:
+        cached = mtime, hashlib.sha256(filename.read_bytes()).hexdigest()
+        _file_hashes[filename] = cached
+    return cached[1]
+
+
+def match_key(sim: Simulator, num_frames: int = 100) -> Optional[str]:
+    """
+    Hash of the bot sources and genomes, the rules engine, the
+    simulator parameters, the seed of a newly created Simulator and
+    the number of frames to run.
+
+    Returns None if the match is not reproducible, which is the case
+    without a seed, with file bots or with an enforced time budget.
+    """
+    if sim.seed is None or not all(sim.bot_modules):
+        return None
+    if sim.time_budget is not None and sim.budget_policy != "flag":
+        return None
+
+    src_path = Path(__file__).resolve().parent
+    h = hashlib.sha256()
+    for fn in (src_path / "simulator.py", src_path / "bots" / "botbase.py"):
+        h.update(file_hash(fn).encode())
+    for fn, genome in zip(sim.bot_files, sim.bot_genomes):
+        h.update(file_hash(fn).encode())
+        h.update(repr(genome).encode())
+    h.update(json.dumps([
+        sim.width, sim.height, sim.spawn_frame_interval, sim.random_probability, sim.seed, num_frames,
+    ]).encode())
+    return h.hexdigest()
+
+
+class MatchCache:
+    """
+    Least-recently-used store of match results, keyed by `match_key`.
+
+    The database connection is opened lazily, so instances can be
+    passed to worker processes.
+
+    :param filename: str or Path of the sqlite database
+    :param max_entries: int, the least recently used results above this number are removed
+    """
+
+    def __init__(self, filename: Union[str, Path], max_entries: int = 100_000):
+        self.filename = Path(filename)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._num_puts = 0
+        self._db: Optional[sqlite3.Connection] = None
+
+    def __getstate__(self):
+        return {**self.__dict__, "_db": None}
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(self.filename.parent, exist_ok=True)
+            self._db = sqlite3.connect(str(self.filename), timeout=60, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results"
+                " (key TEXT PRIMARY KEY, value TEXT NOT NULL, used INTEGER NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def get(self, key: str) -> Optional[dict]:
+        row = self.db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.db.execute("UPDATE results SET used = ? WHERE key = ?", (time.time_ns(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, value: dict):
+        self.db.execute(
+            "INSERT OR REPLACE INTO results (key, value, used) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time_ns()),
+        )
+        self._num_puts += 1
+        if self._num_puts % 100 == 0:
+            self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used results above `max_entries`
+        """
+        count, = self.db.execute("SELECT COUNT(*) FROM results").fetchone()
+        if count > self.max_entries:
+            self.db.execute(
+                "DELETE FROM results WHERE key IN"
+                " (SELECT key FROM results ORDER BY used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+def run_match(sim: Simulator, cache: Optional[MatchCache] = None, num_frames: int = 100) -> dict:
+    """
+    Run a newly created Simulator, or look up the result in the `cache`.
+
+    Returns a dict with the `num_bots` per player and the simulator `stats`.
+    The Simulator is not run on a cache hit, otherwise the dict also
+    contains the `timings` and `overruns` of the Simulator.
+    """
+    key = match_key(sim, num_frames) if cache is not None else None
+    if key is not None:
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+    for _ in range(num_frames):
+        sim.step()
+    sim.close()
+
+    result = {
+        "num_bots": sim.num_bots(),
+        "stats": sim.stats,
+    }
+    if key is not None:
+        cache.put(key, result)
+    return {
+        **result,
+        "timings": sim.timings,
+        "overruns": sim.overruns,
+    }
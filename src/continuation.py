@@ -0,0 +1,58 @@
+"""
+Run many continuations of a match from a snapshot, e.g. to answer
+"how often does bot A win from frame 40 if it switches strategies?"
+"""
+import random
+from multiprocessing import Pool
+from typing import Optional, List
+
+from .simulator import Simulator, SimulatorSnapshot, derive_seed
+from .cache import run_match
+
+
+def run_continuations(
+        sim: Simulator,
+        count: int,
+        num_frames: Optional[int] = None,
+        seed: Optional[int] = None,
+        num_processes: int = 8,
+        **kwargs,
+) -> List[dict]:
+    """
+    Play `count` continuations of the current state of `sim`.
+
+    Each continuation runs headless with its own seed, derived from `seed`
+    or from the global random module. Any keyword arguments replace the
+    Simulator's constructor arguments like in `Simulator.fork()`.
+
+    :param num_frames: int, number of frames to run, defaults to the end of the match at frame 100
+    :return: list of dicts with `num_bots` and `stats` like `run_match`
+    """
+    if num_frames is None:
+        num_frames = max(0, 100 - sim.frame)
+
+    sim = sim.fork(**{**kwargs, "headless": True})
+    params = sim.params()
+    # each continuation gets a new seed
+    snapshot = sim.snapshot()._replace(rand_state=None)
+
+    tasks = [
+        (
+            params,
+            snapshot,
+            derive_seed(seed, i) if seed is not None else random.getrandbits(64),
+            num_frames,
+        )
+        for i in range(count)
+    ]
+    if num_processes < 2:
+        return [_run_continuation(*task) for task in tasks]
+
+    with Pool(num_processes) as pool:
+        return pool.starmap(_run_continuation, tasks)
+
+
+def _run_continuation(params: dict, snapshot: SimulatorSnapshot, seed: int, num_frames: int) -> dict:
+    sim = Simulator(**{**params, "seed": seed})
+    sim.restore(snapshot)
+    return run_match(sim, num_frames=num_frames)
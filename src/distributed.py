@@ -0,0 +1,324 @@
+"""
+Run matches on worker processes of other machines.
+
+The `Coordinator` listens on a TCP port and hands out match
+descriptors: the sha256 and name of both bot files, their genomes,
+the seed, the simulator parameters and the number of frames. Workers
+(see `run_worker` and `worker.py`) connect, fetch the sources of bot
+files they have not seen yet, run the matches and send back the
+result of `cache.run_match`.
+
+Workers can join and leave at any time. The matches of a worker whose
+connection is closed are handed out again, as are matches that run
+longer than the optional `lease_timeout`, e.g. of a machine that
+dropped off the network. Results of matches that are already
+finished are ignored.
+
+Messages are pickled tuples sent through `multiprocessing.connection`,
+which authenticates both sides with the `authkey`. The coordinator
+generates a random authkey unless one is given, there is no default
+key, because a pickle can execute code. Only connect machines that
+you trust.
+
+Worker processes must run in the root directory of this repository,
+the bot sources are stored below `cache_dir`, relative to it, so
+they can be imported like the bundled bots.
+"""
+import os
+import sys
+import time
+import queue
+import socket
+import secrets
+import itertools
+import threading
+import traceback
+from pathlib import Path
+from collections import deque
+from multiprocessing.connection import Listener, Client, Connection
+from typing import Optional, Union, List, Tuple, Dict, Iterable, Generator, Sequence, Any
+
+from .simulator import Simulator
+from .cache import file_hash, run_match
+
+
+DEFAULT_PORT = 50023
+
+
+def parse_address(address: Union[str, int], default_host: str = "localhost") -> Tuple[str, int]:
+    """
+    Convert `[host:]port` to a (host, port) tuple
+    """
+    address = str(address)
+    if ":" in address:
+        host, port = address.rsplit(":", 1)
+        return host or default_host, int(port)
+    return default_host, int(address)
+
+
+class Coordinator:
+    """
+    Hands out matches to the connected workers, use as context manager.
+
+    :param address: (host, port) to listen on, port 0 picks a free port,
+        see the `address` attribute for the actual one
+    :param authkey: str, shared secret of coordinator and workers,
+        defaults to a random key, see the `authkey` attribute
+    :param lease_timeout: optional float, seconds after which a running
+        match is handed out again
+    """
+
+    def __init__(
+            self,
+            address: Tuple[str, int] = ("", DEFAULT_PORT),
+            authkey: Optional[str] = None,
+            lease_timeout: Optional[float] = None,
+    ):
+        self.lease_timeout = lease_timeout
+        self.authkey = authkey or secrets.token_urlsafe(16)
+        self._listener = Listener(address, authkey=self.authkey.encode())
+        self.address: Tuple[str, int] = self._listener.address
+        self._lock = threading.Condition()
+        self._ids = itertools.count()
+        # sha256 -> (file name, source)
+        self._sources: Dict[str, Tuple[str, str]] = {}
+        # unfinished tasks, id -> descriptor
+        self._tasks: Dict[int, dict] = {}
+        self._pending = deque()
+        # task id -> (worker name, start time)
+        self._leases: Dict[int, Tuple[str, float]] = {}
+        self._results = queue.Queue()
+        self.workers: List[str] = []
+        self._closed = False
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._closed = True
+        self._listener.close()
+        with self._lock:
+            self._lock.notify_all()
+
+    @property
+    def num_workers(self) -> int:
+        return len(self.workers)
+
+    def match_task(
+            self,
+            bot_files: Sequence[Union[str, Path]],
+            genomes: Sequence[Any] = (None, None),
+            seed: Optional[int] = None,
+            num_frames: int = 100,
+            **sim_params,
+    ) -> dict:
+        """
+        Return the descriptor of a match for `imap`.
+
+        `sim_params` are further arguments of the Simulator. A genome of
+        None keeps the default genome of the bot.
+        """
+        bots = []
+        for fn in bot_files:
+            hash = file_hash(fn)
+            if hash not in self._sources:
+                self._sources[hash] = (Path(fn).name, Path(fn).read_text())
+            bots.append((hash, Path(fn).name))
+        return {
+            "bots": bots,
+            "genomes": list(genomes),
+            "seed": seed,
+            "num_frames": num_frames,
+            "sim_params": sim_params,
+        }
+
+    def imap(self, tasks: Iterable[dict]) -> Generator[Tuple[int, dict], None, None]:
+        """
+        Run the matches on the workers and yield the index of the task
+        and the result of `run_match` in the order they are finished.
+
+        The result also contains the `profile` dict of a profiling
+        Simulator. Unfinished matches are cancelled when the
+        generator is closed.
+        """
+        ids = {}
+        with self._lock:
+            for index, task in enumerate(tasks):
+                id = next(self._ids)
+                ids[id] = index
+                self._tasks[id] = task
+                self._pending.append(id)
+            self._lock.notify_all()
+
+        try:
+            while ids:
+                id, result, error = self._results.get()
+                index = ids.pop(id, None)
+                if index is None:
+                    continue
+                if error:
+                    raise RuntimeError(f"match failed on worker:\n{error}")
+                yield index, result
+        finally:
+            with self._lock:
+                for id in ids:
+                    self._tasks.pop(id, None)
+                    self._leases.pop(id, None)
+                self._pending = deque(id for id in self._pending if id in self._tasks)
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except Exception:
+                # authentication errors or the closed listener
+                continue
+            threading.Thread(target=self._serve, args=(conn, ), daemon=True).start()
+
+    def _serve(self, conn: Connection):
+        worker = None
+        try:
+            while not self._closed:
+                message = conn.recv()
+                command = message[0]
+
+                if command == "hello":
+                    worker = message[1]
+                    with self._lock:
+                        self.workers.append(worker)
+                    conn.send(None)
+
+                elif command == "task":
+                    conn.send(self._lease(worker))
+
+                elif command == "source":
+                    conn.send(self._sources.get(message[1]))
+
+                elif command in ("result", "error"):
+                    _, id, value = message
+                    with self._lock:
+                        if id in self._tasks:
+                            del self._tasks[id]
+                            self._leases.pop(id, None)
+                            if command == "result":
+                                self._results.put((id, value, None))
+                            else:
+                                self._results.put((id, None, f"{worker}: {value}"))
+                    conn.send(None)
+
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+            with self._lock:
+                if worker in self.workers:
+                    self.workers.remove(worker)
+                # hand out the matches of this worker again
+                for id, (w, _) in list(self._leases.items()):
+                    if w == worker:
+                        del self._leases[id]
+                        if id in self._tasks:
+                            self._pending.appendleft(id)
+                self._lock.notify_all()
+
+    def _lease(self, worker: str, timeout: float = 1.) -> Optional[Tuple[int, dict]]:
+        """
+        Wait up to `timeout` seconds for a pending task
+        """
+        with self._lock:
+            if self.lease_timeout is not None:
+                now = time.monotonic()
+                for id, (w, start) in list(self._leases.items()):
+                    if now - start > self.lease_timeout:
+                        del self._leases[id]
+                        self._pending.append(id)
+
+            if not self._pending:
+                self._lock.wait(timeout)
+            while self._pending:
+                id = self._pending.popleft()
+                if id in self._tasks:
+                    self._leases[id] = (worker, time.monotonic())
+                    return id, self._tasks[id]
+
+
+def run_task(task: dict, cache_dir: Union[str, Path], fetch_source) -> dict:
+    """
+    Run a match descriptor of `Coordinator.match_task`.
+
+    :param cache_dir: directory of the bot sources, relative to the working directory
+    :param fetch_source: callable that returns the (name, source) of a sha256
+    """
+    files = []
+    for hash, name in task["bots"]:
+        fn = Path(cache_dir) / f"b{hash[:16]}" / name
+        if not fn.exists():
+            _, source = fetch_source(hash)
+            os.makedirs(fn.parent, exist_ok=True)
+            tmp = fn.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(source)
+            tmp.replace(fn)
+        files.append(fn)
+
+    sim = Simulator(*files, **task["sim_params"], headless=True, seed=task["seed"])
+    for i, genome in enumerate(task["genomes"]):
+        if genome is not None:
+            sim.bot_genomes[i] = genome
+
+    result = run_match(sim, num_frames=task["num_frames"])
+    result["profile"] = sim.profiler.to_dict() if sim.profiler else None
+    return result
+
+
+def run_worker(
+        address: Tuple[str, int],
+        authkey: str,
+        cache_dir: Union[str, Path] = "remote_bots",
+        retry_interval: float = 2.,
+        once: bool = False,
+):
+    """
+    Connect to a Coordinator and run matches until the process is stopped.
+
+    The worker waits for the coordinator to start and reconnects when it
+    is restarted. With `once` it returns when the first coordinator
+    closes the connection.
+    """
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    while True:
+        try:
+            conn = Client(address, authkey=authkey.encode())
+        except (ConnectionRefusedError, ConnectionResetError, EOFError):
+            time.sleep(retry_interval)
+            continue
+
+        def request(*message):
+            conn.send(message)
+            return conn.recv()
+
+        try:
+            request("hello", name)
+            while True:
+                lease = request("task")
+                if lease is None:
+                    continue
+                id, task = lease
+                try:
+                    result = run_task(task, cache_dir, lambda hash: request("source", hash))
+                except Exception:
+                    request("error", id, traceback.format_exc())
+                else:
+                    request("result", id, result)
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+        if once:
+            return
+        print(f"worker {name}: connection to {address[0]}:{address[1]} closed", file=sys.stderr)
@@ -0,0 +1,163 @@
+"""
+Evolution of numeric genomes.
+
+A `GameBase` subclass that declares `GENOME` has a fixed-length list of
+floats as genome. `GenomeSpace` holds the bounds and mutates and crosses
+whole populations as matrices, without creating bot instances.
+`CMAES` proposes a new generation from the fitness of the previous one.
+"""
+import math
+from typing import Optional, List, Sequence, Type
+
+import numpy as np
+
+from .bots.botbase import GameBase
+
+
+class GenomeSpace:
+    """
+    The bounds of the numeric genome of a GameBase class
+    """
+
+    def __init__(self, names: Sequence[str], lower: Sequence[float], upper: Sequence[float]):
+        self.names = list(names)
+        self.lower = np.asarray(lower, dtype=np.float64)
+        self.upper = np.asarray(upper, dtype=np.float64)
+
+    @classmethod
+    def of(cls, klass: Type[GameBase]) -> Optional["GenomeSpace"]:
+        """
+        The space of the class or None if it does not declare a numeric `GENOME`
+        """
+        genome = getattr(klass, "GENOME", None)
+        if not genome:
+            return None
+        names, lower, upper = zip(*genome)
+        return cls(names, lower, upper)
+
+    @property
+    def size(self) -> int:
+        return len(self.names)
+
+    def to_array(self, genomes: Sequence[Sequence[float]]) -> np.ndarray:
+        return np.asarray(genomes, dtype=np.float64).reshape(-1, self.size)
+
+    def to_genomes(self, matrix: np.ndarray) -> List[List[float]]:
+        """
+        One list of python floats per row, inside the bounds
+        """
+        return np.clip(matrix, self.lower, self.upper).tolist()
+
+    def normalize(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Scale the values to [0, 1]
+        """
+        return (matrix - self.lower) / np.maximum(self.upper - self.lower, 1e-12)
+
+    def denormalize(self, matrix: np.ndarray) -> np.ndarray:
+        return self.lower + np.clip(matrix, 0., 1.) * (self.upper - self.lower)
+
+    def mutate(
+            self,
+            matrix: np.ndarray,
+            rng: np.random.Generator,
+            amount: float = .2,
+            probability: float = .4,
+    ) -> np.ndarray:
+        """
+        Add gaussian noise with a standard deviation of `amount` times the
+        range to each value with the given `probability`. At least one
+        value of each row is changed.
+        """
+        mask = rng.random(matrix.shape) < probability
+        mask[np.arange(len(matrix)), rng.integers(0, self.size, len(matrix))] = True
+        noise = rng.normal(0., 1., matrix.shape) * amount * (self.upper - self.lower)
+        return np.clip(matrix + mask * noise, self.lower, self.upper)
+
+    def crossover(self, matrix_a: np.ndarray, matrix_b: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """
+        Uniform crossover, each value is taken from either row with equal probability
+        """
+        return np.where(rng.random(matrix_a.shape) < .5, matrix_a, matrix_b)
+
+
+class CMAES:
+    """
+    Covariance matrix adaptation evolution strategy, maximizes the fitness.
+
+    Works in the normalized space [0, 1] of a `GenomeSpace`. Call `ask`
+    for a new population and `tell` with the evaluated population.
+    `tell` accepts any number of (at least two) solutions, the better
+    half is used for the update.
+
+    :param mean: initial mean, a vector in [0, 1]
+    :param sigma: initial step size
+    :param population_size: number of solutions per `ask`
+    :param seed: optional int for reproducible solutions
+    """
+
+    def __init__(
+            self,
+            mean: Sequence[float],
+            sigma: float = .3,
+            population_size: Optional[int] = None,
+            seed: Optional[int] = None,
+    ):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.dim = len(self.mean)
+        self.sigma = sigma
+        self.population_size = population_size or 4 + int(3 * math.log(self.dim))
+        self.rng = np.random.default_rng(seed)
+        self.C = np.eye(self.dim)
+        self.B = np.eye(self.dim)
+        self.D = np.ones(self.dim)
+        self.ps = np.zeros(self.dim)
+        self.pc = np.zeros(self.dim)
+        self.generation = 0
+        self.chi_n = math.sqrt(self.dim) * (1. - 1. / (4. * self.dim) + 1. / (21. * self.dim ** 2))
+
+    def ask(self) -> np.ndarray:
+        """
+        A matrix of `population_size` solutions, one per row
+        """
+        z = self.rng.standard_normal((self.population_size, self.dim))
+        return np.clip(self.mean + self.sigma * (z * self.D) @ self.B.T, 0., 1.)
+
+    def tell(self, solutions: np.ndarray, fitness: Sequence[float]):
+        solutions = np.asarray(solutions, dtype=np.float64)
+        n, dim = len(solutions), self.dim
+        mu = max(1, n // 2)
+        weights = np.log(mu + .5) - np.log(np.arange(1, mu + 1))
+        weights /= weights.sum()
+        mueff = 1. / np.sum(weights ** 2)
+
+        cc = (4. + mueff / dim) / (dim + 4. + 2. * mueff / dim)
+        cs = (mueff + 2.) / (dim + mueff + 5.)
+        c1 = 2. / ((dim + 1.3) ** 2 + mueff)
+        cmu = min(1. - c1, 2. * (mueff - 2. + 1. / mueff) / ((dim + 2.) ** 2 + mueff))
+        damps = 1. + 2. * max(0., math.sqrt((mueff - 1.) / (dim + 1.)) - 1.) + cs
+
+        best = solutions[np.argsort(-np.asarray(fitness, dtype=np.float64))[:mu]]
+        old_mean = self.mean
+        self.mean = weights @ best
+        y_mean = (self.mean - old_mean) / self.sigma
+
+        # C^-1/2 * y_mean
+        inv_sqrt = self.B @ ((self.B.T @ y_mean) / self.D)
+        self.ps = (1. - cs) * self.ps + math.sqrt(cs * (2. - cs) * mueff) * inv_sqrt
+        self.generation += 1
+        ps_norm = np.linalg.norm(self.ps)
+        hsig = ps_norm / math.sqrt(1. - (1. - cs) ** (2 * self.generation)) / self.chi_n < 1.4 + 2. / (dim + 1.)
+        self.pc = (1. - cc) * self.pc + hsig * math.sqrt(cc * (2. - cc) * mueff) * y_mean
+
+        y = (best - old_mean) / self.sigma
+        self.C = (
+            (1. - c1 - cmu) * self.C
+            + c1 * (np.outer(self.pc, self.pc) + (1. - hsig) * cc * (2. - cc) * self.C)
+            + cmu * (y.T * weights) @ y
+        )
+        self.sigma *= math.exp((cs / damps) * (ps_norm / self.chi_n - 1.))
+
+        self.C = (self.C + self.C.T) / 2.
+        eigenvalues, self.B = np.linalg.eigh(self.C)
+        self.D = np.sqrt(np.maximum(eigenvalues, 1e-20))
@@ -0,0 +1,69 @@
+"""
+Long-lived host process for file-based bots.
+
+Started by the Simulator with the path of a bot file. It reads framed
+payloads from stdin, executes the bot file with fresh module globals,
+stdin set to the payload and stdout captured, and writes the captured
+output back as a frame.
+
+A frame is the payload length in bytes as decimal number,
+a newline and the utf-8 encoded payload.
+
+Imported modules stay loaded between rounds which is what makes it fast
+but also means that module-level state of *imported* modules survives.
+Use the cold-spawn mode of the Simulator for strict fidelity.
+"""
+import io
+import sys
+import runpy
+import traceback
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+
+def read_frame(fp: BinaryIO) -> Optional[str]:
+    line = fp.readline()
+    if not line:
+        return None
+    size = int(line)
+    data = fp.read(size)
+    return data.decode()
+
+
+def write_frame(fp: BinaryIO, data: str):
+    data = data.encode()
+    fp.write(f"{len(data)}\n".encode() + data)
+    fp.flush()
+
+
+def run_bot(filename: str, input: str) -> str:
+    stdin, stdout, argv = sys.stdin, sys.stdout, sys.argv
+    sys.stdin = io.StringIO(input)
+    sys.stdout = io.StringIO()
+    sys.argv = [filename]
+    try:
+        runpy.run_path(filename, run_name="__main__")
+    except SystemExit:
+        pass
+    except:
+        traceback.print_exc(file=sys.stderr)
+    finally:
+        output = sys.stdout.getvalue()
+        sys.stdin, sys.stdout, sys.argv = stdin, stdout, argv
+    return output
+
+
+def main(filename: str):
+    filename = str(Path(filename).resolve())
+    sys.path[0] = str(Path(filename).parent)
+
+    fp_in, fp_out = sys.stdin.buffer, sys.stdout.buffer
+    while True:
+        input = read_frame(fp_in)
+        if input is None:
+            break
+        write_frame(fp_out, run_bot(filename, input))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1])
@@ -0,0 +1,246 @@
+"""
+Island model evolution.
+
+Each island is a `BotPool` with its own population, scheduler and
+seed, evolved in its own process, so K islands use K cores. The islands
+only synchronise every `migration_interval` generations: each sends its
+best entries to the `IslandModel`, which passes the best `num_migrants`
+of them on to the next island in a ring, where they replace the newest
+offspring. The model keeps a hall of fame of the best entries of all
+islands.
+
+The fitness of entries of different islands is measured against
+different opponents, so the hall of fame ranking is only a hint.
+"""
+import traceback
+from pathlib import Path
+from multiprocessing import Process, Pipe
+from multiprocessing.connection import Connection
+from typing import Optional, Union, List, Dict, Tuple, Sequence, Any
+
+import tabulate
+
+from .pool import BotPool
+from .cache import MatchCache
+from .simulator import derive_seed
+from .schedule import PairingScheduler, AllPairsScheduler
+
+
+def island_filename(filename: Union[str, Path], index: int) -> Path:
+    """
+    The checkpoint file of an island, e.g. `pool-island2.pkl` for `pool.pkl`
+    """
+    filename = Path(filename)
+    return filename.with_name(f"{filename.stem}-island{index}{filename.suffix}")
+
+
+class IslandModel:
+    """
+    Runs `num_islands` BotPools in separate processes, use as context manager.
+
+    :param bot_files: the bot files of each pool, see `BotPool.add_bot_file`
+    :param num_islands: int, number of islands and processes
+    :param population_size: int, size of the population of each island
+    :param migration_interval: int, number of generations between migrations
+    :param num_migrants: int, number of the best entries of an island that
+        migrate to the next one
+    :param scheduler: PairingScheduler of the islands, each island uses a copy
+    :param optimizer: str, 'ga' for `BotPool.select_population` or
+        'cma' for `BotPool.select_population_cma`
+    :param seed: optional int, the seed of each island is derived from it
+    :param cache: optional MatchCache shared by the islands
+    :param checkpoint_file: optional filename, each island saves its pool
+        after each migration to the `island_filename` of it and continues
+        from there when it exists
+    :param hall_of_fame_size: int, number of entries in the hall of fame
+    """
+
+    def __init__(
+            self,
+            bot_files: Sequence[Union[str, Path]],
+            num_islands: int = 4,
+            population_size: int = 10,
+            migration_interval: int = 5,
+            num_migrants: int = 2,
+            scheduler: Optional[PairingScheduler] = None,
+            optimizer: str = "ga",
+            seed: Optional[int] = None,
+            cache: Optional[MatchCache] = None,
+            checkpoint_file: Optional[Union[str, Path]] = None,
+            hall_of_fame_size: int = 10,
+    ):
+        self.num_islands = num_islands
+        self.migration_interval = migration_interval
+        self.num_migrants = num_migrants
+        self.hall_of_fame_size = hall_of_fame_size
+        # (island, id) -> the last received copy of the entry
+        self._hall_of_fame: Dict[Tuple[int, Any], dict] = {}
+        # summaries of the islands after the last migration
+        self.summaries: List[dict] = []
+        self._connections: List[Connection] = []
+        self._processes: List[Process] = []
+
+        for index in range(num_islands):
+            settings = {
+                "bot_files": [str(fn) for fn in bot_files],
+                "population_size": population_size,
+                "num_best": max(1, hall_of_fame_size, num_migrants),
+                "scheduler": scheduler or AllPairsScheduler(),
+                "optimizer": optimizer,
+                "seed": None if seed is None else derive_seed(seed, "island", index),
+                "cache": cache,
+                "checkpoint_file": island_filename(checkpoint_file, index) if checkpoint_file else None,
+            }
+            conn, child_conn = Pipe()
+            process = Process(target=_run_island, args=(child_conn, settings), daemon=True)
+            process.start()
+            child_conn.close()
+            self._connections.append(conn)
+            self._processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        for conn in self._connections:
+            try:
+                conn.send(("stop", ))
+            except OSError:
+                pass
+            conn.close()
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._connections = []
+        self._processes = []
+
+    @property
+    def hall_of_fame(self) -> List[dict]:
+        """
+        The best entries received from all islands, the best first.
+        Each has the additional key `island`.
+        """
+        return sorted(self._hall_of_fame.values(), key=lambda p: p["fitness"], reverse=True)
+
+    def run(self, generations: int = 100):
+        """
+        Evolve each island for the number of generations, with a
+        migration every `migration_interval` generations
+        """
+        migrants = [[] for _ in range(self.num_islands)]
+        done = 0
+        while done < generations:
+            count = min(self.migration_interval, generations - done)
+            for index, conn in enumerate(self._connections):
+                try:
+                    conn.send(("run", count, migrants[index], f"island{(index - 1) % self.num_islands}"))
+                except OSError:
+                    # the island failed, its error message is received below
+                    pass
+
+            self.summaries = []
+            best = []
+            for index, conn in enumerate(self._connections):
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    raise RuntimeError(f"island {index} exited")
+                if message[0] == "error":
+                    raise RuntimeError(f"island {index} failed:\n{message[1]}")
+                _, summary, entries = message
+                self.summaries.append({"island": index, **summary})
+                best.append(entries)
+                for entry in entries:
+                    self._hall_of_fame[(index, entry["id"])] = {**entry, "island": index}
+
+            self._hall_of_fame = {
+                (p["island"], p["id"]): p
+                for p in self.hall_of_fame[:self.hall_of_fame_size]
+            }
+            # the ring, island i receives the best of island i - 1
+            if self.num_islands > 1:
+                migrants = [best[index - 1][:self.num_migrants] for index in range(self.num_islands)]
+            done += count
+            self.dump_summaries()
+
+    def dump_summaries(self):
+        print(tabulate.tabulate(self.summaries, headers="keys", tablefmt="presto") + "\n")
+
+    def dump_hall_of_fame(self):
+        rows = []
+        for p in self.hall_of_fame:
+            rows.append({
+                "island": p["island"],
+                "gen.": p["generation"],
+                "id": p["id"],
+                "parent": p["parent"],
+                "file": Path(p["file"]).name,
+                "matches": p["stats"].get("matches", 0),
+                "fitness": p["fitness"],
+                "genome": str(p["genome"])[:30],
+            })
+        print(tabulate.tabulate(rows, headers="keys", tablefmt="presto") + "\n")
+
+
+def _run_island(conn: Connection, settings: dict):
+    """
+    Process of an island, answers each `run` message with its summary and best entries
+    """
+    pool = None
+    try:
+        filename = settings["checkpoint_file"]
+        if filename and filename.exists():
+            pool = BotPool.load(filename)
+            evaluated = True
+        else:
+            pool = BotPool(seed=settings["seed"])
+            evaluated = False
+        pool.num_processes = 1
+        pool.verbose = False
+        pool.scheduler = settings["scheduler"]
+        pool.cache = settings["cache"]
+        if not evaluated:
+            pool.add_bot_file(*settings["bot_files"])
+            pool.create_population(count=settings["population_size"])
+            pool.evaluate()
+
+        while True:
+            message = conn.recv()
+            if message[0] == "stop":
+                break
+            _, generations, migrants, origin = message
+
+            for i in range(generations):
+                if settings["optimizer"] == "cma":
+                    pool.select_population_cma(count=settings["population_size"])
+                else:
+                    pool.select_population(count=settings["population_size"])
+                if i == 0 and migrants:
+                    pool.add_migrants(migrants, origin=origin)
+                pool.evaluate()
+
+            if filename:
+                pool.save(filename)
+
+            evolvables = [p for p in pool.population.values() if p["evolution"]]
+            fitnesses = [p["fitness"] for p in pool.population.values()]
+            summary = {
+                "generation": pool.generation,
+                "best": max(fitnesses),
+                "mean": sum(fitnesses) / len(fitnesses),
+            }
+            best = sorted(evolvables, key=lambda p: p["fitness"], reverse=True)[:settings["num_best"]]
+            conn.send(("done", summary, best))
+
+    except (EOFError, KeyboardInterrupt):
+        pass
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        if pool is not None:
+            pool.close()
+        conn.close()
@@ -0,0 +1,104 @@
+import time
+from typing import Optional, List, Tuple, Sequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .simulator import Simulator, Bot
+
+
+class SimulatorObserver:
+    """
+    Receives the events of a `Simulator` match.
+
+    Attach with `Simulator.add_observer()`. All methods do nothing by default.
+    """
+
+    def on_frame_start(self, sim: "Simulator"):
+        pass
+
+    def on_spawn(self, sim: "Simulator", bots: List["Bot"]):
+        pass
+
+    def on_actions(self, sim: "Simulator", actions: List[Tuple["Bot", str, Sequence[str]]]):
+        """
+        Called with the valid (bot, command, args) actions of the frame before they are applied
+        """
+        pass
+
+    def on_move(self, sim: "Simulator", bot: "Bot", from_pos: Tuple[int, int]):
+        pass
+
+    def on_attack(self, sim: "Simulator", bot: "Bot", other: Optional["Bot"]):
+        """
+        Called for each attack, `other` is None if the attack missed
+        """
+        pass
+
+    def on_explode(self, sim: "Simulator", bot: "Bot", others: List["Bot"]):
+        pass
+
+    def on_death(self, sim: "Simulator", bots: List["Bot"]):
+        pass
+
+    def on_frame_end(self, sim: "Simulator"):
+        """
+        Called at the end of each frame, before `sim.frame` is increased
+        """
+        pass
+
+
+class LogObserver(SimulatorObserver):
+    """
+    Collects the log lines of the current frame
+    """
+
+    def __init__(self):
+        self.log_lines = []
+
+    def on_frame_start(self, sim: "Simulator"):
+        self.log_lines = [f"frame: {sim.frame}"]
+
+    def on_spawn(self, sim: "Simulator", bots: List["Bot"]):
+        self.log_lines.append("spawned")
+
+    def on_attack(self, sim: "Simulator", bot: "Bot", other: Optional["Bot"]):
+        if other:
+            self.log_lines.append(
+                f"{bot.color}{bot} attacked {other.color}{other}{sim.COLOR_OFF}"
+            )
+
+    def on_explode(self, sim: "Simulator", bot: "Bot", others: List["Bot"]):
+        self.log_lines.append(f"{sim.COLOR_RED}{bot} exploded{sim.COLOR_OFF}")
+
+    def on_death(self, sim: "Simulator", bots: List["Bot"]):
+        self.log_lines.append("died: " + ", ".join(str(b) for b in bots))
+
+    def on_frame_end(self, sim: "Simulator"):
+        # the first frame only spawns
+        if not sim.frame:
+            return
+        self.log_lines.append("attacks (e/f): " + " ".join(
+            f"{e}/{f}"
+            for e, f in zip(sim.stats["enemy_attacks"], sim.stats["self_attacks"])
+        ))
+        self.log_lines.append("kills (e/f): " + " ".join(
+            f"{e}/{f}"
+            for e, f in zip(sim.stats["enemy_kills"], sim.stats["self_kills"])
+        ))
+        self.log_lines.append("bots: " + " ".join(str(n) for n in sim.num_bots()))
+
+
+class PrintObserver(SimulatorObserver):
+    """
+    Prints the map and log of each frame and waits `delay` milliseconds.
+
+    Must be attached after the simulator's `LogObserver` to display the complete log.
+    """
+
+    def __init__(self, delay: int = 0, file=None):
+        self.delay = delay
+        self.file = file
+
+    def on_frame_end(self, sim: "Simulator"):
+        sim.print(file=self.file)
+        if self.delay:
+            time.sleep(self.delay / 1000)
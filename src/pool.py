@@ -1,5 +1,10 @@
+import os
+import time
+import queue
 import random
 import pickle
+import shutil
+import tempfile
 from pathlib import Path
 from copy import deepcopy
 from multiprocessing import Pool
@@ -8,23 +13,62 @@ from typing import Type, List, Tuple, Dict, Optional, Union, Any
 
 from tqdm import tqdm
 import tabulate
+import numpy as np
 
 from .bots.botbase import GameBase
-from .simulator import Simulator
+from .simulator import Simulator, derive_seed
+from .cache import MatchCache, run_match
+from .result_sink import ResultSink, match_record
+from .distributed import Coordinator
+from .schedule import PairingScheduler, AllPairsScheduler, fitness
+from .evolution import GenomeSpace, CMAES
+from .pool_store import PoolStore
 
 
 class BotPool:
 
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
         self.bot_files = {}
         self.population = {}
         self.generation = 0
         self._id_counter = 0
         self._id_counter_pop = 0
-        self.rand = random.Random()
+        self.seed = seed
+        self.rand = random.Random(seed)
         self.num_processes = 8
+        # optional MatchCache, not saved with the pool
+        self.cache: Optional[MatchCache] = None
+        # optional JSONL or CSV file to append a record of each match to
+        self.results_file: Optional[str] = None
+        # optional PoolStore to append the new population entries and the
+        # match records to, set by `save` and `load` of a `.sqlite` file
+        self.store: Optional[PoolStore] = None
+        # optional Coordinator to run the matches on remote workers instead
+        self.coordinator: Optional[Coordinator] = None
+        # pairing of the population in `evaluate`, not saved with the pool
+        self.scheduler: PairingScheduler = AllPairsScheduler()
+        # print the number of matches and progress bars in `evaluate`
+        self.verbose = True
+        # the worker processes, see `_get_executor`
+        self._executor: Optional[Pool] = None
+        # (generation, filename, ids) of the genome table of the workers,
+        # see `_evaluate_processes`
+        self._genome_table: Optional[Tuple[int, str, set]] = None
+        self._genome_table_dir: Optional[str] = None
+        self._genome_table_count = 0
+        # bot file -> CMAES of `select_population_cma`
+        self.optimizers: Dict[str, CMAES] = {}
 
     def save(self, filename: Union[str, Path]):
+        """
+        Pickle the pool, or append a checkpoint to a `.sqlite` file, see `PoolStore`
+        """
+        if str(filename).endswith(".sqlite"):
+            if self.store is None or self.store.filename != Path(filename):
+                self.store = PoolStore(filename)
+            self.store.checkpoint(self)
+            return
+
         with open(filename, "wb") as fp:
             pickle.dump({
                 "bot_files": self.bot_files,
@@ -32,18 +76,30 @@ class BotPool:
                 "generation": self.generation,
                 "_id_counter": self._id_counter,
                 "_id_counter_pop": self._id_counter_pop,
+                "seed": self.seed,
+                "rand_state": self.rand.getstate(),
+                "optimizers": self.optimizers,
             }, fp)
 
     @classmethod
     def load(cls, filename: Union[str, Path]) -> "BotPool":
+        if str(filename).endswith(".sqlite"):
+            pool = BotPool()
+            pool.store = PoolStore(filename)
+            pool.store.restore(pool)
+            return pool
+
         with open(filename, "rb") as fp:
             data = pickle.load(fp)
-        pool = BotPool()
+        pool = BotPool(seed=data.get("seed"))
+        if data.get("rand_state"):
+            pool.rand.setstate(data["rand_state"])
         pool.bot_files = data["bot_files"]
         pool.population = data["population"]
         pool.generation = data["generation"]
         pool._id_counter = data["_id_counter"]
         pool._id_counter_pop = data["_id_counter_pop"]
+        pool.optimizers = data.get("optimizers", {})
         return pool
 
     def add_bot_file(self, *bot_file: Union[str, Path]):
@@ -53,7 +109,7 @@ class BotPool:
             id = chr(ord("A") + self._id_counter_pop % 26)
             self._id_counter_pop += 1
 
-            sim = Simulator(fn, fn)
+            sim = Simulator(fn, fn, headless=True)
             if not sim.bot_modules[0]:
                 raise NotImplementedError(f"Can only work with GameBase modules")
             sim.step()
@@ -101,13 +157,15 @@ class BotPool:
                 "fitness": 0,
                 "stats": {},
             }
+        self._store_individuals(self.population.values())
 
     def select_population(self, num_best: int = 5, count: int = 10):
         assert count > num_best
 
+        # entries that stayed longer in a race are better
         best_pops = sorted(
             [p for p in self.population.values() if p["evolution"]],
-            key=lambda p: p["fitness"],
+            key=lambda p: (p.get("race_rounds", 0), p["fitness"]),
             reverse=True,
         )[:num_best]
 
@@ -136,7 +194,13 @@ class BotPool:
             id = self._id_counter_pop
 
             pop = deepcopy(best_pops[i % len(best_pops)])
-            pop["genome"] = self.mutate(pop["class"], pop["genome"])
+            mate = None
+            if GenomeSpace.of(pop["class"]):
+                # cross numeric genomes with another of the best of the same file
+                mates = [p for p in best_pops if p["file"] == pop["file"] and p["id"] != pop["id"]]
+                if mates:
+                    mate = self.rand.choice(mates)["genome"]
+            pop["genome"] = self.mutate(pop["class"], pop["genome"], mate=mate)
 
             self.population[id] = {
                 **pop,
@@ -146,10 +210,114 @@ class BotPool:
                 "fitness": 0,
                 "stats": {},
             }
+        self._store_individuals(self.population.values())
+
+    def select_population_cma(self, count: int = 10):
+        """
+        Replace the evolvable entries by a new generation of a CMA-ES
+        optimizer per bot file, which is updated with the fitness of
+        the current entries.
+
+        Only works with numeric genomes, see `GameBase.GENOME`.
+        The non-evolvable entries are kept for comparison.
+        """
+        by_file: Dict[str, List[dict]] = {}
+        for pop in self.population.values():
+            if pop["evolution"]:
+                if not GenomeSpace.of(pop["class"]):
+                    raise ValueError(f"{pop['file']} has no numeric GENOME, required for CMA-ES")
+                by_file.setdefault(pop["file"], []).append(pop)
+
+        prev_population = self.population
+        self.population = {}
+        file_set = set()
+        for p in prev_population.values():
+            if not p["evolution"] and p["file"] not in file_set:
+                file_set.add(p["file"])
+                self.population[p["id"]] = {**p, "stats": {}}
+
+        num_slots = count - len(self.population)
+        for i, (file, pops) in enumerate(sorted(by_file.items())):
+            space = GenomeSpace.of(pops[0]["class"])
+            best = max(pops, key=lambda p: p["fitness"])
+            solutions = space.normalize(space.to_array([p["genome"] for p in pops]))
+
+            optimizer = self.optimizers.get(file)
+            if optimizer is None:
+                optimizer = self.optimizers[file] = CMAES(
+                    solutions[pops.index(best)], seed=self.rand.getrandbits(64),
+                )
+            if len(pops) > 1:
+                optimizer.tell(solutions, [p["fitness"] for p in pops])
+
+            # split the slots evenly between the files
+            optimizer.population_size = max(2, num_slots // len(by_file) + (i < num_slots % len(by_file)))
+            genomes = space.to_genomes(space.denormalize(optimizer.ask()))
+
+            for genome in genomes:
+                self._id_counter_pop += 1
+                id = self._id_counter_pop
+                self.population[id] = {
+                    **best,
+                    "id": id,
+                    "parent": best["id"],
+                    "generation": best["generation"] + 1,
+                    "genome": genome,
+                    "fitness": 0,
+                    "stats": {},
+                }
+        self._store_individuals(self.population.values())
+
+    def add_migrants(self, entries: List[dict], origin: str = "migrant"):
+        """
+        Replace the newest evolvable entries, e.g. the offspring of
+        `select_population`, with copies of the `entries` of another pool.
+
+        The copies get new ids, their parent is `<origin>:<id>` and
+        their fitness and stats are reset.
+        """
+        newest = sorted(
+            [p for p in self.population.values() if p["evolution"]],
+            key=lambda p: p["id"], reverse=True,
+        )
+        for old, entry in zip(newest, entries):
+            del self.population[old["id"]]
+            self._id_counter_pop += 1
+            id = self._id_counter_pop
+            self.population[id] = {
+                **deepcopy(entry),
+                "id": id,
+                "parent": f"{origin}:{entry['id']}",
+                "fitness": 0,
+                "stats": {},
+            }
+        self._store_individuals(self.population.values())
+
+    def _store_individuals(self, pops):
+        """
+        Insert the new population entries into the `store`, before they play a match
+        """
+        if self.store is not None:
+            self.store.add_individuals(list(pops))
+
+    def mutate(self, klass: Type[GameBase], genome: Any, mate: Optional[Any] = None) -> Any:
+        """
+        Return a mutated copy of the genome.
+
+        Numeric genomes (see `GameBase.GENOME`) are mutated without a bot
+        instance and are crossed with the optional `mate` before.
+        """
+        space = GenomeSpace.of(klass)
+        if space:
+            rng = np.random.default_rng(self.rand.getrandbits(64))
+            matrix = space.to_array([genome])
+            if mate is not None:
+                matrix = space.crossover(matrix, space.to_array([mate]), rng)
+            return space.to_genomes(space.mutate(matrix, rng))[0]
 
-    def mutate(self, klass: Type[GameBase], genome: Any) -> Any:
         original_genome = genome
-        bot: GameBase = klass("1,100,1#")
+        seed = self.rand.getrandbits(64) if self.seed is not None else None
+        bot: GameBase = klass("1,100,1#", seed=seed)
         bot.set_genome(deepcopy(genome))
         for i in range(100):
             bot.mutate(.2, .4)
@@ -159,83 +327,402 @@ class BotPool:
         return genome
 
     def evaluate(self):
-        pairs = []
-        for pop1 in self.population.values():
-            for pop2 in self.population.values():
-                if pop1 != pop2:
-                    pairs.append((pop1, pop2))
-                    #pairs.append((pop2, pop1))
-        print("evaluating", len(pairs), "matches")
-        if self.num_processes < 2:
-            results = self._evaluate_pop_pairs(pairs)
-        else:
-            split_pairs = [
-                [[], i]
-                for i in range(self.num_processes)
-            ]
-            for i, pair in enumerate(pairs):
-                split_pairs[i % self.num_processes][0].append(pair)
-
-            results_list = Pool(self.num_processes).starmap(self._evaluate_pop_pairs, split_pairs)
-            results = {}
-            for r in results_list:
-                for id, stats in r.items():
-                    if id not in results:
-                        results[id] = stats
-                    else:
-                        for key, value in stats.items():
-                            results[id][key] = results[id].get(key, 0) + value
+        population = list(self.population.values())
+        if self.verbose:
+            print(
+                f"evaluating {self.scheduler.num_matches(len(population))} matches"
+                f" ({self.scheduler})"
+            )
+        for pop in population:
+            # set again by the scheduler of this generation, see `SuccessiveHalvingScheduler`
+            pop.pop("race_rounds", None)
+        results = {}
+        # number of previous matches per ordered pair of ids
+        pair_counts = {}
+        for round in range(self.scheduler.num_rounds(len(population))):
+            pairs = []
+            for pop1, pop2 in self.scheduler.pairs(population, self.rand, round, results):
+                # independent of the generation, so the matches between
+                # survivors are the same and can be taken from the cache,
+                # repeated pairs in one generation get another seed
+                seed = None
+                if self.seed is not None:
+                    pair = (pop1["id"], pop2["id"])
+                    count = pair_counts.get(pair, 0)
+                    pair_counts[pair] = count + 1
+                    seed = derive_seed(self.seed, *pair, *([count] if count else []))
+                pairs.append((pop1, pop2, seed))
+
+            for id, stats in self._evaluate_pairs(pairs).items():
+                if id not in results:
+                    results[id] = stats
+                else:
+                    for key, value in stats.items():
+                        results[id][key] = results[id].get(key, 0) + value
 
         for id, stats in results.items():
-            pop = self.population[id]
-            for key, value in stats.items():
-                pop["stats"][key] = pop["stats"].get("key", 0) + value
+            # skips the panel bots of a PanelScheduler
+            pop = self.population.get(id)
+            if pop is not None:
+                for key, value in stats.items():
+                    pop["stats"][key] = pop["stats"].get(key, 0) + value
 
         for pop in self.population.values():
-            wins = pop["stats"].get("wins", 0)
-            defeats = pop["stats"].get("defeats", 0)
-            kills = pop["stats"].get("enemy_kills", 0)
-            pop["fitness"] = wins - defeats + kills / 5.
+            pop["fitness"] = fitness(pop["stats"])
+        self.scheduler.finish(population)
 
         self.generation += 1
 
-    def _evaluate_pop_pairs(self, pairs: List[Tuple[dict, dict]], tqdm_position=None) -> dict:
-        results = {}
-        for pop1, pop2 in tqdm(pairs, desc=f"evaluating #{self.generation}", position=tqdm_position):
-            sim = Simulator(pop1["file"], pop2["file"])
-            sim.bot_genomes[0] = pop1["genome"]
-            sim.bot_genomes[1] = pop2["genome"]
-
-            for i in range(100):
-                sim.step()
-
-            n1, n2 = sim.num_bots()
-
-            for i, id in enumerate((pop1["id"], pop2["id"])):
-                if id not in results:
-                    results[id] = {
-                        "wins": 0,
-                        "defeats": 0,
-                        "draws": 0,
-                        "matches": 0,
-                    }
-
-                results[id]["matches"] += 1
-
-                for key, values in sim.stats.items():
-                    results[id][key] = results[id].get(key, 0) + values[i]
+    def _evaluate_pairs(self, pairs: List[Tuple[dict, dict, Optional[int]]]) -> dict:
+        """
+        Run the matches with the coordinator or local processes, write the
+        records and return the summed stats per population id
+        """
+        if self.coordinator is not None:
+            results, records = self._evaluate_remote(pairs)
+            self._write_records(records)
+        elif self.num_processes < 2:
+            results, records = self._evaluate_pop_pairs(pairs)
+            self._write_records(records)
+        else:
+            results, records = self._evaluate_processes(pairs)
+            self._write_records(records)
+        return results
 
-            if n1 > n2:
-                results[pop1["id"]]["wins"] += 1
-                results[pop2["id"]]["defeats"] += 1
-            elif n1 < n2:
-                results[pop1["id"]]["defeats"] += 1
-                results[pop2["id"]]["wins"] += 1
-            else:
-                results[pop1["id"]]["draws"] += 1
-                results[pop2["id"]]["draws"] += 1
+    def _get_executor(self) -> Pool:
+        """
+        The process pool, which is created once and kept until `close`.
+        The workers use the `cache` at the time of creation.
+        """
+        if self._executor is None:
+            self._executor = Pool(
+                self.num_processes,
+                initializer=_init_worker,
+                initargs=([b["file"] for b in self.bot_files.values()], self.cache),
+            )
+        return self._executor
+
+    def close(self):
+        """
+        Stop the worker processes and close the store
+        """
+        if self._executor is not None:
+            self._executor.terminate()
+            self._executor = None
+        if self._genome_table_dir is not None:
+            shutil.rmtree(self._genome_table_dir, ignore_errors=True)
+            self._genome_table_dir = None
+            self._genome_table = None
+        if self.store is not None:
+            self.store.close()
+
+    def _evaluate_processes(self, pairs: List[Tuple[dict, dict, Optional[int]]]) -> Tuple[dict, List[dict]]:
+        """
+        Like `_evaluate_pop_pairs` but runs the matches in the worker processes.
+
+        The pairs are split into a few chunks per process, as
+        (index, id 1, id 2, seed). The files and genomes of the population
+        ids are written once per generation to a genome table file, which
+        each worker loads once, see `_write_genome_table`.
+        """
+        table_filename = self._write_genome_table(
+            [pop for pop1, pop2, seed in pairs for pop in (pop1, pop2)]
+        )
+
+        num_chunks = min(len(pairs), self.num_processes * 4)
+        chunks = [[] for _ in range(num_chunks)]
+        for index, (pop1, pop2, seed) in enumerate(pairs):
+            chunks[index % num_chunks].append((index, pop1["id"], pop2["id"], seed))
+        tasks = [
+            (table_filename, chunk, self.generation if self._keep_records else None)
+            for chunk in chunks
+        ]
 
-        return results
+        results = {}
+        records = []
+        with tqdm(total=len(pairs), desc=f"evaluating #{self.generation}", disable=not self.verbose) as progress:
+            for rows in self._get_executor().imap_unordered(_evaluate_chunk_task, tasks):
+                for row, record in rows:
+                    pop1, pop2, seed = pairs[row[0]]
+                    self._add_result(results, records, pop1, pop2, seed, _unpack_result(row), record)
+                progress.update(len(rows))
+
+        return results, records
+
+    def _write_genome_table(self, pops: List[dict]) -> str:
+        """
+        Return the file of the pickled `{id: (file, genome)}` table of the
+        worker processes. It is written again when the generation changes
+        or ids are missing, so the rounds of a generation share one table.
+        """
+        ids = {pop["id"] for pop in pops}
+        if self._genome_table is not None:
+            generation, filename, table_ids = self._genome_table
+            if generation == self.generation and ids <= table_ids:
+                return filename
+
+        if self._genome_table_dir is None:
+            self._genome_table_dir = tempfile.mkdtemp(prefix="botpool-")
+        if self._genome_table is not None:
+            os.remove(self._genome_table[1])
+
+        genomes = {pop["id"]: (pop["file"], pop["genome"]) for pop in pops}
+        # include the rest of the population for the next rounds
+        for pop in self.population.values():
+            genomes.setdefault(pop["id"], (pop["file"], pop["genome"]))
+        # a new name for each table, the workers compare the names
+        self._genome_table_count += 1
+        filename = os.path.join(self._genome_table_dir, f"genomes-{self._genome_table_count}.pkl")
+        with open(filename, "wb") as fp:
+            pickle.dump(genomes, fp)
+        self._genome_table = (self.generation, filename, set(genomes))
+        return filename
+
+    def evolve_steady_state(
+            self,
+            num_offspring: int,
+            evaluations: int = 10,
+            tournament_size: int = 3,
+            checkpoint_file: Optional[Union[str, Path]] = None,
+            checkpoint_interval: float = 60.,
+    ):
+        """
+        Evolve without generations.
+
+        The process pool is kept busy with matches of the entries that
+        played the fewest matches against random opponents, and the
+        fitness is updated with each result. Each time an evolvable entry
+        has played `evaluations` matches, a mutated copy of the best of
+        `tournament_size` random evaluated entries is added and the worst
+        other evaluated entry is removed, so a parent is never replaced
+        by its own offspring. The first copy is therefore added when two
+        entries are evaluated. Entries that do not evolve are kept for
+        comparison and do not reproduce.
+
+        The pool is saved to `checkpoint_file` every `checkpoint_interval`
+        seconds and at the end. `self.generation` is increased each time
+        the number of new entries reaches the population size.
+
+        The order of results depends on the processes, so this is
+        not reproducible, even for seeded pools.
+        """
+        assert len(list(filter(lambda p: p["evolution"], self.population.values()))) >= 2, \
+            "Need at least two mutatable entries"
+
+        size = len(self.population)
+        # number of running matches per id
+        running = {id: 0 for id in self.population}
+        # number of matches per ordered pair of ids
+        pair_counts = {}
+        reproduced = set()
+        results = queue.Queue()
+        max_running = max(1, self.num_processes) * 2
+        last_checkpoint = time.monotonic()
+        num_created = 0
+        sink = ResultSink(self.results_file) if self.results_file else None
+
+        def next_match():
+            pops = list(self.population.values())
+            pop1 = min(pops, key=lambda p: (p["stats"].get("matches", 0) + running[p["id"]], self.rand.random()))
+            pop2 = self.rand.choice([p for p in pops if p is not pop1])
+            pair = (pop1["id"], pop2["id"])
+            seed = None
+            if self.seed is not None:
+                seed = derive_seed(self.seed, *pair, pair_counts.get(pair, 0))
+            pair_counts[pair] = pair_counts.get(pair, 0) + 1
+            running[pop1["id"]] += 1
+            running[pop2["id"]] += 1
+            return pop1, pop2, seed
+
+        def reproduce() -> bool:
+            evaluated = [
+                p for p in self.population.values()
+                if p["evolution"] and p["stats"].get("matches", 0) >= evaluations
+            ]
+            if len(evaluated) < 2:
+                return False
+            parent = max(
+                self.rand.sample(evaluated, min(tournament_size, len(evaluated))),
+                key=lambda p: p["fitness"],
+            )
+            self._id_counter_pop += 1
+            id = self._id_counter_pop
+            self.population[id] = {
+                **deepcopy(parent),
+                "id": id,
+                "parent": parent["id"],
+                "generation": parent["generation"] + 1,
+                "genome": self.mutate(parent["class"], parent["genome"]),
+                "fitness": 0,
+                "stats": {},
+            }
+            self._store_individuals([self.population[id]])
+            running[id] = 0
+
+            if len(self.population) > size:
+                worst = min((p for p in evaluated if p is not parent), key=lambda p: p["fitness"])
+                del self.population[worst["id"]]
+            return True
+
+        pool = self._get_executor() if self.num_processes > 1 else None
+        try:
+            num_running = 0
+            progress = tqdm(total=num_offspring, desc="offspring", disable=not self.verbose)
+            while num_created < num_offspring:
+                while num_running < max_running:
+                    pop1, pop2, seed = next_match()
+                    args = (pop1["file"], pop1["genome"], pop2["file"], pop2["genome"], seed)
+                    if pool is None:
+                        results.put((pop1, pop2, seed, _run_pop_match(*args, self.cache)))
+                    else:
+                        pool.apply_async(
+                            _run_pop_match, args,
+                            callback=lambda r, p=(pop1, pop2, seed): results.put((*p, r)),
+                            error_callback=results.put,
+                        )
+                    num_running += 1
+
+                item = results.get()
+                if isinstance(item, BaseException):
+                    raise item
+                num_running -= 1
+                pop1, pop2, seed, result = item
+                running[pop1["id"]] -= 1
+                running[pop2["id"]] -= 1
+
+                match_results, records = {}, []
+                self._add_result(match_results, records, pop1, pop2, seed, result)
+                if sink:
+                    for record in records:
+                        sink.write(record)
+                if self.store is not None:
+                    self.store.add_records(records)
+
+                for id, stats in match_results.items():
+                    # the entry might have been removed while the match was running
+                    pop = self.population.get(id)
+                    if pop is None:
+                        continue
+                    for key, value in stats.items():
+                        pop["stats"][key] = pop["stats"].get(key, 0) + value
+                    pop["fitness"] = fitness(pop["stats"])
+
+                    if pop["evolution"] and pop["stats"]["matches"] >= evaluations and id not in reproduced:
+                        if not reproduce():
+                            continue
+                        reproduced.add(id)
+                        num_created += 1
+                        progress.update(1)
+                        if num_created % size == 0:
+                            self.generation += 1
+
+                if checkpoint_file and time.monotonic() - last_checkpoint >= checkpoint_interval:
+                    self.save(checkpoint_file)
+                    last_checkpoint = time.monotonic()
+
+            progress.close()
+        finally:
+            if sink:
+                sink.close()
+
+        if checkpoint_file:
+            self.save(checkpoint_file)
+
+    @property
+    def _keep_records(self) -> bool:
+        return bool(self.results_file) or self.store is not None
+
+    def _write_records(self, records: List[dict]):
+        if self.results_file:
+            with ResultSink(self.results_file) as sink:
+                for record in records:
+                    sink.write(record)
+        if self.store is not None:
+            self.store.add_records(records)
+
+    def _evaluate_pop_pairs(
+            self,
+            pairs: List[Tuple[dict, dict, Optional[int]]],
+            tqdm_position=None,
+    ) -> Tuple[dict, List[dict]]:
+        """
+        Returns the summed stats per population id and the match records
+        """
+        results = {}
+        records = []
+        for pop1, pop2, seed in tqdm(
+                pairs, desc=f"evaluating #{self.generation}", position=tqdm_position, disable=not self.verbose,
+        ):
+            result = _run_pop_match(pop1["file"], pop1["genome"], pop2["file"], pop2["genome"], seed, self.cache)
+            self._add_result(results, records, pop1, pop2, seed, result)
+
+        return results, records
+
+    def _evaluate_remote(self, pairs: List[Tuple[dict, dict, Optional[int]]]) -> Tuple[dict, List[dict]]:
+        """
+        Like `_evaluate_pop_pairs` but runs the matches on the workers of the `coordinator`
+        """
+        tasks = (
+            self.coordinator.match_task(
+                [pop1["file"], pop2["file"]], genomes=[pop1["genome"], pop2["genome"]], seed=seed,
+            )
+            for pop1, pop2, seed in pairs
+        )
+        results = {}
+        records = []
+        remote_results = self.coordinator.imap(tasks)
+        for index, result in tqdm(
+                remote_results, total=len(pairs), desc=f"evaluating #{self.generation}", disable=not self.verbose,
+        ):
+            pop1, pop2, seed = pairs[index]
+            self._add_result(results, records, pop1, pop2, seed, result)
+
+        return results, records
+
+    def _add_result(
+            self,
+            results: dict,
+            records: List[dict],
+            pop1: dict,
+            pop2: dict,
+            seed: Optional[int],
+            result: dict,
+            record: Optional[dict] = None,
+    ):
+        """
+        Add the `run_match` result of pop1 against pop2 to the stats per population id
+        and the match record to `records`, unless a `record` is given.
+        """
+        n1, n2 = result["num_bots"]
+        if self._keep_records:
+            records.append(record or match_record(
+                [pop1["file"], pop2["file"]], seed, result,
+                generation=self.generation, id_1=pop1["id"], id_2=pop2["id"],
+            ))
+
+        for i, id in enumerate((pop1["id"], pop2["id"])):
+            if id not in results:
+                results[id] = {
+                    "wins": 0,
+                    "defeats": 0,
+                    "draws": 0,
+                    "matches": 0,
+                }
+
+            results[id]["matches"] += 1
+
+            for key, values in result["stats"].items():
+                results[id][key] = results[id].get(key, 0) + values[i]
+
+        if n1 > n2:
+            results[pop1["id"]]["wins"] += 1
+            results[pop2["id"]]["defeats"] += 1
+        elif n1 < n2:
+            results[pop1["id"]]["defeats"] += 1
+            results[pop2["id"]]["wins"] += 1
+        else:
+            results[pop1["id"]]["draws"] += 1
+            results[pop2["id"]]["draws"] += 1
 
     def _create_genome(self, klass: Type[GameBase]) -> Any:
         bot = klass("1,100,1#")
@@ -273,3 +760,88 @@ class BotPool:
         rows.sort(key=lambda r: r["fitness"], reverse=True)
         print(tabulate.tabulate(rows, headers="keys", tablefmt="presto") + "\n")
 
+
+def _run_pop_match(
+        file1: str,
+        genome1: Any,
+        file2: str,
+        genome2: Any,
+        seed: Optional[int],
+        cache: Optional[MatchCache] = None,
+) -> dict:
+    """
+    Run a match, the `cache` defaults to the one of the worker process
+    """
+    cache = cache if cache is not None else _worker_cache
+    sim = Simulator(file1, file2, headless=True, seed=seed)
+    sim.bot_genomes[0] = genome1
+    sim.bot_genomes[1] = genome2
+    return run_match(sim, cache)
+
+
+# the MatchCache of a worker process of the BotPool executor
+_worker_cache: Optional[MatchCache] = None
+# (filename, table) of the last loaded genome table of a worker process
+_worker_genomes: Tuple[Optional[str], Dict[Any, Tuple[str, Any]]] = (None, {})
+
+
+def _init_worker(bot_files: List[str], cache: Optional[MatchCache]):
+    """
+    Import the bot modules once per worker process
+    """
+    global _worker_cache
+    _worker_cache = cache
+    for fn in set(bot_files):
+        Simulator(fn, fn, headless=True)
+
+
+def _evaluate_chunk(
+        table_filename: str,
+        pairs: List[Tuple[int, Any, Any, Optional[int]]],
+        generation: Optional[int],
+) -> List[Tuple[tuple, Optional[dict]]]:
+    """
+    Run the matches of a chunk of `BotPool._evaluate_processes`.
+
+    The genome table is only loaded when it differs from the last one.
+    Returns a row of `(pair index, bots 1, bots 2, stats 1, stats 2, ...)` with
+    the stats in order of `Simulator.STATS` and the match record if `generation`
+    is not None, for each pair.
+    """
+    global _worker_genomes
+    if _worker_genomes[0] != table_filename:
+        with open(table_filename, "rb") as fp:
+            _worker_genomes = (table_filename, pickle.load(fp))
+    genomes = _worker_genomes[1]
+    rows = []
+    for index, id1, id2, seed in pairs:
+        (file1, genome1), (file2, genome2) = genomes[id1], genomes[id2]
+        result = _run_pop_match(file1, genome1, file2, genome2, seed)
+        record = None
+        if generation is not None:
+            record = match_record(
+                [file1, file2], seed, result,
+                generation=generation, id_1=id1, id_2=id2,
+            )
+        row = [index, *result["num_bots"]]
+        for key in Simulator.STATS:
+            row += result["stats"][key]
+        rows.append((tuple(row), record))
+    return rows
+
+
+def _evaluate_chunk_task(args: tuple) -> List[Tuple[tuple, Optional[dict]]]:
+    return _evaluate_chunk(*args)
+
+
+def _unpack_result(row: tuple) -> dict:
+    """
+    The `num_bots` and `stats` of a row of `_evaluate_chunk`
+    """
+    return {
+        "num_bots": list(row[1:3]),
+        "stats": {
+            key: list(row[3 + i * 2:5 + i * 2])
+            for i, key in enumerate(Simulator.STATS)
+        },
+    }
@@ -0,0 +1,303 @@
+"""
+Append-only sqlite storage of a `BotPool`.
+
+The population entries (with their genome and lineage) are inserted
+when the pool creates them, see `BotPool.store`, so the lineage of
+entries that were removed between two checkpoints is kept. Each
+`checkpoint` inserts the members of the current population with their
+fitness and stats and the small remaining state of the pool, in one
+transaction. Apart from the few rows of the bot files nothing is
+overwritten, so the cost of a checkpoint does not grow with the length
+of a run, an interrupted write leaves the previous checkpoints intact
+and the history of all generations stays queryable. The match records
+of the pool are appended as they are played.
+
+The bot classes are not stored, they are imported from the bot files
+on `restore`.
+"""
+import os
+import json
+import pickle
+import sqlite3
+from pathlib import Path
+from typing import Optional, Union, List, Dict, Generator, Type, TYPE_CHECKING
+
+from .simulator import Simulator
+from .bots.botbase import GameBase
+
+if TYPE_CHECKING:
+    from .pool import BotPool
+
+
+class PoolStore:
+    """
+    Checkpoints and match records of a BotPool in a sqlite database.
+
+    The database connection is opened lazily.
+
+    :param filename: str or Path of the sqlite database
+    """
+
+    def __init__(self, filename: Union[str, Path]):
+        self.filename = Path(filename)
+        self._db: Optional[sqlite3.Connection] = None
+        # ids of the population entries that are stored
+        self._stored_ids = None
+
+    def __getstate__(self):
+        return {**self.__dict__, "_db": None}
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(self.filename.parent, exist_ok=True)
+            self._db = sqlite3.connect(str(self.filename), timeout=60, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS bot_files (
+                    id TEXT PRIMARY KEY, file TEXT NOT NULL, evolution INTEGER NOT NULL,
+                    genome BLOB, stats TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS individuals (
+                    id INTEGER PRIMARY KEY, source_id TEXT NOT NULL, parent, generation INTEGER NOT NULL,
+                    file TEXT NOT NULL, evolution INTEGER NOT NULL, genome BLOB
+                );
+                CREATE INDEX IF NOT EXISTS individuals_parent ON individuals (parent);
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, generation INTEGER NOT NULL, state BLOB NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS members (
+                    checkpoint INTEGER NOT NULL, id INTEGER NOT NULL, fitness REAL NOT NULL, stats TEXT NOT NULL,
+                    PRIMARY KEY (checkpoint, id)
+                );
+                CREATE INDEX IF NOT EXISTS members_id ON members (id);
+                CREATE TABLE IF NOT EXISTS matches (
+                    generation INTEGER, id_1, id_2, record TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS matches_generation ON matches (generation);
+            """)
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def delete(self):
+        """
+        Close and remove the database files
+        """
+        self.close()
+        self._stored_ids = None
+        for suffix in ("", "-wal", "-shm"):
+            path = Path(f"{self.filename}{suffix}")
+            if path.exists():
+                path.unlink()
+
+    def __len__(self) -> int:
+        """
+        Number of checkpoints
+        """
+        return self.db.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+
+    def checkpoint(self, pool: "BotPool"):
+        """
+        Append the current state of the pool.
+
+        Also inserts the population entries that are not stored yet,
+        e.g. of a pool that had no store when they were created.
+        """
+        state = {
+            "generation": pool.generation,
+            "_id_counter": pool._id_counter,
+            "_id_counter_pop": pool._id_counter_pop,
+            "seed": pool.seed,
+            "rand_state": pool.rand.getstate(),
+            "optimizers": pool.optimizers,
+        }
+        new_pops = self._new_individuals(pool.population.values())
+        db = self.db
+        db.execute("BEGIN")
+        try:
+            db.executemany(
+                "INSERT OR REPLACE INTO bot_files (id, file, evolution, genome, stats) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (b["id"], b["file"], b["evolution"], pickle.dumps(b["genome"]), json.dumps(b["stats"]))
+                    for b in pool.bot_files.values()
+                ],
+            )
+            self._insert_individuals(new_pops)
+            checkpoint = db.execute(
+                "INSERT INTO checkpoints (generation, state) VALUES (?, ?)",
+                (pool.generation, pickle.dumps(state)),
+            ).lastrowid
+            db.executemany(
+                "INSERT INTO members (checkpoint, id, fitness, stats) VALUES (?, ?, ?, ?)",
+                [
+                    (checkpoint, p["id"], p["fitness"], json.dumps(p["stats"]))
+                    for p in pool.population.values()
+                ],
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        self._stored_ids.update(p["id"] for p in new_pops)
+
+    def add_individuals(self, pops: List[dict]):
+        """
+        Insert the population entries that are not stored yet
+        """
+        new_pops = self._new_individuals(pops)
+        if new_pops:
+            self.db.execute("BEGIN")
+            try:
+                self._insert_individuals(new_pops)
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self._stored_ids.update(p["id"] for p in new_pops)
+
+    def _new_individuals(self, pops) -> List[dict]:
+        if self._stored_ids is None:
+            self._stored_ids = {row[0] for row in self.db.execute("SELECT id FROM individuals")}
+        return [p for p in pops if p["id"] not in self._stored_ids]
+
+    def _insert_individuals(self, pops: List[dict]):
+        self.db.executemany(
+            "INSERT OR IGNORE INTO individuals (id, source_id, parent, generation, file, evolution, genome)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (p["id"], p["source_id"], p["parent"], p["generation"], p["file"], p["evolution"],
+                 pickle.dumps(p["genome"]))
+                for p in pops
+            ],
+        )
+
+    def restore(self, pool: "BotPool"):
+        """
+        Set the state of the pool to the last checkpoint
+        """
+        row = self.db.execute("SELECT id, state FROM checkpoints ORDER BY id DESC LIMIT 1").fetchone()
+        if row is None:
+            raise ValueError(f"{self.filename} contains no checkpoint")
+        checkpoint, state = row[0], pickle.loads(row[1])
+
+        pool.seed = state["seed"]
+        pool.rand.setstate(state["rand_state"])
+        pool.generation = state["generation"]
+        pool._id_counter = state["_id_counter"]
+        pool._id_counter_pop = state["_id_counter_pop"]
+        pool.optimizers = state["optimizers"]
+
+        classes = {}
+
+        def get_class(file: str) -> Type[GameBase]:
+            if file not in classes:
+                classes[file] = Simulator(file, file, headless=True).bot_modules[0].Game
+            return classes[file]
+
+        pool.bot_files = {}
+        for id, file, evolution, genome, stats in self.db.execute(
+                "SELECT id, file, evolution, genome, stats FROM bot_files ORDER BY rowid"
+        ):
+            pool.bot_files[id] = {
+                "id": id,
+                "file": file,
+                "evolution": bool(evolution),
+                "genome": pickle.loads(genome),
+                "class": get_class(file),
+                "stats": json.loads(stats),
+            }
+
+        pool.population = {}
+        for id, source_id, parent, generation, file, evolution, genome, fitness, stats in self.db.execute(
+                "SELECT i.id, source_id, parent, generation, file, evolution, genome, fitness, stats"
+                " FROM members m JOIN individuals i ON i.id = m.id"
+                " WHERE m.checkpoint = ? ORDER BY m.rowid",
+                (checkpoint, ),
+        ):
+            pool.population[id] = {
+                "source_id": source_id,
+                "id": id,
+                "parent": parent,
+                "generation": generation,
+                "file": file,
+                "class": get_class(file),
+                "evolution": bool(evolution),
+                "genome": pickle.loads(genome),
+                "fitness": fitness,
+                "stats": json.loads(stats),
+            }
+
+    def add_records(self, records: List[dict]):
+        """
+        Append match records of `result_sink.match_record`
+        """
+        if records:
+            # one transaction, executemany would commit each row
+            self.db.execute("BEGIN")
+            try:
+                self.db.executemany(
+                    "INSERT INTO matches (generation, id_1, id_2, record) VALUES (?, ?, ?, ?)",
+                    [(r.get("generation"), r.get("id_1"), r.get("id_2"), json.dumps(r)) for r in records],
+                )
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def records(self, generation: Optional[int] = None) -> Generator[dict, None, None]:
+        """
+        Yield the stored match records, optionally of one generation only
+        """
+        query = "SELECT record FROM matches"
+        params = ()
+        if generation is not None:
+            query += " WHERE generation = ?"
+            params = (generation, )
+        for row in self.db.execute(query + " ORDER BY rowid", params):
+            yield json.loads(row[0])
+
+    def lineage(self, id: int) -> List[dict]:
+        """
+        The population entry of `id` and all its ancestors, the latest first.
+
+        The genome is unpickled, the `parent` of the first generation
+        is the id of the bot file.
+        """
+        rows = self.db.execute("""
+            WITH RECURSIVE ancestors(id, depth) AS (
+                SELECT ?, 0
+                UNION ALL
+                SELECT i.parent, a.depth + 1 FROM individuals i JOIN ancestors a ON i.id = a.id
+            )
+            SELECT i.id, source_id, parent, generation, file, genome
+            FROM ancestors a JOIN individuals i ON i.id = a.id
+            ORDER BY a.depth
+        """, (id, )).fetchall()
+        return [
+            {
+                "id": id,
+                "source_id": source_id,
+                "parent": parent,
+                "generation": generation,
+                "file": file,
+                "genome": pickle.loads(genome),
+            }
+            for id, source_id, parent, generation, file, genome in rows
+        ]
+
+    def fitness_history(self) -> List[Dict[str, float]]:
+        """
+        The generation, number of members, best and mean fitness of each checkpoint
+        """
+        return [
+            {"checkpoint": checkpoint, "generation": generation, "members": count, "best": best, "mean": mean}
+            for checkpoint, generation, count, best, mean in self.db.execute("""
+                SELECT c.id, c.generation, COUNT(*), MAX(m.fitness), AVG(m.fitness)
+                FROM checkpoints c JOIN members m ON m.checkpoint = c.id
+                GROUP BY c.id ORDER BY c.id
+            """)
+        ]
@@ -0,0 +1,75 @@
+import json
+import time
+from pathlib import Path
+from typing import Union
+
+import tabulate
+
+
+class PhaseProfiler:
+    """
+    Accumulates nanoseconds and number of calls per named phase.
+
+    Usage:
+
+        start = time.perf_counter_ns()
+        ...
+        start = profiler.lap("phase", start)
+
+    Profilers of several processes are combined with `merge`.
+    """
+
+    def __init__(self):
+        self.times = {}
+        self.counts = {}
+
+    def lap(self, phase: str, start: int) -> int:
+        """
+        Add the time since `start` to the phase and return the current time
+        """
+        now = time.perf_counter_ns()
+        self.times[phase] = self.times.get(phase, 0) + now - start
+        self.counts[phase] = self.counts.get(phase, 0) + 1
+        return now
+
+    def merge(self, other: Union["PhaseProfiler", dict]):
+        if isinstance(other, dict):
+            other = PhaseProfiler.from_dict(other)
+        for phase, ns in other.times.items():
+            self.times[phase] = self.times.get(phase, 0) + ns
+            self.counts[phase] = self.counts.get(phase, 0) + other.counts[phase]
+
+    def to_dict(self) -> dict:
+        return {
+            phase: {"ns": ns, "count": self.counts[phase]}
+            for phase, ns in self.times.items()
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PhaseProfiler":
+        profiler = cls()
+        for phase, values in data.items():
+            profiler.times[phase] = values["ns"]
+            profiler.counts[phase] = values["count"]
+        return profiler
+
+    def save(self, filename: Union[str, Path]):
+        Path(filename).write_text(json.dumps(self.to_dict(), indent=2))
+
+    @classmethod
+    def load(cls, filename: Union[str, Path]) -> "PhaseProfiler":
+        return cls.from_dict(json.loads(Path(filename).read_text()))
+
+    def table(self) -> str:
+        total = max(1, sum(self.times.values()))
+        rows = [
+            {
+                "phase": phase,
+                "ms": round(ns / 1_000_000, 3),
+                "%": round(ns / total * 100, 2),
+                "count": self.counts[phase],
+                "ns/count": ns // max(1, self.counts[phase]),
+            }
+            for phase, ns in sorted(self.times.items(), key=lambda t: -t[1])
+        ]
+        return tabulate.tabulate(rows, headers="keys", tablefmt="presto")
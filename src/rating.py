@@ -0,0 +1,58 @@
+from typing import List, Dict
+
+
+class EloRatings:
+    """
+    Elo ratings, updated after each game.
+
+    The ratings depend on the order of the games, so replaying the
+    same games in the same order gives the same ratings.
+    """
+
+    def __init__(self, k: float = 16., initial: float = 1500.):
+        self.k = k
+        self.initial = initial
+        self.ratings: Dict[str, float] = {}
+        # name -> [wins, draws, losses]
+        self.results: Dict[str, List[int]] = {}
+
+    def add_player(self, name: str):
+        if name not in self.ratings:
+            self.ratings[name] = self.initial
+            self.results[name] = [0, 0, 0]
+
+    def expected_score(self, a: str, b: str) -> float:
+        return 1. / (1. + 10. ** ((self.ratings[b] - self.ratings[a]) / 400.))
+
+    def add_game(self, a: str, b: str, score: float):
+        """
+        Update the ratings with a game of `a` against `b`
+
+        :param score: float, 1 if a won, .5 for a draw and 0 if b won
+        """
+        self.add_player(a)
+        self.add_player(b)
+        change = self.k * (score - self.expected_score(a, b))
+        self.ratings[a] += change
+        self.ratings[b] -= change
+
+        result_index = 0 if score > .5 else 1 if score == .5 else 2
+        self.results[a][result_index] += 1
+        self.results[b][2 - result_index] += 1
+
+    def leaderboard(self) -> List[dict]:
+        rows = []
+        for name, rating in sorted(self.ratings.items(), key=lambda r: -r[1]):
+            wins, draws, losses = self.results[name]
+            games = wins + draws + losses
+            rows.append({
+                "rank": len(rows) + 1,
+                "bot": name,
+                "elo": round(rating, 1),
+                "games": games,
+                "wins": wins,
+                "draws": draws,
+                "losses": losses,
+                "score %": round((wins + .5 * draws) / max(1, games) * 100, 2),
+            })
+        return rows
@@ -0,0 +1,361 @@
+"""
+Compact binary replays of Simulator matches.
+
+A replay stores the simulator parameters, the applied actions and the
+user-data of each frame and a keyframe snapshot every `keyframe_interval`
+frames. Spawns are not stored because they follow from the parameters.
+Seeking to a frame restores the keyframe before it and re-simulates
+the remaining (less than `keyframe_interval`) frames with the recorded
+actions, so no bot code is run.
+
+File layout (little-endian):
+
+    header:  b"BWR", version (u8), width (u8), height (u8),
+             spawn_frame_interval (u16), keyframe_interval (u16),
+             number of frames (u16), random_probability (f64),
+             two bot filenames as (u16 length, utf-8)
+    body:    zlib compressed sections, each prefixed by its size (u32):
+
+        actions:   per frame: the forfeited players (u8, bit per player),
+                   number of actions (u16) and the index of each
+                   acting bot in `Simulator.bots` (u16)
+        codes:     per frame: the action codes, two per byte
+        user-data: per frame and player: length (varint), utf-8
+        keyframes: per keyframe: the forfeited players (u8), number of
+                   bots (u16), then the player (u8), x (u8), y (u8) and
+                   energy (i16) of all bots as columns, all stats per
+                   player (u32) and the user-data
+
+An action code is `index of action letter * 4 + index of direction`.
+A varint stores 7 bits per byte, the high bit marks that another byte
+follows. Positions are stored as u8, so maps can be at most 255 cells
+wide and high.
+Storing bot indices and columns instead of records makes the data very
+repetitive, so a 100 frame match compresses to one or two kilobytes
+plus the user-data.
+"""
+import io
+import zlib
+import struct
+from pathlib import Path
+from typing import Optional, List, Tuple, Sequence, Union, BinaryIO
+
+from .simulator import Simulator, SimulatorSnapshot, Bot
+from .observer import SimulatorObserver
+
+
+MAGIC = b"BWR"
+VERSION = 3
+# maximum width and height of a recorded map
+MAX_SIZE = 255
+
+_HEADER = struct.Struct("<3sBBBHHHd")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_STATS = struct.Struct(f"<{len(Simulator.STATS) * 2}I")
+
+_ACTION_LETTERS = list(Simulator.ACTIONS)
+_COMMAND_LETTERS = {command: letter for letter, command in Simulator.ACTIONS.items()}
+_DIRECTIONS = list(Simulator.DIRECTIONS)
+
+
+class ReplayRecorder(SimulatorObserver):
+    """
+    Records a match, attach to the Simulator before the first step
+    and call `save` after the last one.
+    """
+
+    def __init__(self, keyframe_interval: int = 10):
+        self.keyframe_interval = keyframe_interval
+        self.num_frames = 0
+        self._actions = io.BytesIO()
+        self._codes = io.BytesIO()
+        self._user_data = io.BytesIO()
+        self._keyframes = io.BytesIO()
+        self._frame_actions = []
+        self._sim: Optional[Simulator] = None
+
+    def on_frame_start(self, sim: Simulator):
+        if self._sim is None and max(sim.width, sim.height) > MAX_SIZE:
+            raise ValueError(
+                f"Can not record a {sim.width}x{sim.height} map, the maximum size is {MAX_SIZE}"
+            )
+        self._sim = sim
+        self._frame_actions = []
+        if sim.frame % self.keyframe_interval == 0:
+            _write_keyframe(self._keyframes, sim)
+
+    def on_actions(self, sim: Simulator, actions: List[Tuple[Bot, str, Sequence[str]]]):
+        index = {id(b): i for i, b in enumerate(sim.bots)}
+        self._frame_actions = [
+            (index[id(bot)], _encode_action(command, args))
+            for bot, command, args in actions
+        ]
+
+    def on_frame_end(self, sim: Simulator):
+        actions = self._frame_actions
+        self._actions.write(_U8.pack(_forfeit_bits(sim.forfeited)))
+        self._actions.write(_U16.pack(len(actions)))
+        self._actions.write(struct.pack(f"<{len(actions)}H", *(i for i, c in actions)))
+        codes = [c for i, c in actions] + [0]
+        self._codes.write(bytes(
+            codes[i] << 4 | codes[i + 1]
+            for i in range(0, len(actions), 2)
+        ))
+        _write_user_data(self._user_data, sim.user_data)
+        self.num_frames += 1
+
+    def to_bytes(self) -> bytes:
+        sim = self._sim
+        header = _HEADER.pack(
+            MAGIC, VERSION, sim.width, sim.height,
+            sim.spawn_frame_interval, self.keyframe_interval, self.num_frames,
+            sim.random_probability,
+        )
+        for f in sim.bot_files:
+            name = str(f).encode()
+            header += _U16.pack(len(name)) + name
+
+        body = b"".join(
+            _U32.pack(len(data)) + data
+            for data in (
+                fp.getvalue()
+                for fp in (self._actions, self._codes, self._user_data, self._keyframes)
+            )
+        )
+        return header + zlib.compress(body, 9)
+
+    def save(self, filename: Union[str, Path]):
+        Path(filename).write_bytes(self.to_bytes())
+
+
+class Replay:
+    """
+    A loaded replay, use `simulator()` to get the match at any frame.
+    """
+
+    def __init__(
+            self,
+            bot_files: List[str],
+            width: int,
+            height: int,
+            spawn_frame_interval: int,
+            random_probability: float,
+            keyframe_interval: int,
+            frames: List[Tuple[List[Tuple[int, Tuple[str, ...]]], List[str], Tuple[bool, ...]]],
+            keyframes: List[Tuple[List[Tuple[int, int, int, int]], Sequence[int], List[str], Tuple[bool, ...]]],
+    ):
+        self.bot_files = bot_files
+        self.width = width
+        self.height = height
+        self.spawn_frame_interval = spawn_frame_interval
+        self.random_probability = random_probability
+        self.keyframe_interval = keyframe_interval
+        # list of ([(bot index, args), ...], user_data, forfeited) per frame
+        self.frames = frames
+        # list of ([(player, x, y, energy), ...], stats, user_data, forfeited)
+        self.keyframes = keyframes
+
+    @property
+    def num_frames(self) -> int:
+        return len(self.frames)
+
+    @classmethod
+    def load(cls, filename: Union[str, Path]) -> "Replay":
+        return cls.from_bytes(Path(filename).read_bytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Replay":
+        (
+            magic, version, width, height,
+            spawn_frame_interval, keyframe_interval, num_frames,
+            random_probability,
+        ) = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a replay file or unsupported version")
+
+        fp = io.BytesIO(data)
+        fp.seek(_HEADER.size)
+        bot_files = []
+        for i in range(2):
+            bot_files.append(_read(fp, _read(fp, _U16)[0]).decode())
+
+        fp = io.BytesIO(zlib.decompress(fp.read()))
+        fp_actions, fp_codes, fp_user_data, fp_keyframes = (
+            io.BytesIO(_read(fp, _read(fp, _U32)[0]))
+            for i in range(4)
+        )
+
+        frames = []
+        for frame in range(num_frames):
+            forfeited = _read_forfeit_bits(fp_actions)
+            num_actions, = _read(fp_actions, _U16)
+            indices = _read(fp_actions, struct.Struct(f"<{num_actions}H"))
+            codes = []
+            for c in _read(fp_codes, (num_actions + 1) // 2):
+                codes += [c >> 4, c & 15]
+            frames.append((
+                [(i, _decode_action(c)) for i, c in zip(indices, codes)],
+                _read_user_data(fp_user_data),
+                forfeited,
+            ))
+
+        keyframes = [
+            _read_keyframe(fp_keyframes)
+            for i in range(0, num_frames, keyframe_interval)
+        ]
+
+        return cls(
+            bot_files=bot_files,
+            width=width,
+            height=height,
+            spawn_frame_interval=spawn_frame_interval,
+            random_probability=random_probability,
+            keyframe_interval=keyframe_interval,
+            frames=frames,
+            keyframes=keyframes,
+        )
+
+    def simulator(self, frame: int = 0, **kwargs) -> Simulator:
+        """
+        Return a Simulator at the state before `frame` is run.
+
+        Any keyword arguments are passed to the Simulator.
+        """
+        frame = max(0, min(frame, self.num_frames))
+        sim = Simulator(
+            *self.bot_files,
+            width=self.width,
+            height=self.height,
+            spawn_frame_interval=self.spawn_frame_interval,
+            random_probability=self.random_probability,
+            **kwargs,
+        )
+        keyframe_index = min(frame // self.keyframe_interval, len(self.keyframes) - 1)
+        if keyframe_index >= 0:
+            _restore_keyframe(sim, keyframe_index * self.keyframe_interval, self.keyframes[keyframe_index])
+        while sim.frame < frame:
+            self.step(sim)
+        return sim
+
+    def step(self, sim: Simulator):
+        """
+        Run the next frame of the Simulator with the recorded actions
+        """
+        actions, user_data, forfeited = self.frames[sim.frame]
+        sim.user_data = list(user_data)
+
+        def replay_actions(sim: Simulator):
+            # a player forfeits while running the bots, before the actions
+            for player, flag in enumerate(forfeited):
+                if flag and not sim.forfeited[player]:
+                    sim.forfeit(player)
+            # bot indices refer to the bot list after spawning and forfeits
+            return [
+                (sim.bots[i].x, sim.bots[i].y, args)
+                for i, args in actions
+            ]
+
+        sim.step(actions=replay_actions)
+
+
+def _read(fp: BinaryIO, fmt: Union[int, struct.Struct]) -> Union[bytes, tuple]:
+    if isinstance(fmt, int):
+        return fp.read(fmt)
+    return fmt.unpack(fp.read(fmt.size))
+
+
+def _encode_action(command: str, args: Sequence[str]) -> int:
+    code = _ACTION_LETTERS.index(_COMMAND_LETTERS[command]) * 4
+    if command in ("move", "attack"):
+        code += _DIRECTIONS.index(args[0])
+    return code
+
+
+def _decode_action(code: int) -> Tuple[str, ...]:
+    letter = _ACTION_LETTERS[code // 4]
+    if Simulator.ACTIONS[letter] in ("move", "attack"):
+        return letter, _DIRECTIONS[code % 4]
+    return letter,
+
+
+def _write_varint(fp: BinaryIO, value: int):
+    while value >= 0x80:
+        fp.write(_U8.pack(value & 0x7f | 0x80))
+        value >>= 7
+    fp.write(_U8.pack(value))
+
+
+def _read_varint(fp: BinaryIO) -> int:
+    value, shift = 0, 0
+    while True:
+        byte, = _read(fp, _U8)
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value
+        shift += 7
+
+
+def _write_user_data(fp: BinaryIO, user_data: List[str]):
+    for data in user_data:
+        data = data.encode()
+        _write_varint(fp, len(data))
+        fp.write(data)
+
+
+def _read_user_data(fp: BinaryIO) -> List[str]:
+    return [
+        _read(fp, _read_varint(fp)).decode()
+        for i in range(2)
+    ]
+
+
+def _forfeit_bits(forfeited: Sequence[bool]) -> int:
+    return sum(1 << i for i, flag in enumerate(forfeited) if flag)
+
+
+def _read_forfeit_bits(fp: BinaryIO) -> Tuple[bool, ...]:
+    bits, = _read(fp, _U8)
+    return tuple(bool(bits & (1 << i)) for i in range(2))
+
+
+def _write_keyframe(fp: BinaryIO, sim: Simulator):
+    num_bots = len(sim.bots)
+    fp.write(_U8.pack(_forfeit_bits(sim.forfeited)))
+    fp.write(_U16.pack(num_bots))
+    fp.write(bytes(b.player for b in sim.bots))
+    fp.write(bytes(b.x for b in sim.bots))
+    fp.write(bytes(b.y for b in sim.bots))
+    fp.write(struct.pack(f"<{num_bots}h", *(b.energy for b in sim.bots)))
+    fp.write(_STATS.pack(*(v for key in Simulator.STATS for v in sim.stats[key])))
+    _write_user_data(fp, sim.user_data)
+
+
+def _read_keyframe(
+        fp: BinaryIO,
+) -> Tuple[List[Tuple[int, int, int, int]], Sequence[int], List[str], Tuple[bool, ...]]:
+    forfeited = _read_forfeit_bits(fp)
+    num_bots, = _read(fp, _U16)
+    players = _read(fp, num_bots)
+    xs = _read(fp, num_bots)
+    ys = _read(fp, num_bots)
+    energies = _read(fp, struct.Struct(f"<{num_bots}h"))
+    stats = _read(fp, _STATS)
+    return list(zip(players, xs, ys, energies)), stats, _read_user_data(fp), forfeited
+
+
+def _restore_keyframe(
+        sim: Simulator,
+        frame: int,
+        keyframe: Tuple[List[Tuple[int, int, int, int]], Sequence[int], List[str], Tuple[bool, ...]],
+):
+    bots, stats, user_data, forfeited = keyframe
+    sim.restore(SimulatorSnapshot(
+        frame=frame,
+        bots=tuple(bots),
+        stats=tuple(tuple(stats[i * 2: i * 2 + 2]) for i in range(len(Simulator.STATS))),
+        user_data=tuple(user_data),
+        genomes=tuple(sim.bot_genomes),
+        forfeited=forfeited,
+    ))
@@ -0,0 +1,125 @@
+"""
+One record per match, streamed to a JSONL or CSV file.
+
+A record is a flat dict, the values of the two players have the
+suffixes `_1` and `_2`, in the order of the Simulator (player 1 is
+the yellow one). Use `read_records` to read a file back.
+"""
+import csv
+import json
+from pathlib import Path
+from typing import Optional, Union, List, Generator, Sequence
+
+from .simulator import timing_summary
+
+
+def match_record(
+        bot_files: Sequence[Union[str, Path]],
+        seed: Optional[int],
+        result: dict,
+        **extra,
+) -> dict:
+    """
+    Flat record of a match.
+
+    :param bot_files: the two bot files in player order
+    :param seed: the seed of the Simulator
+    :param result: dict as returned by `cache.run_match`
+    :param extra: any additional values like the match index
+    """
+    record = {
+        **extra,
+        "seed": seed,
+        "bot_1": str(bot_files[0]),
+        "bot_2": str(bot_files[1]),
+    }
+    for i in range(2):
+        record[f"bots_{i + 1}"] = result["num_bots"][i]
+    for key, values in result["stats"].items():
+        for i in range(2):
+            record[f"{key}_{i + 1}"] = values[i]
+    for i in range(2):
+        record[f"overruns_{i + 1}"] = result["overruns"][i] if "overruns" in result else None
+    # cached results have no timings
+    for kind in ("wall", "cpu"):
+        for i in range(2):
+            samples = result["timings"][kind][i] if "timings" in result else []
+            for key, value in timing_summary(samples).items():
+                record[f"{kind}_{key}_{i + 1}"] = value
+    return record
+
+
+class ResultSink:
+    """
+    Buffered writer of match records, appends to an existing file.
+
+    :param filename: str or Path, the format is CSV for a `.csv` suffix and JSONL otherwise
+    :param buffer_size: int, number of records to keep before writing them
+    """
+
+    def __init__(self, filename: Union[str, Path], buffer_size: int = 100):
+        self.filename = Path(filename)
+        self.format = "csv" if self.filename.suffix.lower() == ".csv" else "jsonl"
+        self.buffer_size = buffer_size
+        self._buffer: List[dict] = []
+        self._columns: Optional[List[str]] = None
+        if self.format == "csv" and self.filename.exists() and self.filename.stat().st_size:
+            with self.filename.open(newline="") as fp:
+                self._columns = next(csv.reader(fp))
+        self._fp = self.filename.open("a", newline="")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, record: dict):
+        self._buffer.append(record)
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            if self.format == "csv":
+                if self._columns is None:
+                    self._columns = list(self._buffer[0])
+                    csv.writer(self._fp).writerow(self._columns)
+                writer = csv.DictWriter(self._fp, self._columns, extrasaction="ignore")
+                writer.writerows(self._buffer)
+            else:
+                self._fp.writelines(json.dumps(r) + "\n" for r in self._buffer)
+            self._buffer.clear()
+        self._fp.flush()
+
+    def close(self):
+        if not self._fp.closed:
+            self.flush()
+            self._fp.close()
+
+
+def read_records(filename: Union[str, Path]) -> Generator[dict, None, None]:
+    """
+    Yield the records of a JSONL or CSV file, numbers in CSV files
+    are converted and empty values are None
+    """
+    filename = Path(filename)
+    with filename.open(newline="") as fp:
+        if filename.suffix.lower() == ".csv":
+            for row in csv.DictReader(fp):
+                yield {key: _parse_csv_value(value) for key, value in row.items()}
+        else:
+            for line in fp:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _parse_csv_value(value: str) -> Union[None, int, float, str]:
+    if value == "":
+        return None
+    for parse in (int, float):
+        try:
+            return parse(value)
+        except ValueError:
+            pass
+    return value
@@ -0,0 +1,288 @@
+"""
+Pairing schedules for the evaluation of a `BotPool`.
+
+A scheduler returns the (player 1, player 2) pairs of population
+entries for each round of a generation. The rounds are evaluated one
+after another, so a scheduler can pair by the results of the previous
+rounds. `num_matches` is the match budget of one generation.
+"""
+import random
+from pathlib import Path
+from typing import List, Tuple, Dict, Any, Union, Sequence, Optional
+
+
+def fitness(stats: dict) -> float:
+    """
+    Fitness of the summed match stats of a population entry, normalised per match
+    """
+    wins = stats.get("wins", 0)
+    defeats = stats.get("defeats", 0)
+    kills = stats.get("enemy_kills", 0)
+    return (wins - defeats + kills / 5.) / max(1, stats.get("matches", 0))
+
+
+class PairingScheduler:
+    """
+    Base class of the schedulers
+    """
+
+    def num_rounds(self, population_size: int) -> int:
+        return 1
+
+    def pairs(
+            self,
+            population: List[dict],
+            rand: random.Random,
+            round: int,
+            results: Dict[Any, dict],
+    ) -> List[Tuple[dict, dict]]:
+        """
+        Return the pairs of one round.
+
+        :param population: list of population entries
+        :param rand: the random generator of the pool
+        :param round: int, index of the round in this generation
+        :param results: the summed stats per population id of the previous rounds
+        """
+        raise NotImplementedError
+
+    def num_matches(self, population_size: int) -> int:
+        raise NotImplementedError
+
+    def finish(self, population: List[dict]):
+        """
+        Called after the fitness of the population is updated
+        """
+        pass
+
+    def __str__(self):
+        return self.__class__.__name__
+
+
+class AllPairsScheduler(PairingScheduler):
+    """
+    Every entry plays every other entry as player 1, which
+    is `P * (P - 1)` matches for a population of size `P`
+    """
+
+    def pairs(self, population, rand, round, results):
+        return [
+            (pop1, pop2)
+            for pop1 in population
+            for pop2 in population
+            if pop1 is not pop2
+        ]
+
+    def num_matches(self, population_size: int) -> int:
+        return population_size * (population_size - 1)
+
+    def __str__(self):
+        return "all pairs"
+
+
+class RandomOpponentsScheduler(PairingScheduler):
+    """
+    Every entry plays `k` different random opponents as player 1,
+    and on average `k` times as player 2.
+    """
+
+    def __init__(self, k: int = 4):
+        self.k = k
+
+    def pairs(self, population, rand, round, results):
+        pairs = []
+        for pop in population:
+            others = [p for p in population if p is not pop]
+            for other in rand.sample(others, min(self.k, len(others))):
+                pairs.append((pop, other))
+        return pairs
+
+    def num_matches(self, population_size: int) -> int:
+        return population_size * min(self.k, population_size - 1)
+
+    def __str__(self):
+        return f"{self.k} random opponents"
+
+
+class SwissScheduler(PairingScheduler):
+    """
+    Swiss-system pairing in `rounds` rounds.
+
+    Entries are sorted by their fitness, the first round uses the fitness
+    of the previous generation, later rounds the results of this one.
+    Each entry is paired with the nearest one in the ranking that it did
+    not play in this generation, if possible. With an odd population size the lowest ranked entry
+    that did not sit out before sits out the round. Colours alternate
+    between rounds.
+    """
+
+    def __init__(self, rounds: int = 5):
+        self.rounds = rounds
+        self._played = set()
+        self._byes = set()
+
+    def num_rounds(self, population_size: int) -> int:
+        return self.rounds
+
+    def pairs(self, population, rand, round, results):
+        if round == 0:
+            self._played = set()
+            self._byes = set()
+            scores = {pop["id"]: pop["fitness"] for pop in population}
+        else:
+            scores = {pop["id"]: fitness(results.get(pop["id"], {})) for pop in population}
+
+        # random order of entries with equal scores
+        ranking = sorted(population, key=lambda p: (-scores[p["id"]], rand.random()))
+        if len(ranking) % 2:
+            bye = next(
+                (p for p in reversed(ranking) if p["id"] not in self._byes),
+                ranking[-1],
+            )
+            self._byes.add(bye["id"])
+            ranking.remove(bye)
+
+        self._num_tries = 0
+        pairs = self._pair(ranking)
+        if pairs is None:
+            # rematches are unavoidable, pair the neighbours
+            pairs = list(zip(ranking[::2], ranking[1::2]))
+
+        for pop, other in pairs:
+            self._played.add((pop["id"], other["id"]))
+            self._played.add((other["id"], pop["id"]))
+        return [
+            (pop, other) if round % 2 == 0 else (other, pop)
+            for pop, other in pairs
+        ]
+
+    def _pair(self, ranking: List[dict]) -> Optional[List[Tuple[dict, dict]]]:
+        """
+        Pair the first entry with the nearest one it did not play, such that
+        the rest can be paired as well. Returns None if there is no such
+        pairing or the search takes too long.
+        """
+        if not ranking:
+            return []
+        pop = ranking[0]
+        for i in range(1, len(ranking)):
+            self._num_tries += 1
+            if self._num_tries > 10_000:
+                return None
+            other = ranking[i]
+            if (pop["id"], other["id"]) not in self._played:
+                rest = self._pair(ranking[1:i] + ranking[i + 1:])
+                if rest is not None:
+                    return [(pop, other)] + rest
+        return None
+
+    def num_matches(self, population_size: int) -> int:
+        return self.rounds * (population_size // 2)
+
+    def __str__(self):
+        return f"swiss with {self.rounds} rounds"
+
+
+class PanelScheduler(PairingScheduler):
+    """
+    Every entry plays a fixed panel of benchmark bots, with each colour.
+
+    The panel bots use their default genome and are not part of the
+    population. Their ids start with `panel:`.
+    """
+
+    def __init__(self, bot_files: Sequence[Union[str, Path]]):
+        self.panel = [
+            {
+                "id": f"panel:{i}:{Path(fn).name}",
+                "file": str(fn),
+                "genome": None,
+            }
+            for i, fn in enumerate(bot_files)
+        ]
+
+    def pairs(self, population, rand, round, results):
+        pairs = []
+        for pop in population:
+            for opponent in self.panel:
+                pairs.append((pop, opponent))
+                pairs.append((opponent, pop))
+        return pairs
+
+    def num_matches(self, population_size: int) -> int:
+        return population_size * len(self.panel) * 2
+
+    def __str__(self):
+        return "panel of " + ", ".join(Path(p["file"]).name for p in self.panel)
+
+
+class SuccessiveHalvingScheduler(PairingScheduler):
+    """
+    Racing of the population with a fixed match budget per generation.
+
+    In each round the remaining contenders play random other contenders,
+    then the better half by fitness in this generation continues, until
+    `keep` contenders are left. The budget is split evenly between the
+    rounds, so the last contenders play the most matches.
+
+    `finish` stores the number of rounds an entry took part in as
+    `race_rounds` of the entry, which `BotPool.select_population`
+    ranks before the fitness.
+    """
+
+    def __init__(self, budget: int, keep: int = 5):
+        self.budget = budget
+        self.keep = keep
+        self._contenders = []
+        self._rounds = {}
+
+    def num_rounds(self, population_size: int) -> int:
+        rounds = 1
+        while population_size > self.keep and population_size > 2:
+            population_size = (population_size + 1) // 2
+            rounds += 1
+        return rounds
+
+    def _matches_per_contender(self, population_size: int, num_contenders: int) -> int:
+        return max(1, self.budget // self.num_rounds(population_size) // num_contenders)
+
+    def pairs(self, population, rand, round, results):
+        if round == 0:
+            self._contenders = list(population)
+            self._rounds = {}
+        else:
+            self._contenders.sort(key=lambda p: (-fitness(results.get(p["id"], {})), rand.random()))
+            self._contenders = self._contenders[:(len(self._contenders) + 1) // 2]
+
+        for pop in self._contenders:
+            self._rounds[pop["id"]] = round + 1
+
+        count = self._matches_per_contender(len(population), len(self._contenders))
+        pairs = []
+        for pop in self._contenders:
+            others = [p for p in self._contenders if p is not pop]
+            if not others:
+                # a single contender has no opponents
+                continue
+            opponents = []
+            while len(opponents) < count:
+                opponents += rand.sample(others, min(count - len(opponents), len(others)))
+            pairs += [(pop, other) for other in opponents]
+        return pairs
+
+    def num_matches(self, population_size: int) -> int:
+        num = 0
+        contenders = population_size
+        for round in range(self.num_rounds(population_size)):
+            if round:
+                contenders = (contenders + 1) // 2
+            if contenders > 1:
+                num += contenders * self._matches_per_contender(population_size, contenders)
+        return num
+
+    def finish(self, population: List[dict]):
+        for pop in population:
+            pop["race_rounds"] = self._rounds.get(pop["id"], 0)
+
+    def __str__(self):
+        return f"successive halving with a budget of {self.budget} matches down to {self.keep}"
@@ -0,0 +1,89 @@
+import math
+from statistics import NormalDist
+from typing import Optional, Tuple
+
+
+class SPRT:
+    """
+    Sequential probability ratio test of the score of player a against player b.
+
+    A game scores 1 for a win, .5 for a draw and 0 for a loss of a.
+    The test decides between the hypotheses that the expected score
+    is `.5 - delta` (b is better) and `.5 + delta` (a is better) with
+    error probabilities `alpha` and `beta`. Scores inside the indifference
+    zone `.5 +/- delta` may be decided either way.
+
+    The log-likelihood ratio uses the normal approximation of the
+    score distribution (generalized SPRT). One win and one loss are
+    added to the variance estimate, so a few lucky games in a row
+    do not end the test.
+    """
+
+    def __init__(self, delta: float = .05, alpha: float = .05, beta: float = .05):
+        self.delta = delta
+        self.alpha = alpha
+        self.beta = beta
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+
+    @property
+    def num_games(self) -> int:
+        return self.wins + self.draws + self.losses
+
+    def add(self, wins: int = 0, draws: int = 0, losses: int = 0):
+        self.wins += wins
+        self.draws += draws
+        self.losses += losses
+
+    @property
+    def score(self) -> float:
+        """
+        The mean score of player a, .5 without games
+        """
+        if not self.num_games:
+            return .5
+        return (self.wins + .5 * self.draws) / self.num_games
+
+    def _variance(self) -> float:
+        # with one additional win and loss
+        n = self.num_games + 2
+        mean = (self.wins + 1 + .5 * self.draws) / n
+        return (
+            (self.wins + 1) * (1. - mean) ** 2
+            + self.draws * (.5 - mean) ** 2
+            + (self.losses + 1) * mean ** 2
+        ) / n
+
+    @property
+    def llr(self) -> float:
+        """
+        Log-likelihood ratio of "a is better" against "b is better"
+        """
+        s0, s1 = .5 - self.delta, .5 + self.delta
+        return self.num_games * (s1 - s0) * (2. * self.score - s0 - s1) / (2. * self._variance())
+
+    @property
+    def bounds(self) -> Tuple[float, float]:
+        return math.log(self.beta / (1. - self.alpha)), math.log((1. - self.beta) / self.alpha)
+
+    def decision(self) -> Optional[int]:
+        """
+        0 if player a is better, 1 if player b is better or None if undecided
+        """
+        if not self.num_games:
+            return None
+        lower, upper = self.bounds
+        llr = self.llr
+        if llr >= upper:
+            return 0
+        if llr <= lower:
+            return 1
+
+    def interval(self, confidence: float = .95) -> Tuple[float, float]:
+        """
+        Normal approximation of the confidence interval of the score
+        """
+        z = NormalDist().inv_cdf(.5 + confidence / 2.)
+        error = z * math.sqrt(self._variance() / max(1, self.num_games))
+        return max(0., self.score - error), min(1., self.score + error)
@@ -1,10 +1,18 @@
+import io
 import os
+import sys
+import time
+import resource
 import traceback
 import random
 import subprocess
 import importlib
+from copy import deepcopy
 from pathlib import Path
-from typing import Union, Optional, List
+from typing import Union, Optional, List, Tuple, Sequence, Callable, NamedTuple, Any
+
+from .observer import SimulatorObserver, LogObserver
+from .profiler import PhaseProfiler
 
 
 class Bot:
@@ -21,11 +29,88 @@ class Bot:
         return f"{chr(ord('a') + self.player)}{self.x}:{self.y}"
 
 
+def derive_seed(seed: int, *keys: Union[int, str]) -> int:
+    """
+    Derive an independent 64 bit seed from `seed` and any number of keys.
+
+    The result does not depend on the python process (unlike `hash()`).
+    """
+    return random.Random("-".join(str(k) for k in (seed,) + keys)).getrandbits(64)
+
+
+def timing_summary(samples: Sequence[int]) -> dict:
+    """
+    Median, 95th percentile and maximum of nanosecond samples in milliseconds
+    """
+    if not samples:
+        return {"p50": None, "p95": None, "max": None}
+    samples = sorted(samples)
+    return {
+        "p50": samples[(len(samples) - 1) // 2] / 1_000_000,
+        "p95": samples[(len(samples) * 95 - 1) // 100] / 1_000_000,
+        "max": samples[-1] / 1_000_000,
+    }
+
+
+class SimulatorSnapshot(NamedTuple):
+    """
+    Immutable state of a `Simulator` between two frames,
+    see `Simulator.snapshot()` and `Simulator.restore()`
+    """
+    frame: int
+    # (player, x, y, energy) of each bot in order
+    bots: Tuple[Tuple[int, int, int, int], ...]
+    # values per player of each key in `Simulator.STATS`
+    stats: Tuple[Tuple[int, ...], ...]
+    user_data: Tuple[str, ...]
+    genomes: Tuple[Any, ...]
+    # state of the seeded `Simulator.rand`
+    rand_state: Optional[tuple] = None
+    forfeited: Tuple[bool, ...] = (False, False)
+
+
 class Simulator:
     """
     Simulates the matches at botwars.io
 
     Create a new instance for each match!
+
+    File-based bots (which do not provide a `GameBase` class) are started
+    as a new python process in each round, like on botwars.io. With
+    `warm_files` enabled, each file bot runs inside one long-lived worker
+    process instead (see `src/file_worker.py`). Call `close()` at the end
+    of the match to stop the workers.
+
+    `GameBase` modules are created directly from the bot records via
+    `GameBase.from_state` and their actions are read as tuples. Set
+    `serialize` to run them through the botwars.io string protocol
+    instead, which is the reference. `check_protocol` compares both
+    ways in each round and raises an `AssertionError` on any difference.
+
+    With a `seed`, the random actions and the `GameBase.rand` of each
+    module bot in each frame are reproducible. File bots always use
+    their own randomness.
+
+    Logging and display is done by `SimulatorObserver`s, see `add_observer`.
+    A `LogObserver` is attached by default, which fills `log_lines`.
+    In `headless` mode no observer is attached and no strings are
+    formatted at all.
+
+    The wall and CPU time of each bot in each frame is collected in
+    `timings`, see `timing_stats()`. CPU time can not be measured for
+    file bots in `warm_files` mode. With a `time_budget` in milliseconds,
+    a bot that takes more wall time is counted in `overruns` and,
+    depending on the `budget_policy`, its output is ignored ("empty")
+    or it loses all bots and does not spawn anymore ("forfeit").
+    The default policy "flag" only counts the overruns.
+
+    With `profile` enabled, the time of each phase of a frame (bot
+    state serialization, bot calls, output parsing, defend, move, attack,
+    explode, death, observers, ...) is accumulated in `profiler`.
+
+    `snapshot()` returns the state between two frames which can be
+    applied to another Simulator with `restore()`. `fork()` creates
+    a copy of the Simulator to branch off a match.
     """
     ACTIONS = {
         "A": "attack",
@@ -45,11 +130,25 @@ class Simulator:
     FRIENDLY_ATTACK = 8
     EXPLODE_ATTACK = 6
 
+    SPAWN_POINTS = [
+        [(4, 4), (4, 11)],
+        [(11, 4), (11, 11)],
+    ]
+
+    STATS = (
+        "defends", "useless_defends", "moves", "failed_moves",
+        "enemy_attacks", "self_attacks", "missed_attacks",
+        "enemy_kills", "self_kills",
+        "explosions", "overspawned",
+    )
+
     COLOR1 = "\033[93m"
     COLOR2 = "\033[96m"
     COLOR_RED = "\033[91m"
     COLOR_OFF = "\033[m"
 
+    BUDGET_POLICIES = ("flag", "empty", "forfeit")
+
     def __init__(
             self,
             bot1: Union[str, Path],
@@ -58,45 +157,175 @@ class Simulator:
             height: int = 16,
             spawn_frame_interval: int = 10,
             random_probability: float = 0.,
+            warm_files: bool = False,
+            serialize: bool = False,
+            check_protocol: bool = False,
+            headless: bool = False,
+            seed: Optional[int] = None,
+            time_budget: Optional[float] = None,
+            budget_policy: str = "flag",
+            profile: bool = False,
     ):
+        if budget_policy not in self.BUDGET_POLICIES:
+            raise ValueError(f"budget_policy must be one of {self.BUDGET_POLICIES}, got '{budget_policy}'")
+
         self.width = width
         self.height = height
         self.spawn_frame_interval = spawn_frame_interval
         self.random_probability = random_probability
+        self.warm_files = warm_files
+        self.serialize = serialize
+        self.check_protocol = check_protocol
+        self.headless = headless
+        self.seed = seed
+        self.time_budget = time_budget
+        self.budget_policy = budget_policy
+        # accumulates the time of each phase of `step()`
+        self.profiler: Optional[PhaseProfiler] = PhaseProfiler() if profile else None
+        # the global random module is used if no seed is given
+        self.rand = random if seed is None else random.Random(derive_seed(seed, "simulator"))
         self.bot_files = [Path(bot1), Path(bot2)]
         self.bot_modules = []
         for f in self.bot_files:
+            # plain script bots read stdin on import, so give them nothing
+            stdin, sys.stdin = sys.stdin, io.StringIO()
             try:
                 module = importlib.import_module(str(f).replace(os.sep, ".")[:-3])
                 if hasattr(module, "Game"):
                     self.bot_modules.append(module)
-                continue
+                    continue
             except ImportError:
                 pass
+            finally:
+                sys.stdin = stdin
             self.bot_modules.append(None)
 
         self.map = []
         self.bots = []
-        self.spawn_points = [
-            [(4, 4), (4, 11)],
-            [(11, 4), (11, 11)],
-        ]
+        # flat position -> Bot index for O(1) lookups, index is y * width + x
+        self.bot_grid: List[Optional[Bot]] = [None] * (self.width * self.height)
+        self.spawn_points = [list(p) for p in self.SPAWN_POINTS]
         self.frame = 0
         self.stats = {
             key: [0] * len(self.bot_files)
-            for key in (
-                "defends", "useless_defends", "moves", "failed_moves",
-                "enemy_attacks", "self_attacks", "missed_attacks",
-                "enemy_kills", "self_kills",
-                "explosions", "overspawned",
-            )
+            for key in self.STATS
         }
         self.user_data = [""] * len(self.bot_files)
         self.bot_genomes = [None] * len(self.bot_files)
+        self.file_workers = {}
+        # nanoseconds per player and frame
+        self.timings = {
+            "wall": [[] for _ in self.bot_files],
+            "cpu": [[] for _ in self.bot_files],
+        }
+        self.overruns = [0] * len(self.bot_files)
+        self.forfeited = [False] * len(self.bot_files)
+
+        self.observers: List[SimulatorObserver] = []
+        self.logger: Optional[LogObserver] = None
+        if not headless:
+            self.logger = LogObserver()
+            self.add_observer(self.logger)
 
-        self.log_lines = []
         self.init_map()
 
+    @property
+    def log_lines(self) -> List[str]:
+        return self.logger.log_lines if self.logger else []
+
+    def add_observer(self, observer: SimulatorObserver):
+        self.observers.append(observer)
+
+    def params(self) -> dict:
+        """
+        The constructor arguments of this Simulator
+        """
+        return {
+            "bot1": self.bot_files[0],
+            "bot2": self.bot_files[1],
+            "width": self.width,
+            "height": self.height,
+            "spawn_frame_interval": self.spawn_frame_interval,
+            "random_probability": self.random_probability,
+            "warm_files": self.warm_files,
+            "serialize": self.serialize,
+            "check_protocol": self.check_protocol,
+            "headless": self.headless,
+            "seed": self.seed,
+            "time_budget": self.time_budget,
+            "budget_policy": self.budget_policy,
+            "profile": self.profiler is not None,
+        }
+
+    def snapshot(self) -> SimulatorSnapshot:
+        """
+        Return the current state of the match.
+
+        Observers, file workers and the unseeded global random
+        state are not part of the snapshot.
+        """
+        return SimulatorSnapshot(
+            frame=self.frame,
+            bots=tuple((b.player, b.x, b.y, b.energy) for b in self.bots),
+            stats=tuple(tuple(self.stats[key]) for key in self.STATS),
+            user_data=tuple(self.user_data),
+            genomes=tuple(deepcopy(self.bot_genomes)),
+            rand_state=self.rand.getstate() if self.seed is not None else None,
+            forfeited=tuple(self.forfeited),
+        )
+
+    def restore(self, snapshot: SimulatorSnapshot):
+        """
+        Set the state of the match from a snapshot.
+
+        The random state is only restored if the snapshot has one
+        and this Simulator is seeded. Raises a ValueError if a bot of the
+        snapshot is outside of the map, on a wall or on another bot,
+        e.g. for a snapshot of a Simulator with another width or height.
+        """
+        positions = set()
+        for player, x, y, energy in snapshot.bots:
+            if not (0 <= x < self.width and 0 <= y < self.height) or self.map[y][x] is True:
+                raise ValueError(f"Bot at {x}:{y} of the snapshot is not free in the {self.width}x{self.height} map")
+            if (x, y) in positions:
+                raise ValueError(f"Two bots at {x}:{y} in the snapshot")
+            positions.add((x, y))
+
+        self.frame = snapshot.frame
+        self.bots = []
+        self.bot_grid = [None] * (self.width * self.height)
+        for player, x, y, energy in snapshot.bots:
+            bot = self.add_bot(player, x, y)
+            bot.energy = energy
+        for key, values in zip(self.STATS, snapshot.stats):
+            self.stats[key] = list(values)
+        self.user_data = list(snapshot.user_data)
+        self.bot_genomes = deepcopy(list(snapshot.genomes))
+        if snapshot.rand_state is not None and self.seed is not None:
+            self.rand.setstate(snapshot.rand_state)
+        self.forfeited = list(snapshot.forfeited)
+
+    def fork(self, **kwargs) -> "Simulator":
+        """
+        Return a new Simulator in the current state of this one.
+
+        Any keyword arguments replace the constructor arguments, e.g. another
+        `bot1` file, which starts with its default genome, or another `seed`,
+        which starts new random actions and bot seeds from this frame on.
+        Another `width` or `height` raises a ValueError if the bots do not
+        fit on the new map, see `restore`. Observers are not copied.
+        """
+        sim = Simulator(**{**self.params(), **kwargs})
+        snapshot = self.snapshot()
+        if "seed" in kwargs:
+            snapshot = snapshot._replace(rand_state=None)
+        snapshot = snapshot._replace(genomes=tuple(
+            genome if f1 == f2 else None
+            for genome, f1, f2 in zip(snapshot.genomes, self.bot_files, sim.bot_files)
+        ))
+        sim.restore(snapshot)
+        return sim
+
     def init_map(self):
         self.map = [
             [None] * self.width
@@ -113,57 +342,74 @@ class Simulator:
         self.map[-2][-2] = True
         self.map[1][-2] = True
 
-    def spawn(self):
+    def spawn(self) -> List[Bot]:
+        bots = []
         for player_index, spawn_points in enumerate(self.spawn_points):
+            if self.forfeited[player_index]:
+                continue
             for x, y in spawn_points:
-                self.add_bot(player_index, x, y)
+                bot = self.add_bot(player_index, x, y)
+                if bot:
+                    bots.append(bot)
+        return bots
+
+    def step(
+            self,
+            actions: Optional[Callable[["Simulator"], List[Tuple[int, int, Sequence[str]]]]] = None,
+    ):
+        """
+        Run one frame.
 
-    def step(self):
-        self.log_lines = []
-        self.log_lines.append(f"frame: {self.frame}")
+        :param actions: optional callable that returns a list of (x, y, args)
+            which is applied instead of running the bots, e.g. from a replay.
+            It is called after spawning. args is the action letter followed
+            by its arguments. No random actions are applied.
+        """
+        observers = self.observers
+        prof = self.profiler
+        if prof:
+            t = time.perf_counter_ns()
+
+        for o in observers:
+            o.on_frame_start(self)
+        if prof:
+            t = prof.lap("observers", t)
 
         if self.frame % self.spawn_frame_interval == 0:
-            self.spawn()
-            self.log_lines.append("spawned")
+            bots = self.spawn()
+            if prof:
+                t = prof.lap("spawn", t)
+            for o in observers:
+                o.on_spawn(self, bots)
+            if prof:
+                t = prof.lap("observers", t)
 
         if self.frame == 0:
+            for o in observers:
+                o.on_frame_end(self)
+            if prof:
+                prof.lap("observers", t)
             self.frame += 1
             return
 
-        # --- show map and process bots ---
-
-        bot_outputs = []
-        for i, (bot_file, bot_module) in enumerate(zip(self.bot_files, self.bot_modules)):
-            input = self.game_state(i)
-            if bot_module:
-                output = self.process_module(bot_module, input, i).strip()
-            else:
-                output = self.process_file(bot_file, input).strip()
-
-            output_args = output.split("#")
-            bot_outputs.append(output_args[0])
-            #print(f"INPUT player {i} : {input}")
-            #print(f"OUTPUT player {i}: {output}")
-
-            if len(output_args) > 1:
-                self.user_data[i] = output_args[1]
-            else:
-                self.user_data[i] = ""
-
-        # --- split action strings ---
-
-        bot_actions = []
-        for i, bot_output in enumerate(bot_outputs):
-            if bot_output:
-                for action in bot_output.split(","):
-                    args = action.split("-")
-                    x, y = (int(a) - 1 for a in args[0].split(":"))
-                    bot = self.get_bot(x, y)
-                    if bot and bot.player == i:
-                        if self.random_probability and random.random() < self.random_probability:
-                            bot_actions.append((bot, "move", [random.choice(list(self.DIRECTIONS))]))
-                        else:
-                            bot_actions.append((bot, self.ACTIONS[args[1]], args[2:]))
+        if actions is not None:
+            bot_actions = []
+            for x, y, args in actions(self):
+                bot = self.get_bot(x, y)
+                if bot:
+                    bot_actions.append((bot, self.ACTIONS[args[0]], args[1:]))
+            if prof:
+                t = prof.lap("resolve", t)
+        else:
+            # laps the bot phases itself
+            bot_actions = self.process_bots()
+            if prof:
+                t = time.perf_counter_ns()
+
+        for o in observers:
+            o.on_actions(self, bot_actions)
+        if prof:
+            t = prof.lap("observers", t)
 
         # --- apply defend actions ---
 
@@ -175,6 +421,8 @@ class Simulator:
             if command == "defend":
                 bot.defend = True
                 self.stats["defends"][bot.player] += 1
+        if prof:
+            t = prof.lap("defend", t)
 
         # --- apply move actions ---
 
@@ -187,11 +435,16 @@ class Simulator:
 
         for pos, bots in move_targets.items():
             if not self.get_map(*pos) and len(bots) == 1:
-                bots[0].x, bots[0].y = pos
+                from_pos = bots[0].x, bots[0].y
+                self.move_bot(bots[0], *pos)
                 self.stats["moves"][bots[0].player] += 1
+                for o in observers:
+                    o.on_move(self, bots[0], from_pos)
             else:
                 for b in bots:
                     self.stats["failed_moves"][b.player] += 1
+        if prof:
+            t = prof.lap("move", t)
 
         # --- apply attack/explode actions ---
 
@@ -207,9 +460,6 @@ class Simulator:
                     if other.defend:
                         energy //= 2
                     other.energy -= energy
-                    self.log_lines.append(
-                        f"{bot.color}{bot} attacked {other.color}{other}{self.COLOR_OFF}"
-                    )
                     if is_friendly:
                         self.stats["self_attacks"][bot.player] += 1
                         if other.energy <= 0:
@@ -220,14 +470,20 @@ class Simulator:
                             self.stats["enemy_kills"][bot.player] += 1
                 else:
                     self.stats["missed_attacks"][bot.player] += 1
+                for o in observers:
+                    o.on_attack(self, bot, other)
+                if prof:
+                    t = prof.lap("attack", t)
 
             # TODO: bots always explode even if killed
             elif command == "explode":
+                others = []
                 for y in range(-1, 2):
                     for x in range(-1, 2):
                         if x or y:
                             other = self.get_bot(bot.x + x, bot.y + y)
                             if other:
+                                others.append(other)
                                 other.energy -= self.EXPLODE_ATTACK
                                 if other.energy <= 0:
                                     if bot.player != other.player:
@@ -236,7 +492,10 @@ class Simulator:
                                         self.stats["self_kills"][bot.player] += 1
                 bot.energy = 0
                 self.stats["explosions"][bot.player] += 1
-                self.log_lines.append(f"{self.COLOR_RED}{bot} exploded{self.COLOR_OFF}")
+                for o in observers:
+                    o.on_explode(self, bot, others)
+                if prof:
+                    t = prof.lap("explode", t)
 
         for b in self.bots:
             if b.defend and not b.attacked:
@@ -247,23 +506,126 @@ class Simulator:
             if b.energy <= 0
         ]
         if died_bots:
-            self.log_lines.append("died: " + ", ".join(str(b) for b in died_bots))
-
-        self.bots = [
-            b for b in self.bots
-            if b.energy > 0
-        ]
-        self.log_lines.append("attacks (e/f): " + " ".join(
-            f"{e}/{f}"
-            for e, f in zip(self.stats["enemy_attacks"], self.stats["self_attacks"])
-        ))
-        self.log_lines.append("kills (e/f): " + " ".join(
-            f"{e}/{f}"
-            for e, f in zip(self.stats["enemy_kills"], self.stats["self_kills"])
-        ))
-        self.log_lines.append("bots: " + " ".join(str(n) for n in self.num_bots()))
+            for b in died_bots:
+                self.bot_grid[b.y * self.width + b.x] = None
+
+            self.bots = [
+                b for b in self.bots
+                if b.energy > 0
+            ]
+            for o in observers:
+                o.on_death(self, died_bots)
+        if prof:
+            t = prof.lap("death", t)
+
+        for o in observers:
+            o.on_frame_end(self)
+        if prof:
+            prof.lap("observers", t)
         self.frame += 1
 
+    def process_bots(self) -> List[Tuple[Bot, str, Sequence[str]]]:
+        """
+        Run the bots of both players and return their valid actions
+        as list of (bot, command, args)
+        """
+        prof = self.profiler
+        bot_outputs = []
+        for i, (bot_file, bot_module) in enumerate(zip(self.bot_files, self.bot_modules)):
+            if self.forfeited[i]:
+                bot_outputs.append([])
+                continue
+
+            start_wall, start_cpu = time.perf_counter_ns(), self._cpu_time_ns(bot_module)
+
+            if bot_module and not self.serialize:
+                actions, user_data = self.process_module_direct(bot_module, i)
+            else:
+                input = self.game_state(i)
+                if prof:
+                    t = prof.lap("serialize", start_wall)
+                if bot_module:
+                    output = self.process_module(bot_module, input, i).strip()
+                else:
+                    output = self.process_file(bot_file, input).strip()
+                if prof:
+                    t = prof.lap("bot", t)
+                #print(f"INPUT player {i} : {input}")
+                #print(f"OUTPUT player {i}: {output}")
+                actions, user_data = self.parse_output(output)
+                if prof:
+                    prof.lap("parse", t)
+
+            wall = time.perf_counter_ns() - start_wall
+            self.timings["wall"][i].append(wall)
+            if start_cpu is not None:
+                self.timings["cpu"][i].append(self._cpu_time_ns(bot_module) - start_cpu)
+
+            if self.time_budget is not None and wall > self.time_budget * 1_000_000:
+                self.overruns[i] += 1
+                if self.budget_policy == "empty":
+                    actions, user_data = [], ""
+                elif self.budget_policy == "forfeit":
+                    self.forfeit(i)
+                    actions = []
+
+            bot_outputs.append(actions)
+            self.user_data[i] = user_data
+
+        # --- resolve action bots ---
+
+        if prof:
+            t = time.perf_counter_ns()
+        bot_actions = []
+        for i, actions in enumerate(bot_outputs):
+            for x, y, args in actions:
+                bot = self.get_bot(x, y)
+                if bot and bot.player == i:
+                    if self.random_probability and self.rand.random() < self.random_probability:
+                        bot_actions.append((bot, "move", [self.rand.choice(list(self.DIRECTIONS))]))
+                    else:
+                        bot_actions.append((bot, self.ACTIONS[args[0]], args[1:]))
+        if prof:
+            prof.lap("resolve", t)
+
+        return bot_actions
+
+    def _cpu_time_ns(self, bot_module) -> Optional[int]:
+        """
+        CPU time of this process for module bots or of the finished
+        child processes for file bots
+        """
+        if bot_module:
+            return time.process_time_ns()
+        if not self.warm_files:
+            usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+            return int((usage.ru_utime + usage.ru_stime) * 1_000_000_000)
+
+    def timing_stats(self) -> dict:
+        """
+        Timing percentiles in milliseconds, e.g. `{"wall_p95": [player1, player2], ...}`
+        """
+        stats = {}
+        for kind, samples in self.timings.items():
+            summaries = [timing_summary(s) for s in samples]
+            for key in summaries[0]:
+                stats[f"{kind}_{key}"] = [s[key] for s in summaries]
+        return stats
+
+    def forfeit(self, player: int):
+        """
+        Remove all bots of the player and stop spawning and running it
+        """
+        self.forfeited[player] = True
+        died_bots = [b for b in self.bots if b.player == player]
+        for b in died_bots:
+            b.energy = 0
+            self.bot_grid[b.y * self.width + b.x] = None
+        self.bots = [b for b in self.bots if b.player != player]
+        if died_bots:
+            for o in self.observers:
+                o.on_death(self, died_bots)
+
     def game_state(self, player: int) -> str:
         """
         State for each player.
@@ -289,6 +651,26 @@ class Simulator:
 
         return "#".join(elements)
 
+    def parse_output(self, output: str) -> Tuple[List[Tuple[int, int, Sequence[str]]], str]:
+        """
+        Split a bot's output string into actions and user-data.
+
+        :return: tuple of
+            - list of (x, y, args) where x and y start at 0
+              and args is the action letter followed by its arguments
+            - user-data string
+        """
+        output_args = output.split("#")
+        actions = []
+        if output_args[0]:
+            for action in output_args[0].split(","):
+                args = action.split("-")
+                x, y = (int(a) - 1 for a in args[0].split(":"))
+                actions.append((x, y, args[1:]))
+
+        user_data = output_args[1] if len(output_args) > 1 else ""
+        return actions, user_data
+
     def get_map(self, x: int, y: int) -> Union[None, bool, Bot]:
         if not 0 <= x < self.width:
             return True
@@ -299,25 +681,32 @@ class Simulator:
         return self.get_bot(x, y)
 
     def get_bot(self, x: int, y: int) -> Optional[Bot]:
-        for b in self.bots:
-            if b.x == x and b.y == y:
-                return b
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.bot_grid[y * self.width + x]
 
     def add_bot(self, player_index: int, x: int, y: int) -> Optional[Bot]:
         if self.get_map(x, y) is True:
             return None
 
-        for i, b in enumerate(self.bots):
-            if b.x == x and b.y == y:
-                self.stats["overspawned"][b.player] += 1
-                self.bots.pop(i)
-                break
+        other = self.get_bot(x, y)
+        if other:
+            self.stats["overspawned"][other.player] += 1
+            self.bots.remove(other)
 
         bot = Bot(player_index, x, y)
         bot.color = self.COLOR1 if player_index == 0 else self.COLOR2
         self.bots.append(bot)
+        self.bot_grid[y * self.width + x] = bot
         return bot
 
+    def move_bot(self, bot: Bot, x: int, y: int):
+        """
+        Move the bot to a free position and keep the grid index up-to-date
+        """
+        self.bot_grid[bot.y * self.width + bot.x] = None
+        bot.x, bot.y = x, y
+        self.bot_grid[y * self.width + x] = bot
+
     def num_bots(self) -> List[int]:
         num = [0] * len(self.bot_files)
         for b in self.bots:
@@ -326,6 +715,8 @@ class Simulator:
 
     def process_file(self, file: Path, input: str) -> str:
         #print("running", file)
+        if self.warm_files:
+            return self.process_file_worker(file, input)
 
         process = subprocess.Popen(
             ["python3", file.resolve()],
@@ -340,6 +731,8 @@ class Simulator:
             process.stdin.close()
 
             output = process.stdout.read().decode()
+            # reap the process, which also adds its CPU time to the children's usage
+            process.wait()
             #print("got", output)
             return output
         except:
@@ -347,10 +740,57 @@ class Simulator:
             process.wait()
             raise
 
+    def process_file_worker(self, file: Path, input: str) -> str:
+        from .file_worker import read_frame, write_frame
+
+        process = self.file_workers.get(file)
+        if process is None:
+            process = subprocess.Popen(
+                ["python3", Path(__file__).resolve().parent / "file_worker.py", file.resolve()],
+                cwd=file.parent,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+            self.file_workers[file] = process
+        try:
+            write_frame(process.stdin, input)
+            output = read_frame(process.stdout)
+            if output is None:
+                raise RuntimeError(f"worker for {file} exited with code {process.wait()}")
+            return output
+        except:
+            self.file_workers.pop(file)
+            process.kill()
+            process.wait()
+            raise
+
+    def close(self):
+        """
+        Stop all file bot worker processes
+        """
+        for process in self.file_workers.values():
+            process.stdin.close()
+            process.wait()
+        self.file_workers.clear()
+
+    def __del__(self):
+        try:
+            self.close()
+        except:
+            pass
+
+    def bot_seed(self, player: int) -> Optional[int]:
+        """
+        The seed for the GameBase instance of `player` in the current frame,
+        or None if the simulator has no seed.
+        """
+        if self.seed is not None:
+            return derive_seed(self.seed, player, self.frame)
+
     def process_module(self, module, input: str, player: int) -> str:
         from .bots.botbase import GameBase
         try:
-            game: GameBase = module.Game(input)
+            game: GameBase = module.Game(input, seed=self.bot_seed(player))
 
             if self.bot_genomes[player] is not None:
                 game.set_genome(self.bot_genomes[player])
@@ -367,6 +807,75 @@ class Simulator:
             #traceback.print_exc(file=sys.stderr)
             raise
 
+    def process_module_direct(self, module, player: int) -> Tuple[List[Tuple[int, int, Sequence[str]]], str]:
+        """
+        Run a GameBase module without the string protocol.
+
+        Returns the same as `parse_output` would return for `process_module`.
+        """
+        from .bots.botbase import GameBase
+
+        prof = self.profiler
+        if prof:
+            t = time.perf_counter_ns()
+
+        user_data = self.user_data[player][:128].rstrip()
+        game: GameBase = module.Game.from_state(
+            self.frame, player,
+            [(b.x, b.y, b.energy, b.player) for b in self.bots],
+            user_data,
+            seed=self.bot_seed(player),
+        )
+        if self.check_protocol:
+            self._check_protocol_input(game, module.Game(self.game_state(player), seed=self.bot_seed(player)))
+        if prof:
+            t = prof.lap("serialize", t)
+
+        if self.bot_genomes[player] is not None:
+            game.set_genome(self.bot_genomes[player])
+
+        game.step()
+
+        if self.bot_genomes[player] is None:
+            self.bot_genomes[player] = game.get_genome()
+        if prof:
+            t = prof.lap("bot", t)
+
+        actions = [
+            (a.bot.x, a.bot.y, a.args)
+            for a in game.actions
+        ]
+        # same as stripping and splitting the output string
+        user_data = game.get_user_data()
+        user_data = user_data.rstrip().split("#")[0] if user_data else ""
+        if prof:
+            prof.lap("parse", t)
+
+        if self.check_protocol:
+            expected_actions, expected_user_data = self.parse_output(game.output().strip())
+            if (
+                    [(x, y, tuple(args)) for x, y, args in expected_actions] != actions
+                    or expected_user_data != user_data
+            ):
+                raise AssertionError(
+                    f"protocol mismatch for player {player} in frame {self.frame}:"
+                    f" expected {expected_actions} #{expected_user_data}, got {actions} #{user_data}"
+                )
+
+        return actions, user_data
+
+    def _check_protocol_input(self, game, expected_game):
+        def _state(g):
+            return g.frame, g.max_frame, g.player_id, [
+                (b.x, b.y, b.energy, b.friend, b.player, b.index)
+                for b in g.bots
+            ]
+        if _state(game) != _state(expected_game):
+            raise AssertionError(
+                f"protocol mismatch for player {game.player_id} in frame {self.frame}:"
+                f" expected {_state(expected_game)}, got {_state(game)}"
+            )
+
     def print(self, file=None):
         for y in range(self.height):
             y = self.height - 1 - y
@@ -0,0 +1,251 @@
+"""
+Interactive display of matches in an ANSI terminal.
+
+`TerminalRenderer` keeps the previously drawn frame and only writes
+the cells and log lines that changed, using cursor addressing.
+`Playback` reads single key presses without echo while waiting between
+frames:
+
+    space     pause / resume
+    n, right  next frame (while paused)
+    p, left   previous frame (replays only)
+    +, -      faster / slower
+    q         quit
+
+Keys are only read when stdin is a terminal, otherwise `Playback`
+just waits `delay` milliseconds between frames.
+"""
+import os
+import sys
+import time
+import select
+from typing import Optional, List, Tuple, TYPE_CHECKING
+
+from .observer import SimulatorObserver
+
+if TYPE_CHECKING:
+    from .simulator import Simulator
+
+
+HELP = "[space] pause  [n/→] step  [p/←] back  [+/-] speed  [q] quit"
+
+_KEYS = {
+    " ": "pause",
+    "n": "next",
+    "\033[C": "next",
+    "p": "back",
+    "\033[D": "back",
+    "+": "faster",
+    "=": "faster",
+    "-": "slower",
+    "q": "quit",
+    "\033": "quit",
+}
+
+
+class TerminalRenderer:
+    """
+    Draws the map, the log lines and a status line of a Simulator.
+
+    The first call of `render` clears the screen, later calls only write
+    the differences to the previous frame, so they do not flicker and
+    the cost does not depend on the size of the board. Different
+    Simulator instances of the same size can be rendered one after
+    another, e.g. when seeking in a replay.
+    """
+
+    # screen columns of the row labels and of each cell
+    LABEL_WIDTH = 3
+    CELL_WIDTH = 3
+
+    def __init__(self, file=None):
+        self.file = file or sys.stdout
+        self._cells: Optional[List[str]] = None
+        # (row, column, text) of the log and status lines
+        self._lines: List[Tuple[int, int, str]] = []
+        self._size = None
+
+    def reset(self):
+        """
+        Redraw everything with the next `render` call
+        """
+        self._cells = None
+
+    def cells(self, sim: "Simulator") -> List[str]:
+        """
+        The display string of each cell, row by row from the bottom
+        """
+        walls, bot_grid = sim.map, sim.bot_grid
+        width = sim.width
+        cells = []
+        for y in range(sim.height):
+            row = walls[y]
+            for x in range(width):
+                if row[x]:
+                    cells.append("###")
+                    continue
+                bot = bot_grid[y * width + x]
+                if bot is None:
+                    cells.append(" . ")
+                else:
+                    color = sim.COLOR1 if bot.player == 0 else sim.COLOR2
+                    cells.append(f"{color}{bot.energy:3d}{sim.COLOR_OFF}")
+        return cells
+
+    def render(self, sim: "Simulator", status: str = ""):
+        width, height = sim.width, sim.height
+        cells = self.cells(sim)
+        out = []
+
+        if self._cells is None or self._size != (width, height):
+            self._size = (width, height)
+            self._cells = [None] * len(cells)
+            self._lines = []
+            # clear screen, hide cursor, draw labels
+            out.append("\033[2J\033[?25l")
+            for y in range(height):
+                out.append(f"\033[{height - y};1H{y:2} ")
+            out.append(f"\033[{height + 1};1H" + " " * self.LABEL_WIDTH)
+            out.append("".join(f"{x:2} " for x in range(width)))
+
+        previous = self._cells
+        for i, cell in enumerate(cells):
+            if cell != previous[i]:
+                y, x = divmod(i, width)
+                out.append(f"\033[{height - y};{self.LABEL_WIDTH + 1 + x * self.CELL_WIDTH}H{cell}")
+        self._cells = cells
+
+        # log lines right of the map and the status below it
+        log_column = self.LABEL_WIDTH + 2 + width * self.CELL_WIDTH
+        lines = [(row + 1, log_column, line) for row, line in enumerate(sim.log_lines)]
+        lines.append((height + 2, 1, status))
+        for i, (row, column, line) in enumerate(lines):
+            if i >= len(self._lines) or self._lines[i] != (row, column, line):
+                out.append(f"\033[{row};{column}H{line}\033[K")
+        # clear the log lines of the previous frame
+        for row, column, line in self._lines[len(lines):]:
+            if row <= height:
+                out.append(f"\033[{row};{column}H\033[K")
+        self._lines = lines
+
+        out.append(f"\033[{height + 3};1H")
+        self.file.write("".join(out))
+        self.file.flush()
+
+    def close(self):
+        """
+        Show the cursor again
+        """
+        self.file.write("\033[?25h")
+        self.file.flush()
+
+
+class Playback:
+    """
+    Timing and keyboard control between frames, use as context manager.
+
+    :param delay: int, milliseconds to display each frame
+    :param can_step_back: bool, accept the `back` key
+    """
+
+    def __init__(self, delay: int = 100, can_step_back: bool = False):
+        self.delay = delay
+        self.can_step_back = can_step_back
+        self.paused = False
+        self._fd = None
+        self._term_attrs = None
+
+    def __enter__(self):
+        if sys.stdin.isatty():
+            import termios
+            import tty
+            self._fd = sys.stdin.fileno()
+            self._term_attrs = termios.tcgetattr(self._fd)
+            tty.setcbreak(self._fd)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._term_attrs is not None:
+            import termios
+            termios.tcsetattr(self._fd, termios.TCSADRAIN, self._term_attrs)
+            self._term_attrs = None
+
+    @property
+    def interactive(self) -> bool:
+        return self._term_attrs is not None
+
+    def status(self) -> str:
+        status = f"delay {self.delay}ms"
+        if self.paused:
+            status += "  PAUSED"
+        if self.interactive:
+            status += "  " + HELP
+        return status
+
+    def read_key(self, timeout: Optional[float]) -> Optional[str]:
+        """
+        Wait up to `timeout` seconds (forever for None) for a key
+        and return its command name.
+        """
+        if not self.interactive:
+            if timeout:
+                time.sleep(timeout)
+            return None
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return None
+        key = os.read(self._fd, 8).decode(errors="ignore")
+        return _KEYS.get(key)
+
+    def wait(self) -> str:
+        """
+        Wait for the next frame and return `next`, `back` or `quit`,
+        or `redraw` after pausing or a speed change to update the status.
+
+        A paused playback only continues with a step or quit key.
+        """
+        deadline = time.monotonic() + self.delay / 1000
+        while True:
+            timeout = None if self.paused else max(0., deadline - time.monotonic())
+            command = self.read_key(timeout)
+
+            if command is None:
+                if not self.paused:
+                    return "next"
+            elif command == "quit":
+                return command
+            elif command == "pause":
+                self.paused = not self.paused
+                return "redraw"
+            elif command == "faster":
+                self.delay //= 2
+                return "redraw"
+            elif command == "slower":
+                self.delay = max(10, self.delay * 2)
+                return "redraw"
+            elif command == "next":
+                return command
+            elif command == "back" and self.can_step_back:
+                return command
+
+
+class TerminalObserver(SimulatorObserver):
+    """
+    Renders each frame of a running match and waits for the `Playback`.
+
+    Check `quit` after each step, it is set by the quit key.
+    Stepping back is not possible in a running match.
+    """
+
+    def __init__(self, playback: Playback, renderer: Optional[TerminalRenderer] = None, num_frames: int = 100):
+        self.playback = playback
+        self.renderer = renderer or TerminalRenderer()
+        self.num_frames = num_frames
+        self.quit = False
+
+    def on_frame_end(self, sim: "Simulator"):
+        while True:
+            self.renderer.render(sim, f"frame {sim.frame + 1}/{self.num_frames}  {self.playback.status()}")
+            command = self.playback.wait()
+            if command != "redraw":
+                break
+        self.quit = command == "quit"
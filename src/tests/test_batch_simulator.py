@@ -0,0 +1,87 @@
+import unittest
+from types import SimpleNamespace
+
+from src.bots.botbase import GameBase
+from src.simulator import Simulator
+from src.batch_simulator import BatchSimulator, RandomPolicy
+
+
+class RecordingPolicy(RandomPolicy):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.history = {}
+
+    def actions(self, sim, player):
+        actions = super().actions(sim, player)
+        self.history[sim.frame] = actions
+        return actions
+
+
+def replay_module(policy: RecordingPolicy, match: int):
+    """
+    A GameBase module playing the recorded actions of one match
+    """
+    letters = {
+        BatchSimulator.ATTACK: "A",
+        BatchSimulator.DEFEND: "D",
+        BatchSimulator.MOVE: "M",
+        BatchSimulator.EXPLODE: "S",
+    }
+
+    class Game(GameBase):
+        def step(self):
+            action, direction = policy.history[self.frame]
+            for bot in self.friends:
+                a = action[match, bot.y, bot.x]
+                if a == BatchSimulator.DEFEND:
+                    self.add_action(bot.action("D"))
+                elif a != BatchSimulator.NONE:
+                    dir = BatchSimulator.DIRECTION_NAMES[direction[match, bot.y, bot.x]]
+                    self.add_action(bot.action(letters[a], dir))
+
+    return SimpleNamespace(Game=Game)
+
+
+class TestBatchSimulator(unittest.TestCase):
+
+    def assert_conformance(self, count: int, seed: int, **kwargs):
+        policies = [RecordingPolicy(seed), RecordingPolicy(seed + 1)]
+        batch = BatchSimulator(*policies, count=count, **kwargs)
+        sims = []
+        for match in range(count):
+            sim = Simulator("src/bots/still.py", "src/bots/still.py", **kwargs)
+            sim.bot_modules = [replay_module(p, match) for p in policies]
+            sims.append(sim)
+
+        for frame in range(100):
+            batch.step()
+            for match, sim in enumerate(sims):
+                sim.step()
+                board = {
+                    (b.x, b.y): (b.player, b.energy)
+                    for b in sim.bots
+                }
+                batch_board = {
+                    (x, y): (int(batch.player[match, y, x]), int(batch.energy[match, y, x]))
+                    for y in range(sim.height)
+                    for x in range(sim.width)
+                    if batch.player[match, y, x] >= 0
+                }
+                self.assertEqual(board, batch_board, f"match {match} frame {frame}")
+                self.assertEqual(
+                    sim.stats,
+                    {key: value[match].tolist() for key, value in batch.stats.items()},
+                    f"match {match} frame {frame}",
+                )
+
+        self.assertEqual(
+            [sim.num_bots() for sim in sims],
+            batch.num_bots().tolist(),
+        )
+
+    def test_conformance(self):
+        self.assert_conformance(20, 23)
+
+    def test_conformance_crowded(self):
+        self.assert_conformance(10, 42, spawn_frame_interval=2, width=12, height=14)
@@ -0,0 +1,78 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.simulator import Simulator
+from src.cache import MatchCache, match_key, run_match
+from src.pool import BotPool
+
+
+class TestCache(unittest.TestCase):
+
+    def test_run_match(self):
+        with tempfile.TemporaryDirectory() as path:
+            cache = MatchCache(Path(path) / "cache.sqlite")
+
+            def run(seed):
+                sim = Simulator("src/bots/randy.py", "src/bots/randy2.py", headless=True, seed=seed)
+                return run_match(sim, cache)
+
+            result = run(23)
+            self.assertEqual((0, 1), (cache.hits, cache.misses))
+            self.assertIn("timings", result)
+            cached = run(23)
+            self.assertNotIn("timings", cached)
+            self.assertEqual(result["num_bots"], cached["num_bots"])
+            self.assertEqual(result["stats"], cached["stats"])
+            self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+            run(24)
+            self.assertEqual(2, len(cache))
+
+            # unseeded matches are not cached
+            run(None)
+            self.assertEqual(2, len(cache))
+            cache.close()
+
+    def test_key(self):
+        sim = Simulator("src/bots/randy.py", "src/bots/randy2.py", headless=True)
+        self.assertIsNone(match_key(sim))
+
+        def key(num_frames=100, **kwargs):
+            return match_key(
+                Simulator("src/bots/randy.py", "src/bots/randy2.py", headless=True, **kwargs), num_frames,
+            )
+
+        self.assertEqual(key(seed=1), key(seed=1))
+        self.assertNotEqual(key(seed=1), key(seed=2))
+        self.assertNotEqual(key(seed=1), key(seed=1, random_probability=.1))
+        self.assertNotEqual(key(seed=1), key(seed=1, num_frames=200))
+
+    def test_evict(self):
+        with tempfile.TemporaryDirectory() as path:
+            cache = MatchCache(Path(path) / "cache.sqlite", max_entries=3)
+            for i in range(5):
+                cache.put(str(i), {"i": i})
+            cache.get("0")
+            cache.evict()
+            self.assertEqual(3, len(cache))
+            self.assertEqual({"i": 0}, cache.get("0"))
+            self.assertIsNone(cache.get("1"))
+            self.assertIsNone(cache.get("2"))
+            cache.close()
+
+    def test_pool_inline(self):
+        with tempfile.TemporaryDirectory() as path:
+            pool = BotPool(seed=23)
+            pool.num_processes = 1
+            pool.verbose = False
+            pool.cache = MatchCache(Path(path) / "cache.sqlite")
+            pool.add_bot_file("src/bots/randy.py", "src/bots/randy2.py")
+            for id, source in enumerate(pool.bot_files.values()):
+                pool.population[id] = {
+                    **source, "source_id": source["id"], "id": id, "parent": source["id"],
+                    "generation": 1, "fitness": 0, "stats": {},
+                }
+            pool.evaluate()
+            self.assertGreater(len(pool.cache), 0)
+            pool.cache.close()
@@ -0,0 +1,49 @@
+import shutil
+import tempfile
+import unittest
+from multiprocessing import Process
+
+from src.simulator import Simulator
+from src.cache import run_match
+from src.distributed import Coordinator, run_worker
+
+
+class TestDistributed(unittest.TestCase):
+
+    def test_workers_join_and_leave(self):
+        # sources are imported relative to the working directory
+        cache_dir = tempfile.mkdtemp(dir=".", prefix="tmp_remote_bots_")
+        files = ["src/bots/randy.py", "src/bots/randy2.py"]
+        seeds = list(range(8))
+        workers = []
+        try:
+            with Coordinator(("localhost", 0)) as coordinator:
+                def start_worker():
+                    worker = Process(
+                        target=run_worker, args=(coordinator.address, coordinator.authkey),
+                        kwargs={"cache_dir": cache_dir, "once": True},
+                    )
+                    worker.start()
+                    workers.append(worker)
+
+                start_worker()
+                tasks = [coordinator.match_task(files, seed=seed) for seed in seeds]
+                results = {}
+                for index, result in coordinator.imap(tasks):
+                    results[index] = result
+                    if len(results) == 1:
+                        # one leaves in the middle of a match, two others join
+                        workers[0].terminate()
+                        start_worker()
+                        start_worker()
+
+            self.assertEqual(len(seeds), len(results))
+            for index, seed in enumerate(seeds):
+                expected = run_match(Simulator(*files, headless=True, seed=seed))
+                self.assertEqual(expected["num_bots"], results[index]["num_bots"])
+                self.assertEqual(expected["stats"], results[index]["stats"])
+        finally:
+            for worker in workers:
+                worker.join(10)
+                worker.terminate()
+            shutil.rmtree(cache_dir)
@@ -0,0 +1,140 @@
+import unittest
+
+import numpy as np
+
+from src.bots.botbase import GameBase
+from src.evolution import GenomeSpace, CMAES
+from src.pool import BotPool
+
+
+class NumericGame(GameBase):
+    GENOME = [("attack", 0., 1.), ("distance", 1., 10.)]
+    attack = .5
+    distance = 3.
+
+
+class OpaqueGame(GameBase):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.genome = {"value": 0}
+
+    def get_genome(self):
+        return self.genome
+
+    def set_genome(self, genome):
+        self.genome = genome
+
+    def mutate(self, amount: float, probability: float):
+        self.genome = {"value": self.genome["value"] + 1}
+
+
+class TestEvolution(unittest.TestCase):
+
+    def test_botbase_genome(self):
+        bot = NumericGame("1,100,1#", seed=23)
+        self.assertEqual([.5, 3.], bot.get_genome())
+        bot.set_genome([.25, 7.])
+        self.assertEqual([.25, 7.], bot.get_genome())
+        for i in range(100):
+            bot.mutate(1., 1.)
+            attack, distance = bot.get_genome()
+            self.assertTrue(0. <= attack <= 1.)
+            self.assertTrue(1. <= distance <= 10.)
+
+        self.assertIsNone(GameBase("1,100,1#").get_genome())
+        self.assertIsNone(GenomeSpace.of(GameBase))
+
+    def test_genome_space(self):
+        space = GenomeSpace.of(NumericGame)
+        rng = np.random.default_rng(23)
+        matrix = space.to_array([[.5, 3.]] * 100)
+
+        mutated = space.mutate(matrix, rng, amount=1., probability=0.)
+        # at least one value of each row changes
+        self.assertTrue(np.all(np.any(mutated != matrix, axis=1)))
+        self.assertTrue(np.all(mutated >= space.lower) and np.all(mutated <= space.upper))
+
+        normalized = space.normalize(mutated)
+        self.assertTrue(np.allclose(mutated, space.denormalize(normalized)))
+
+        child = space.crossover(matrix, mutated, rng)
+        self.assertTrue(np.all((child == matrix) | (child == mutated)))
+        self.assertIsInstance(space.to_genomes(child)[0][0], float)
+
+    def test_cma_es(self):
+        target = np.array([.2, .7, .4, .9])
+        optimizer = CMAES([.5] * 4, sigma=.3, seed=23)
+        for i in range(60):
+            solutions = optimizer.ask()
+            optimizer.tell(solutions, -np.sum((solutions - target) ** 2, axis=1))
+        self.assertLess(np.sum((optimizer.mean - target) ** 2), 1e-3)
+
+    def test_pool_mutate(self):
+        pool = BotPool(seed=23)
+        genome = pool.mutate(NumericGame, [.5, 3.])
+        self.assertNotEqual([.5, 3.], genome)
+        self.assertEqual(genome, BotPool(seed=23).mutate(NumericGame, [.5, 3.]))
+
+    def test_pool_numeric_bot(self):
+        pool = BotPool(seed=23)
+        pool.num_processes = 1
+        pool.verbose = False
+        pool.add_bot_file("src/bots/randy.py", "src/bots/still.py")
+        randy, still = pool.bot_files.values()
+        self.assertEqual((True, [1., 0.]), (randy["evolution"], randy["genome"]))
+        self.assertFalse(still["evolution"])
+
+        pool.create_population(count=4)
+        pool.evaluate()
+        space = GenomeSpace.of(randy["class"])
+        for i in range(2):
+            pool.select_population_cma(count=4)
+            pool.evaluate()
+
+            self.assertEqual(4, len(pool.population))
+            for pop in pool.population.values():
+                if pop["evolution"]:
+                    self.assertEqual(i + 2, pop["generation"])
+                    self.assertTrue(all(isinstance(v, float) for v in pop["genome"]))
+                    self.assertTrue(np.all(space.to_array([pop["genome"]]) >= space.lower))
+                    self.assertTrue(np.all(space.to_array([pop["genome"]]) <= space.upper))
+                else:
+                    self.assertIsNone(pop["genome"])
+                self.assertGreater(pop["stats"]["matches"], 0)
+        self.assertEqual(["src/bots/randy.py"], list(pool.optimizers))
+
+    def test_pool_opaque_genome(self):
+        pool = BotPool(seed=23)
+        self.assertEqual({"value": 1}, pool.mutate(OpaqueGame, {"value": 0}))
+
+        for id in (1, 2):
+            pool.population[id] = {
+                "source_id": "A", "id": id, "parent": "A", "generation": 1, "file": "opaque.py",
+                "class": OpaqueGame, "evolution": True, "genome": {"value": id}, "fitness": id, "stats": {},
+            }
+        pool._id_counter_pop = 2
+        with self.assertRaises(ValueError):
+            pool.select_population_cma(count=3)
+
+        pool.select_population(num_best=2, count=3)
+        self.assertEqual({"value": 3}, pool.population[3]["genome"])
+
+    def test_steady_state(self):
+        pool = BotPool(seed=23)
+        pool.num_processes = 1
+        pool.verbose = False
+        pool.add_bot_file("src/bots/randy.py", "src/bots/still.py")
+        pool.create_population(count=4)
+        fixed_ids = [p["id"] for p in pool.population.values() if not p["evolution"]]
+        last_id = pool._id_counter_pop
+
+        pool.evolve_steady_state(num_offspring=6, evaluations=2)
+
+        self.assertEqual(4, len(pool.population))
+        self.assertEqual(last_id + 6, pool._id_counter_pop)
+        for id in fixed_ids:
+            self.assertIn(id, pool.population)
+        for pop in pool.population.values():
+            if pop["id"] > last_id:
+                self.assertTrue(pop["evolution"])
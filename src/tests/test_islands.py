@@ -0,0 +1,63 @@
+import unittest
+from pathlib import Path
+
+from src.pool import BotPool
+from src.islands import IslandModel, island_filename
+
+
+class TestIslands(unittest.TestCase):
+
+    def test_island_filename(self):
+        self.assertEqual(Path("pools/run-island2.sqlite"), island_filename("pools/run.sqlite", 2))
+
+    def test_add_migrants(self):
+        pool = BotPool()
+        for id in range(1, 5):
+            pool.population[id] = {
+                "id": id, "parent": "A", "evolution": id > 1, "genome": id, "fitness": id, "stats": {"matches": 1},
+            }
+        pool._id_counter_pop = 4
+
+        pool.add_migrants([{"id": 7, "parent": 3, "evolution": True, "genome": 70, "fitness": 3., "stats": {}}], "island1")
+
+        self.assertEqual([1, 2, 3, 5], sorted(pool.population))
+        self.assertEqual(
+            {"id": 5, "parent": "island1:7", "evolution": True, "genome": 70, "fitness": 0, "stats": {}},
+            pool.population[5],
+        )
+
+    def test_run(self):
+        with IslandModel(
+                ["src/bots/randy.py", "src/bots/still.py"],
+                num_islands=2,
+                population_size=6,
+                migration_interval=1,
+                num_migrants=2,
+                seed=23,
+                hall_of_fame_size=30,
+        ) as model:
+            processes = list(model._processes)
+            model.run(generations=2)
+            hall_of_fame = model.hall_of_fame
+
+        for process in processes:
+            self.assertFalse(process.is_alive())
+            self.assertEqual(0, process.exitcode)
+
+        self.assertEqual([0, 1], [s["island"] for s in model.summaries])
+        self.assertTrue(hall_of_fame)
+        fitnesses = [p["fitness"] for p in hall_of_fame]
+        self.assertEqual(sorted(fitnesses, reverse=True), fitnesses)
+
+        # each island received migrants of its neighbour in the ring
+        ids = {(p["island"], p["id"]) for p in hall_of_fame}
+        for island in (0, 1):
+            migrants = [
+                p for p in hall_of_fame
+                if p["island"] == island and str(p["parent"]).startswith("island")
+            ]
+            self.assertTrue(migrants)
+            for p in migrants:
+                origin, id = p["parent"].split(":")
+                self.assertEqual(f"island{1 - island}", origin)
+                self.assertIn((1 - island, int(id)), ids)
@@ -0,0 +1,89 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.pool import BotPool
+from src.pool_store import PoolStore
+
+
+class TestPoolStore(unittest.TestCase):
+
+    def add_entry(self, pool: BotPool, parent, fitness: float) -> int:
+        pool._id_counter_pop += 1
+        id = pool._id_counter_pop
+        pool.population[id] = {
+            "source_id": "A",
+            "id": id,
+            "parent": parent,
+            "generation": 1 if parent == "A" else pool.population[parent]["generation"] + 1,
+            "file": "src/bots/randy.py",
+            "class": pool.bot_files["A"]["class"],
+            "evolution": True,
+            "genome": {"value": id},
+            "fitness": fitness,
+            "stats": {"matches": 2},
+        }
+        return id
+
+    def test_checkpoints(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = Path(tmp) / "pool.sqlite"
+
+            pool = BotPool(seed=23)
+            pool.add_bot_file("src/bots/randy.py")
+            id1 = self.add_entry(pool, "A", 1.)
+            id2 = self.add_entry(pool, "A", 0.)
+            pool.save(filename)
+
+            pool.store.add_records([{"generation": 0, "id_1": id1, "id_2": id2, "bots_1": 3}])
+            del pool.population[id2]
+            id3 = self.add_entry(pool, id1, 2.)
+            pool.generation = 1
+            pool.rand.random()
+            pool.save(filename)
+            pool.close()
+
+            loaded = BotPool.load(filename)
+            self.assertEqual(1, loaded.generation)
+            self.assertEqual(23, loaded.seed)
+            self.assertEqual(pool.rand.random(), loaded.rand.random())
+            self.assertEqual([id1, id3], list(loaded.population))
+            self.assertEqual({"value": id3}, loaded.population[id3]["genome"])
+            self.assertIs(pool.bot_files["A"]["class"], loaded.population[id3]["class"])
+
+            self.assertEqual(
+                [id3, id1],
+                [p["id"] for p in loaded.store.lineage(id3)],
+            )
+            self.assertEqual(
+                [(0, 2, 1.), (1, 2, 2.)],
+                [(h["generation"], h["members"], h["best"]) for h in loaded.store.fitness_history()],
+            )
+            self.assertEqual([3], [r["bots_1"] for r in loaded.store.records(generation=0)])
+            loaded.close()
+
+    def test_steady_state_lineage(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pool = BotPool(seed=23)
+            pool.num_processes = 1
+            pool.verbose = False
+            pool.store = PoolStore(Path(tmp) / "pool.sqlite")
+            pool.add_bot_file("src/bots/randy.py", "src/bots/still.py")
+            pool.create_population(count=3)
+            pool.evolve_steady_state(num_offspring=6, evaluations=2)
+
+            stored_ids = {row[0] for row in pool.store.db.execute("SELECT id FROM individuals")}
+            match_ids = {
+                id for row in pool.store.db.execute("SELECT id_1, id_2 FROM matches") for id in row
+            }
+            self.assertTrue(match_ids)
+            self.assertLessEqual(match_ids, stored_ids)
+
+            # the lineage of the newest entry reaches the bot file across removed ancestors
+            newest = pool.population[max(pool.population)]
+            lineage = pool.store.lineage(newest["id"])
+            self.assertEqual(newest["generation"], len(lineage))
+            self.assertGreater(len(lineage), 2)
+            self.assertTrue(any(p["id"] not in pool.population for p in lineage))
+            self.assertEqual(newest["source_id"], lineage[-1]["parent"])
+            pool.close()
@@ -0,0 +1,20 @@
+import unittest
+
+from src.rating import EloRatings
+
+
+class TestRating(unittest.TestCase):
+
+    def test_elo(self):
+        ratings = EloRatings(k=16)
+        ratings.add_game("a", "b", 1.)
+        self.assertEqual(1508., ratings.ratings["a"])
+        self.assertEqual(1492., ratings.ratings["b"])
+        ratings.add_game("a", "b", .5)
+        self.assertLess(ratings.ratings["a"], 1508.)
+        self.assertAlmostEqual(3000., sum(ratings.ratings.values()))
+
+        rows = ratings.leaderboard()
+        self.assertEqual(["a", "b"], [r["bot"] for r in rows])
+        self.assertEqual((1, 1, 0), (rows[0]["wins"], rows[0]["draws"], rows[0]["losses"]))
+        self.assertEqual((0, 1, 1), (rows[1]["wins"], rows[1]["draws"], rows[1]["losses"]))
@@ -0,0 +1,79 @@
+import unittest
+
+from src.simulator import Simulator
+from src.replay import Replay, ReplayRecorder
+
+
+class TestReplay(unittest.TestCase):
+
+    @staticmethod
+    def state(sim: Simulator) -> tuple:
+        return (
+            sim.frame,
+            [(b.player, b.x, b.y, b.energy) for b in sim.bots],
+            {key: list(values) for key, values in sim.stats.items()},
+            list(sim.user_data),
+        )
+
+    def test_seek(self):
+        sim = Simulator("src/bots/randy.py", "src/bots/randy2.py", random_probability=.1, headless=True)
+        recorder = ReplayRecorder(keyframe_interval=7)
+        sim.add_observer(recorder)
+        states = []
+        for _ in range(100):
+            states.append(self.state(sim))
+            sim.step()
+        states.append(self.state(sim))
+
+        data = recorder.to_bytes()
+        self.assertLess(len(data), 8000)
+
+        replay = Replay.from_bytes(data)
+        self.assertEqual(100, replay.num_frames)
+        for frame in (0, 1, 6, 7, 8, 50, 99, 100):
+            self.assertEqual(states[frame], self.state(replay.simulator(frame, headless=True)))
+
+        sim = replay.simulator(13, headless=True)
+        while sim.frame < replay.num_frames:
+            replay.step(sim)
+            self.assertEqual(states[sim.frame], self.state(sim))
+
+    def test_forfeit(self):
+        sim = Simulator(
+            "src/bots/randy.py", "src/bots/randy2.py", headless=True, time_budget=0, budget_policy="forfeit",
+        )
+        recorder = ReplayRecorder(keyframe_interval=7)
+        sim.add_observer(recorder)
+        states = []
+        for _ in range(30):
+            states.append(self.state(sim))
+            sim.step()
+        states.append(self.state(sim))
+        self.assertEqual([0, 0], sim.num_bots())
+
+        replay = Replay.from_bytes(recorder.to_bytes())
+        for frame in (2, 10, 21, 30):
+            sim = replay.simulator(frame, headless=True)
+            self.assertEqual(states[frame], self.state(sim))
+            self.assertEqual([True, True], sim.forfeited)
+
+        sim = replay.simulator(0, headless=True)
+        while sim.frame < replay.num_frames:
+            replay.step(sim)
+            self.assertEqual(states[sim.frame], self.state(sim))
+
+    def test_limits(self):
+        sim = Simulator("src/bots/randy.py", "src/bots/randy2.py", headless=True)
+        recorder = ReplayRecorder()
+        sim.add_observer(recorder)
+        # longer than 128 characters and 255 bytes
+        sim.user_data = ["\u00e4" * 300, ""]
+        for _ in range(3):
+            sim.step()
+        replay = Replay.from_bytes(recorder.to_bytes())
+        self.assertEqual(["\u00e4" * 300, ""], replay.simulator(0, headless=True).user_data)
+
+        sim = Simulator("src/bots/randy.py", "src/bots/randy2.py", width=300, height=16, headless=True)
+        sim.add_observer(ReplayRecorder())
+        with self.assertRaises(ValueError):
+            sim.step()
@@ -0,0 +1,29 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.result_sink import ResultSink, match_record, read_records
+
+
+class TestResultSink(unittest.TestCase):
+
+    def test_round_trip(self):
+        result = {
+            "num_bots": [3, 1],
+            "stats": {"enemy_kills": [2, 0]},
+            "overruns": [0, 1],
+            "timings": {"wall": [[1_000_000, 2_000_000, 3_000_000], []], "cpu": [[], []]},
+        }
+        record = match_record(["a.py", "b.py"], 23, result, index=1)
+        self.assertEqual(2., record["wall_p50_1"])
+        self.assertIsNone(record["wall_p50_2"])
+
+        with tempfile.TemporaryDirectory() as path:
+            for suffix in (".jsonl", ".csv"):
+                filename = Path(path) / f"results{suffix}"
+                # the second sink appends and reuses the CSV header
+                for i in range(2):
+                    with ResultSink(filename, buffer_size=1) as sink:
+                        sink.write(record)
+                records = list(read_records(filename))
+                self.assertEqual([record, record], records, suffix)
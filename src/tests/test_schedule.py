@@ -0,0 +1,105 @@
+import random
+import unittest
+
+from src.schedule import (
+    AllPairsScheduler, RandomOpponentsScheduler, SwissScheduler, PanelScheduler,
+    SuccessiveHalvingScheduler, fitness,
+)
+from src.pool import BotPool
+
+
+class TestSchedule(unittest.TestCase):
+
+    def test_num_matches(self):
+        population = [{"id": i, "fitness": i % 3} for i in range(7)]
+        for scheduler in (
+                AllPairsScheduler(),
+                RandomOpponentsScheduler(k=3),
+                SwissScheduler(rounds=4),
+                PanelScheduler(["src/bots/randy.py", "src/bots/still.py"]),
+                SuccessiveHalvingScheduler(budget=100, keep=2),
+        ):
+            rand = random.Random(23)
+            pairs = []
+            for round in range(scheduler.num_rounds(len(population))):
+                pairs += scheduler.pairs(population, rand, round, {})
+            self.assertEqual(scheduler.num_matches(len(population)), len(pairs), str(scheduler))
+            for pop1, pop2 in pairs:
+                self.assertIsNot(pop1, pop2)
+
+    def test_swiss(self):
+        population = [{"id": i, "fitness": 0} for i in range(5)]
+        scheduler = SwissScheduler(rounds=5)
+        rand = random.Random(23)
+        played = set()
+        byes = []
+        for round in range(scheduler.num_rounds(len(population))):
+            pairs = scheduler.pairs(population, rand, round, {})
+            for pop1, pop2 in pairs:
+                key = frozenset((pop1["id"], pop2["id"]))
+                self.assertNotIn(key, played)
+                played.add(key)
+            byes += [
+                p["id"] for p in population
+                if all(p is not pop1 and p is not pop2 for pop1, pop2 in pairs)
+            ]
+        # each one sits out once and plays everyone else
+        self.assertEqual(list(range(5)), sorted(byes))
+        self.assertEqual(10, len(played))
+
+    def test_fitness(self):
+        self.assertEqual(0., fitness({}))
+        self.assertEqual(
+            fitness({"wins": 1, "enemy_kills": 5, "matches": 2}),
+            fitness({"wins": 2, "enemy_kills": 10, "matches": 4}),
+        )
+
+    def test_successive_halving(self):
+        population = [{"id": i, "fitness": 0, "stats": {}} for i in range(8)]
+        # the fitness grows with the id
+        results = {i: {"wins": i, "matches": 10} for i in range(8)}
+        scheduler = SuccessiveHalvingScheduler(budget=48, keep=2)
+        self.assertEqual(3, scheduler.num_rounds(len(population)))
+        rand = random.Random(23)
+        contenders = []
+        for round in range(scheduler.num_rounds(len(population))):
+            pairs = scheduler.pairs(population, rand, round, results)
+            contenders.append(sorted({pop1["id"] for pop1, pop2 in pairs}))
+        self.assertEqual([list(range(8)), [4, 5, 6, 7], [6, 7]], contenders)
+
+        scheduler.finish(population)
+        self.assertEqual([1, 1, 1, 1, 2, 2, 3, 3], [p["race_rounds"] for p in population])
+        self.assertEqual([{}] * 8, [p["stats"] for p in population])
+
+        # a single entry has no opponents
+        population = [{"id": 0, "fitness": 0, "stats": {}}]
+        self.assertEqual([], scheduler.pairs(population, rand, 0, {}))
+        self.assertEqual(0, scheduler.num_matches(1))
+
+    def test_pool_race_rounds(self):
+        pool = BotPool(seed=23)
+        pool.num_processes = 1
+        pool.verbose = False
+        pool.add_bot_file("src/bots/randy.py")
+        source = pool.bot_files["A"]
+        for id in range(1, 5):
+            pool.population[id] = {
+                **source, "source_id": "A", "id": id, "parent": "A", "generation": 1,
+                "fitness": 0, "stats": {}, "race_rounds": 5 - id,
+            }
+        pool._id_counter_pop = 4
+        # the rounds of a previous generation are removed
+        pool.evaluate()
+        for pop in pool.population.values():
+            self.assertNotIn("race_rounds", pop)
+
+        pool.scheduler = SuccessiveHalvingScheduler(budget=8, keep=2)
+        pool.evaluate()
+        self.assertEqual([1, 1, 2, 2], sorted(p["race_rounds"] for p in pool.population.values()))
+        for pop in pool.population.values():
+            self.assertNotIn("race_rounds", pop["stats"])
+
+        # the entries of the last round are the best, whatever their fitness
+        finalists = {p["id"] for p in pool.population.values() if p["race_rounds"] == 2}
+        pool.select_population(num_best=2, count=3)
+        self.assertEqual(finalists, set(pool.population) - {5})
@@ -0,0 +1,35 @@
+import random
+import unittest
+
+from src.sequential import SPRT
+
+
+class TestSequential(unittest.TestCase):
+
+    def run_sprt(self, win_probability: float, seed: int = 23) -> SPRT:
+        rand = random.Random(seed)
+        sprt = SPRT()
+        while sprt.decision() is None and sprt.num_games < 10000:
+            if rand.random() < win_probability:
+                sprt.add(wins=1)
+            else:
+                sprt.add(losses=1)
+        return sprt
+
+    def test_decision(self):
+        self.assertIsNone(SPRT().decision())
+
+        sprt = self.run_sprt(.9)
+        self.assertEqual(0, sprt.decision())
+        self.assertLess(sprt.num_games, 20)
+
+        sprt = self.run_sprt(.2)
+        self.assertEqual(1, sprt.decision())
+        low, high = sprt.interval()
+        self.assertLess(low, sprt.score)
+        self.assertLess(high, .5)
+
+    def test_no_early_stop(self):
+        sprt = SPRT()
+        sprt.add(wins=2)
+        self.assertIsNone(sprt.decision())
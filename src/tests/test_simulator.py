@@ -0,0 +1,191 @@
+import unittest
+
+from src.simulator import Simulator
+from src.continuation import run_continuations
+from src.observer import SimulatorObserver
+from src.profiler import PhaseProfiler
+
+
+class TestSimulator(unittest.TestCase):
+
+    def assert_grid_consistent(self, sim: Simulator):
+        expected = {(b.x, b.y): b for b in sim.bots}
+        self.assertEqual(len(expected), len(sim.bots))
+        for y in range(sim.height):
+            for x in range(sim.width):
+                self.assertIs(expected.get((x, y)), sim.get_bot(x, y))
+
+    def test_bot_grid(self):
+        for size in (16, 24):
+            sim = Simulator(
+                "src/bots/randy.py", "src/bots/randy2.py",
+                width=size, height=size, spawn_frame_interval=3,
+            )
+            for _ in range(100):
+                sim.step()
+                self.assert_grid_consistent(sim)
+
+    def test_overspawn(self):
+        sim = Simulator("src/bots/still.py", "src/bots/still.py")
+        sim.step()
+        x, y = sim.spawn_points[0][0]
+        sim.add_bot(1, x, y)
+        self.assertEqual(1, sim.get_bot(x, y).player)
+        self.assertEqual([1, 0], sim.stats["overspawned"])
+        self.assertEqual([1, 3], sim.num_bots())
+        self.assert_grid_consistent(sim)
+
+    def test_warm_file_worker(self):
+        sim = Simulator("src/bots/example.py", "src/bots/still.py", warm_files=True)
+        for _ in range(5):
+            sim.step()
+        self.assertEqual(1, len(sim.file_workers))
+        self.assertGreater(sim.stats["moves"][0] + sim.stats["failed_moves"][0], 0)
+        sim.close()
+        self.assertEqual({}, sim.file_workers)
+
+    def test_check_protocol(self):
+        for bot in ("randy", "randy2", "randy_slow", "flee", "still"):
+            sim = Simulator(f"src/bots/{bot}.py", "src/bots/randy2.py", check_protocol=True)
+            for _ in range(100):
+                sim.step()
+
+    def test_serialize_identical_match(self):
+        sims = [
+            Simulator("src/bots/flee.py", "src/bots/still.py", serialize=serialize)
+            for serialize in (True, False)
+        ]
+        for _ in range(100):
+            states = []
+            for sim in sims:
+                sim.step()
+                states.append((
+                    [(b.player, b.x, b.y, b.energy) for b in sim.bots],
+                    sim.stats, sim.user_data,
+                ))
+            self.assertEqual(states[0], states[1])
+
+    def test_observer(self):
+
+        class CountObserver(SimulatorObserver):
+            def __init__(self):
+                self.counts = {}
+
+            def count(self, key: str, player: int):
+                self.counts.setdefault(key, [0, 0])[player] += 1
+
+            def on_move(self, sim, bot, from_pos):
+                self.count("moves", bot.player)
+
+            def on_attack(self, sim, bot, other):
+                if other is None:
+                    self.count("missed_attacks", bot.player)
+
+            def on_explode(self, sim, bot, others):
+                self.count("explosions", bot.player)
+
+        for headless in (False, True):
+            sim = Simulator("src/bots/randy.py", "src/bots/randy2.py", headless=headless)
+            observer = CountObserver()
+            sim.add_observer(observer)
+            for _ in range(30):
+                sim.step()
+            for key, counts in observer.counts.items():
+                self.assertEqual(sim.stats[key], counts)
+            self.assertEqual(not headless, bool(sim.log_lines))
+
+    def test_seed(self):
+        def run(seed):
+            sim = Simulator(
+                "src/bots/randy.py", "src/bots/randy2.py",
+                random_probability=.1, seed=seed, headless=True,
+            )
+            for _ in range(100):
+                sim.step()
+            return sim.stats, [(b.player, b.x, b.y, b.energy) for b in sim.bots]
+
+        self.assertEqual(run(23), run(23))
+        self.assertNotEqual(run(23), run(42))
+
+    def test_fork(self):
+        sim = Simulator(
+            "src/bots/randy.py", "src/bots/randy2.py",
+            random_probability=.1, seed=23, headless=True,
+        )
+        for _ in range(40):
+            sim.step()
+        snapshot = sim.snapshot()
+        fork = sim.fork()
+        for _ in range(60):
+            sim.step()
+            fork.step()
+        self.assertEqual(sim.snapshot(), fork.snapshot())
+
+        sim.restore(snapshot)
+        self.assertEqual(snapshot, sim.snapshot())
+        for b in sim.bots:
+            self.assertIs(b, sim.get_bot(b.x, b.y))
+
+        with self.assertRaises(ValueError):
+            sim.fork(width=8, height=8)
+        wall = snapshot._replace(bots=((0, 0, 0, 10), ))
+        with self.assertRaises(ValueError):
+            sim.restore(wall)
+        self.assertEqual(snapshot, sim.snapshot())
+
+    def test_continuations(self):
+        sim = Simulator(
+            "src/bots/randy.py", "src/bots/randy2.py",
+            random_probability=.1, seed=23, headless=True,
+        )
+        for _ in range(40):
+            sim.step()
+
+        def run(seed, num_processes=1):
+            return [
+                (r["num_bots"], r["stats"])
+                for r in run_continuations(sim, 4, num_frames=20, seed=seed, num_processes=num_processes)
+            ]
+
+        results = run(23)
+        self.assertEqual(4, len(results))
+        self.assertEqual(results, run(23))
+        self.assertNotEqual(results, run(24))
+        self.assertEqual(results, run(23, num_processes=2))
+        # the source match is not changed
+        self.assertEqual(40, sim.frame)
+
+    def test_time_budget(self):
+        def run(**kwargs):
+            sim = Simulator("src/bots/randy.py", "src/bots/randy2.py", headless=True, **kwargs)
+            for _ in range(100):
+                sim.step()
+            return sim
+
+        sim = run()
+        self.assertEqual([99, 99], [len(t) for t in sim.timings["wall"]])
+        self.assertEqual([99, 99], [len(t) for t in sim.timings["cpu"]])
+        self.assertEqual([0, 0], sim.overruns)
+        self.assertLessEqual(sim.timing_stats()["wall_p50"][0], sim.timing_stats()["wall_max"][0])
+
+        sim = run(time_budget=0, budget_policy="empty")
+        self.assertEqual([99, 99], sim.overruns)
+        self.assertEqual([0, 0], sim.stats["moves"])
+
+        sim = run(time_budget=0, budget_policy="forfeit")
+        self.assertEqual([1, 1], sim.overruns)
+        self.assertEqual([True, True], sim.forfeited)
+        self.assertEqual([0, 0], sim.num_bots())
+
+    def test_profile(self):
+        sim = Simulator("src/bots/randy.py", "src/bots/randy2.py", headless=True, profile=True)
+        for _ in range(20):
+            sim.step()
+        counts = sim.profiler.counts
+        self.assertEqual(19 * 2, counts["bot"])
+        self.assertEqual(19, counts["move"])
+        self.assertEqual(2, counts["spawn"])
+
+        profiler = PhaseProfiler.from_dict(sim.profiler.to_dict())
+        profiler.merge(sim.profiler)
+        self.assertEqual(sim.profiler.times["bot"] * 2, profiler.times["bot"])
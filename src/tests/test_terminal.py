@@ -0,0 +1,36 @@
+import io
+import re
+import unittest
+
+from src.simulator import Simulator
+from src.terminal import TerminalRenderer
+
+
+class TestTerminal(unittest.TestCase):
+
+    def test_diff(self):
+        sim = Simulator("src/bots/still.py", "src/bots/still.py", headless=True)
+        sim.step()
+        file = io.StringIO()
+        renderer = TerminalRenderer(file=file)
+
+        renderer.render(sim)
+        self.assertIn("\033[2J", file.getvalue())
+        self.assertEqual(
+            sim.width * sim.height,
+            len(re.findall(r"\033\[\d+;\d+H(###| \. |\033\[9)", file.getvalue())),
+        )
+
+        file.seek(0)
+        file.truncate()
+        renderer.render(sim)
+        self.assertNotIn("###", file.getvalue())
+
+        bot = sim.bots[0]
+        energy = bot.energy
+        bot.energy += 1
+        file.seek(0)
+        file.truncate()
+        renderer.render(sim)
+        self.assertEqual(1, file.getvalue().count(f"{energy + 1:3d}"))
+        self.assertNotIn(" . ", file.getvalue())
@@ -0,0 +1,158 @@
+import json
+import argparse
+import itertools
+from pathlib import Path
+from typing import List, Optional
+
+from tqdm import tqdm
+import tabulate
+
+from src.simulator import derive_seed
+from src.rating import EloRatings
+from match import imap_games
+
+
+def parse_args() -> dict:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "bots", type=str, nargs="+",
+        help="paths to two or more bot files",
+    )
+    parser.add_argument(
+        "-g", "--games", type=int, nargs="?", default=10,
+        help="Number of games per pairing, the bots swap colours after each game",
+    )
+    parser.add_argument(
+        "-o", "--results", type=str, nargs="?", default="tournament.jsonl",
+        help="File to append the result of each game to."
+             " An existing file resumes the tournament without replaying finished games.",
+    )
+    parser.add_argument(
+        "-l", "--leaderboard", type=str, nargs="?", default=None,
+        help="File to write the leaderboard to",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, nargs="?", default=None,
+        help="Number of processes, defaults to the number of CPUs",
+    )
+    parser.add_argument(
+        "-sf", "--spawn-frames", type=int, nargs="?", default=10,
+        help="Number of frames between spawn of new robots",
+    )
+    parser.add_argument(
+        "-r", "--random", type=float, nargs="?", default=0.,
+        help="Probability [0,1] of a bot making a random move instead of it's desired action",
+    )
+    parser.add_argument(
+        "-w", "--warm", type=bool, nargs="?", default=False, const=True,
+        help="Run file bots in a long-lived worker process instead of starting python for each round",
+    )
+    parser.add_argument(
+        "-s", "--seed", type=int, nargs="?", default=None,
+        help="Seed for reproducible games, each pairing and game uses a sub-seed derived from it",
+    )
+    parser.add_argument(
+        "-k", "--elo-k", type=float, nargs="?", default=16.,
+        help="K-factor of the Elo rating",
+    )
+
+    args = parser.parse_args()
+    if len(args.bots) < 2:
+        parser.error("need at least two bots")
+    return vars(args)
+
+
+def main(
+        bots: List[str],
+        games: int,
+        results: str,
+        leaderboard: Optional[str],
+        jobs: Optional[int],
+        spawn_frames: int,
+        random: float,
+        warm: bool,
+        seed: Optional[int],
+        elo_k: float,
+):
+    filenames = []
+    for org_fn in bots:
+        fn = Path(org_fn)
+        if not fn.exists():
+            fn = Path(f"src/bots/{fn}")
+        if not fn.exists():
+            fn = Path(f"{fn}.py")
+        if not fn.exists():
+            print(f"Could not find bot '{org_fn}'")
+            exit(1)
+        filenames.append(fn)
+
+    sim_params = {
+        "spawn_frame_interval": spawn_frames,
+        "random_probability": random,
+        "warm_files": warm,
+    }
+
+    ratings = EloRatings(k=elo_k)
+    for fn in filenames:
+        ratings.add_player(str(fn))
+
+    # replay the finished games in their original order
+    results_file = Path(results)
+    finished = set()
+    if results_file.exists():
+        lines = results_file.read_bytes().splitlines(keepends=True)
+        size = 0
+        for i, line in enumerate(lines):
+            if line.strip():
+                try:
+                    game = json.loads(line)
+                except json.JSONDecodeError:
+                    if i < len(lines) - 1:
+                        raise
+                    # the last game of an interrupted run was not written completely
+                    print(f"removing the incomplete last line of {results_file}")
+                    with results_file.open("r+b") as fp:
+                        fp.truncate(size)
+                    break
+                finished.add((game["a"], game["b"], game["index"]))
+                ratings.add_game(game["a"], game["b"], game["score"])
+            size += len(line)
+        else:
+            if lines and not lines[-1].endswith(b"\n"):
+                with results_file.open("a") as fp:
+                    fp.write("\n")
+        print(f"resuming {results_file} with {len(finished)} finished games")
+
+    tasks = []
+    for fn_a, fn_b in itertools.combinations(filenames, 2):
+        for index in range(games):
+            if (str(fn_a), str(fn_b), index) not in finished:
+                tasks.append((
+                    [fn_a, fn_b], index, sim_params, None,
+                    None if seed is None else derive_seed(seed, fn_a, fn_b),
+                ))
+
+    with results_file.open("a") as fp:
+        for result in tqdm(imap_games(tasks, jobs), total=len(tasks)):
+            fn_a, fn_b = result["filenames"]
+            stats = result["stats"]
+            score = stats["wins"][0] + .5 * stats["draws"][0]
+            ratings.add_game(fn_a, fn_b, score)
+            fp.write(json.dumps({
+                "a": fn_a,
+                "b": fn_b,
+                "index": result["index"],
+                "score": score,
+                "bots_alive": stats["bots_alive"],
+                "enemy_kills": stats["enemy_kills"],
+            }) + "\n")
+            fp.flush()
+
+    table = tabulate.tabulate(ratings.leaderboard(), headers="keys", tablefmt="presto")
+    print(table)
+    if leaderboard:
+        Path(leaderboard).write_text(table + "\n")
+
+
+if __name__ == "__main__":
+    main(**parse_args())
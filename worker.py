@@ -0,0 +1,63 @@
+import os
+import argparse
+from multiprocessing import Process
+from typing import Optional
+
+from src.distributed import run_worker, parse_address, DEFAULT_PORT
+
+
+def parse_args() -> dict:
+    parser = argparse.ArgumentParser(
+        description="Run the matches of `match.py --distribute` or `breed.py --distribute`"
+                    " on this machine. Must be started in the root directory of the repository.",
+    )
+    parser.add_argument(
+        "address", type=str, nargs="?", default=f"localhost:{DEFAULT_PORT}",
+        help="host:port of the coordinator",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, nargs="?", default=None,
+        help="Number of processes, defaults to the number of CPUs",
+    )
+    parser.add_argument(
+        "--authkey", type=str, required=True,
+        help="shared secret of the coordinator and the workers, printed by the coordinator",
+    )
+    parser.add_argument(
+        "--cache-dir", type=str, nargs="?", default="remote_bots",
+        help="directory to store the bot sources, relative to the repository",
+    )
+    parser.add_argument(
+        "--once", type=bool, nargs="?", default=False, const=True,
+        help="Exit when the coordinator is finished instead of waiting for the next one",
+    )
+
+    return vars(parser.parse_args())
+
+
+def main(
+        address: str,
+        jobs: Optional[int],
+        authkey: str,
+        cache_dir: str,
+        once: bool,
+):
+    address = parse_address(address)
+    jobs = jobs or os.cpu_count() or 1
+    print(f"starting {jobs} workers for {address[0]}:{address[1]}")
+
+    processes = [
+        Process(target=run_worker, args=(address, authkey, cache_dir), kwargs={"once": once})
+        for _ in range(jobs)
+    ]
+    for p in processes:
+        p.start()
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main(**parse_args())